@@ -0,0 +1,220 @@
+"""
+Vectorized scoring for /recommend-card/batch.
+
+All items in a group share the same merchant context (category, online,
+MCC, FCY, mode, card selection), so every card's reward is just
+amount × a per-card rate. We score a whole group as one
+(items × cards) matrix instead of looping over cards per item.
+
+The per-card rates come from a RateTable built with each ruleset
+snapshot: effective mpd, cashback rate and blocked flag for every
+card × category × (online, FCY), so a context's rate vectors are a
+single array slice. Cards with rules (rule_dsl.py) are patched on top
+of that slice; the rules only see the merchant, the currency and which
+amount band the txn falls in, so items sharing a RateTable.rule_key
+share rates too.
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+
+from rule_dsl import referenced
+
+# rows per matrix chunk, keeps memory flat for very large catalogs
+CHUNK_ROWS = 8192
+
+# two scores further apart than this can't swap order after round(x, 2)
+_ROUNDING_SLACK = 0.02
+
+
+def rate_vectors(
+    cards, category: str, is_online: bool, mcc: str, is_fcy: bool,
+    merchant: str = "", currency: str | None = None, amount: float = 0.0,
+):
+    """
+    Per-card rate table for one merchant context.
+    Returns (mpd, cashback_rate, blocked) arrays; blocked cards get zero rates.
+    """
+    mpd = np.zeros(len(cards))
+    cashback_rate = np.zeros(len(cards))
+    blocked = np.zeros(len(cards), dtype=bool)
+    for i, card in enumerate(cards):
+        rates = card.rates_for(category, is_online, mcc, is_fcy, merchant, currency, amount)
+        if rates is None:
+            blocked[i] = True
+        else:
+            mpd[i] = rates[0]
+            cashback_rate[i] = rates[1] or 0.0
+    return mpd, cashback_rate, blocked
+
+
+class RateTable:
+    """
+    Dense effective-rate table for one ruleset's compiled cards.
+
+    mpd[category, slot, card] is the effective miles-per-dollar,
+    cashback_rate[category, card] the cashback %, blocked[category, card]
+    the category block; all zero-rated where blocked. MCC blocks and
+    card rules are applied on lookup. Arrays are shared: treat results
+    as read-only.
+    """
+
+    def __init__(self, cards, categories):
+        self.cards = tuple(cards)
+        self.category_ids = {cat: i for i, cat in enumerate(sorted(categories))}
+        n_cat, n_cards = len(self.category_ids), len(self.cards)
+
+        self.mpd = np.zeros((n_cat, 4, n_cards))
+        self.cashback_rate = np.zeros((n_cat, n_cards))
+        self.blocked = np.zeros((n_cat, n_cards), dtype=bool)
+        for j, card in enumerate(self.cards):
+            cashback_rate = card.cashback_rate or 0.0
+            for cat, i in self.category_ids.items():
+                if cat in card.blocked_categories:
+                    self.blocked[i, j] = True
+                    continue
+                self.mpd[i, :, j] = card.category_rates.get(cat, card.default_rates)
+                self.cashback_rate[i, j] = cashback_rate
+
+        # mcc -> cards blocking it (only the handful of MCCs any card blocks)
+        self.mcc_blocked = {}
+        for j, card in enumerate(self.cards):
+            for mcc in card.blocked_mccs:
+                mask = self.mcc_blocked.setdefault(mcc, np.zeros(n_cards, dtype=bool))
+                mask[j] = True
+        self._index_rules()
+
+    def _index_rules(self):
+        # which cards have rules, and the merchants / currencies / amount
+        # thresholds any rule tests: everything else can't change a rate
+        self.rule_cards = tuple(j for j, card in enumerate(self.cards) if card.rule is not None)
+        merchants, currencies, thresholds = set(), set(), set()
+        for j in self.rule_cards:
+            card = self.cards[j]
+            merchants |= referenced(card.rules, "merchant")
+            currencies |= referenced(card.rules, "currency")
+            thresholds.update(card.amount_bounds)
+        self.rule_merchants = frozenset(merchants)
+        self.rule_currencies = frozenset(currencies)
+        self.thresholds = tuple(sorted(thresholds))
+
+    def rule_key(self, merchant: str, currency: str, amount: float) -> tuple:
+        """
+        (merchant, currency, amount band) reduced to what card rules can
+        tell apart: txns with equal keys (and equal category / online /
+        MCC / FCY) get the same rates.
+        """
+        if not self.rule_cards:
+            return ()
+        return (
+            merchant if merchant in self.rule_merchants else "",
+            currency if currency in self.rule_currencies else "",
+            bisect_right(self.thresholds, amount),
+        )
+
+    @classmethod
+    def from_arrays(cls, cards, categories, mpd, cashback_rate, blocked, mcc_blocked):
+        """
+        Wrap prebuilt arrays (e.g. views of a memory-mapped snapshot, see
+        ruleset_bin.py) instead of computing them. categories must be in
+        the row order of the arrays.
+        """
+        table = cls.__new__(cls)
+        table.cards = tuple(cards)
+        table.category_ids = {cat: i for i, cat in enumerate(categories)}
+        table.mpd = mpd
+        table.cashback_rate = cashback_rate
+        table.blocked = blocked
+        table.mcc_blocked = mcc_blocked
+        table._index_rules()
+        return table
+
+    def vectors(
+        self, category: str, is_online: bool, mcc: str, is_fcy: bool, index=None,
+        merchant: str = "", currency: str | None = None, amount: float = 0.0,
+    ):
+        """
+        Same result as rate_vectors(cards, ...) for this table's cards,
+        or for cards[index] when an index array is given.
+        """
+        i = self.category_ids.get(category)
+        if i is None:
+            # category no data file mentions: resolve the slow way
+            cards = self.cards if index is None else [self.cards[j] for j in index]
+            return rate_vectors(cards, category, is_online, mcc, is_fcy, merchant, currency, amount)
+
+        mpd = self.mpd[i, (2 if is_online else 0) + (1 if is_fcy else 0)]
+        cashback_rate = self.cashback_rate[i]
+        blocked = self.blocked[i]
+        mcc_mask = self.mcc_blocked.get(mcc) if mcc else None
+        if mcc_mask is not None:
+            blocked = blocked | mcc_mask
+            mpd = np.where(mcc_mask, 0.0, mpd)
+            cashback_rate = np.where(mcc_mask, 0.0, cashback_rate)
+        if self.rule_cards:
+            # patch copies, the table's rows are shared
+            mpd, cashback_rate, blocked = mpd.copy(), cashback_rate.copy(), blocked.copy()
+            for j in self.rule_cards:
+                if blocked[j]:
+                    continue
+                rates = self.cards[j].rates_for(category, is_online, mcc, is_fcy, merchant, currency, amount)
+                if rates is None:
+                    mpd[j] = cashback_rate[j] = 0.0
+                    blocked[j] = True
+                else:
+                    mpd[j] = rates[0]
+                    cashback_rate[j] = rates[1] or 0.0
+        if index is not None:
+            return mpd[index], cashback_rate[index], blocked[index]
+        return mpd, cashback_rate, blocked
+
+
+def _python_scores(amount: float, rates: np.ndarray, mode: str) -> list:
+    # same float ops + rounding as CompiledCard.rewards
+    if mode == "miles":
+        return [round(amount * float(r), 2) for r in rates]
+    return [round(amount * float(r) / 100, 2) if r else 0.0 for r in rates]
+
+
+def best_card_indices(amounts, mpd, cashback_rate, mode: str) -> np.ndarray:
+    """
+    Index of the best card for every amount, or -1 if none qualifies.
+
+    Matches recommend_card exactly: scores are compared after rounding to
+    2dp and the first card wins ties. Rows where rounding could reorder
+    near-equal scores are re-scored in Python.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    rates = mpd if mode == "miles" else cashback_rate
+    best = np.full(len(amounts), -1, dtype=np.int64)
+    if len(rates) == 0 or len(amounts) == 0:
+        return best
+
+    for start in range(0, len(amounts), CHUNK_ROWS):
+        chunk = amounts[start:start + CHUNK_ROWS]
+        scores = chunk[:, None] * rates[None, :]
+        if mode != "miles":
+            scores = scores / 100
+
+        idx = scores.argmax(axis=1)
+        top = scores[np.arange(len(chunk)), idx]
+        near = (scores < top[:, None]) & (scores >= top[:, None] - _ROUNDING_SLACK)
+        # recommend_card starts from best_score = -1.0, so rows near that
+        # floor (negative amounts) also need the exact rounded comparison
+        ambiguous_mask = near.any(axis=1) | (top < -1.0 + _ROUNDING_SLACK)
+        ambiguous = np.flatnonzero(ambiguous_mask)
+
+        for row in ambiguous:
+            rounded = _python_scores(float(chunk[row]), rates, mode)
+            best_score = -1.0
+            best_i = -1
+            for i, score in enumerate(rounded):
+                if score > best_score:
+                    best_score = score
+                    best_i = i
+            idx[row] = best_i
+
+        best[start:start + len(chunk)] = idx
+
+    return best
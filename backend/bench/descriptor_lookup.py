@@ -0,0 +1,66 @@
+"""
+Descriptor resolution benchmark: DescriptorIndex at 10 / 1k / 100k merchants.
+
+Descriptors come in four shapes: the name plus location and store number
+("ABCDEF SINGAPORE 123"), run together with a suffix ("ABCDEFSG*123"),
+truncated by one letter, and unknown merchants. Timings are per
+resolve() with no result cache in front.
+
+Run from backend/:
+    python -m bench.descriptor_lookup
+"""
+
+import random
+import time
+
+from bench.synthetic import synthetic_merchants
+from descriptor_index import DescriptorIndex
+
+SIZES = (10, 1_000, 100_000)
+LOOKUPS = 2_000
+SHAPES = ("words", "squashed", "truncated", "unknown")
+
+
+def synthetic_descriptors(merchants: dict, rng: random.Random) -> dict:
+    """{shape: [(descriptor, expected key or None)]}"""
+    keys = list(merchants)
+    out = {shape: [] for shape in SHAPES}
+    for i in range(LOOKUPS // len(SHAPES)):
+        key = rng.choice(keys)
+        out["words"].append((f"{key.upper()} SINGAPORE {rng.randint(100, 9999)}", key))
+        out["squashed"].append((f"{key.upper()}SG*{rng.randint(100, 9999)}", key))
+        out["truncated"].append((f"{key[:-1].upper()} PTE LTD", key))
+        out["unknown"].append((f"UNKNOWN SHOP {i} XYZZY", None))
+    return out
+
+
+def run(sizes=SIZES, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for n in sizes:
+        merchants = synthetic_merchants(n, rng)
+
+        start = time.perf_counter()
+        index = DescriptorIndex(merchants)
+        row = {"merchants": n, "build_ms": round((time.perf_counter() - start) * 1e3, 1)}
+
+        for shape, cases in synthetic_descriptors(merchants, rng).items():
+            start = time.perf_counter()
+            found = [index.resolve(text) for text, _ in cases]
+            elapsed = time.perf_counter() - start
+            row[f"{shape}_us"] = round(elapsed / len(cases) * 1e6, 1)
+            # truncated names can legitimately resolve to another (full) name
+            row[f"{shape}_correct"] = round(
+                sum((f[0] if f else None) == key for f, (_, key) in zip(found, cases)) / len(cases), 3
+            )
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"{'merchants':>10} {'build ms':>9}" + "".join(f" {s + ' us':>13} {'ok':>6}" for s in SHAPES))
+    for row in run():
+        print(
+            f"{row['merchants']:>10} {row['build_ms']:>9}"
+            + "".join(f" {row[s + '_us']:>13} {row[s + '_correct']:>6}" for s in SHAPES)
+        )
@@ -0,0 +1,350 @@
+"""
+Open-loop load test for POST /recommend-card.
+
+Requests go out on a fixed schedule (--rate per second, Poisson arrivals
+by default) whether or not earlier ones have come back, so a server that
+can't keep up shows as queueing latency instead of quietly lowering the
+offered load. Latency is measured from each request's scheduled send
+time, not from when the client got round to sending it.
+
+By default it starts one uvicorn worker running main:app on a free local
+port, either on the repo's data files or, with --cards, on a synthetic
+catalog compiled to a ruleset snapshot (several sizes give one run each,
+to see how p99 moves as cards_data.json grows). --url targets a server
+that is already running; the request mix then comes from the local data
+files.
+
+Request mix: merchants.json merchants plus unknown hosts, log-normal
+amounts, --fcy-share foreign-currency txns and enabled_cards wallets
+whose sizes are drawn from --wallets (0 = all cards).
+
+Prints a JSON report (throughput, p50/p95/p99/p999 latency, errors) and
+checks it against --slo limits; exits 1 if any SLO fails.
+
+Run from backend/:
+    python -m bench.load
+    python -m bench.load --rate 400 --duration 20 --cards 18 200 1000
+    python -m bench.load --url http://127.0.0.1:8000 --slo p99_ms=50 --slo error_rate=0.001
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from bench.synthetic import synthetic_cards, synthetic_mcc_data, synthetic_merchants
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ENDPOINT = "/recommend-card"
+FCY_CURRENCIES = ("USD", "MYR", "JPY", "EUR", "THB")
+TLDS = ("sg", "com", "com.sg")
+UNKNOWN_SHARE = 0.2  # hosts no merchant rule matches
+
+# upper limits, except min_rps
+SLO_METRICS = ("p50_ms", "p95_ms", "p99_ms", "p999_ms", "max_ms", "error_rate", "min_rps")
+DEFAULT_SLOS = {"p99_ms": 100.0, "error_rate": 0.001}
+
+
+def request_mix(n: int, merchants, card_names: list, rng: random.Random, fcy_share: float, wallets: list) -> list:
+    """n JSON request bodies (bytes), encoded up front so the client loop only sends."""
+    keys = list(merchants)
+    bodies = []
+    for i in range(n):
+        if keys and rng.random() >= UNKNOWN_SHARE:
+            key = rng.choice(keys)
+            host = key if "." in key else f"www.{key}.{rng.choice(TLDS)}"
+        else:
+            host = f"shop-{i}.example.{rng.choice(TLDS)}"
+        payload = {
+            "url": f"https://{host}/checkout",
+            "amount": round(rng.lognormvariate(4.0, 1.0), 2),
+            "currency": rng.choice(FCY_CURRENCIES) if rng.random() < fcy_share else "SGD",
+            "mode": rng.choice(("miles", "miles", "cashback")),
+        }
+        size = rng.choice(wallets)
+        if size and card_names:
+            payload["enabled_cards"] = rng.sample(card_names, min(size, len(card_names)))
+        bodies.append(json.dumps(payload).encode())
+    return bodies
+
+
+def arrival_offsets(n: int, rate: float, rng: random.Random, poisson: bool) -> list:
+    """Send times in seconds from the start of the run."""
+    offsets, t = [], 0.0
+    for i in range(n):
+        offsets.append(t)
+        t += rng.expovariate(rate) if poisson else 1.0 / rate
+    return offsets
+
+
+async def _send(client, body: bytes, scheduled: float, results: list):
+    loop = asyncio.get_running_loop()
+    try:
+        resp = await client.post(ENDPOINT, content=body, headers={"Content-Type": "application/json"})
+        outcome = "ok" if resp.status_code == 200 else str(resp.status_code)
+    except httpx.TimeoutException:
+        outcome = "timeout"
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    results.append((loop.time() - scheduled, outcome))
+
+
+async def drive(base_url: str, bodies: list, offsets: list, timeout: float, connections: int) -> dict:
+    """Fire bodies at their offsets; (latency s, outcome) per request plus how late sends were."""
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    results, lags = [], []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time() + 0.05
+        tasks = []
+        for body, offset in zip(bodies, offsets):
+            at = start + offset
+            delay = at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lags.append(max(0.0, loop.time() - at))
+            tasks.append(asyncio.create_task(_send(client, body, at, results)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+    return {"results": results, "lags": lags, "elapsed": elapsed}
+
+
+def _pct(samples: list, p: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+
+def summarize(run: dict, rate: float, duration: float) -> dict:
+    latencies = sorted(lat * 1e3 for lat, outcome in run["results"] if outcome == "ok")
+    errors = {}
+    for _, outcome in run["results"]:
+        if outcome != "ok":
+            errors[outcome] = errors.get(outcome, 0) + 1
+    total = len(run["results"])
+    lags = sorted(lag * 1e3 for lag in run["lags"])
+
+    latency = {"mean": None, "p50": None, "p95": None, "p99": None, "p999": None, "max": None}
+    if latencies:
+        latency = {
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(_pct(latencies, 50), 3),
+            "p95": round(_pct(latencies, 95), 3),
+            "p99": round(_pct(latencies, 99), 3),
+            "p999": round(_pct(latencies, 99.9), 3),
+            "max": round(latencies[-1], 3),
+        }
+    return {
+        "offered_rps": rate,
+        "duration_s": duration,
+        "requests": total,
+        "ok": len(latencies),
+        "elapsed_s": round(run["elapsed"], 3),
+        "achieved_rps": round(len(latencies) / run["elapsed"], 1) if run["elapsed"] else 0.0,
+        "latency_ms": latency,
+        "errors": errors,
+        "error_rate": round((total - len(latencies)) / total, 6) if total else 0.0,
+        # how late the client itself sent; if this is large the generator, not the server, was the bottleneck
+        "send_lag_ms": {"p99": round(_pct(lags, 99), 3), "max": round(lags[-1], 3)} if lags else None,
+    }
+
+
+def check_slos(summary: dict, slos: dict) -> dict:
+    """{metric: {"limit", "value", "pass"}}; a metric with no value (nothing succeeded) fails."""
+    out = {}
+    for metric, limit in slos.items():
+        if metric == "error_rate":
+            value = summary["error_rate"]
+        elif metric == "min_rps":
+            value = summary["achieved_rps"]
+        else:
+            value = summary["latency_ms"][metric[: -len("_ms")]]
+        if value is None:
+            ok = False
+        elif metric == "min_rps":
+            ok = value >= limit
+        else:
+            ok = value <= limit
+        out[metric] = {"limit": limit, "value": value, "pass": ok}
+    return out
+
+
+def parse_slos(values: list) -> dict:
+    slos = dict(DEFAULT_SLOS)
+    for item in values:
+        metric, sep, limit = item.partition("=")
+        if not sep or metric not in SLO_METRICS:
+            raise SystemExit(f"bad --slo {item!r}: use one of {', '.join(SLO_METRICS)} as metric=value")
+        try:
+            slos[metric] = float(limit)
+        except ValueError:
+            raise SystemExit(f"bad --slo {item!r}: {limit!r} is not a number")
+    return slos
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(proc, base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with code {proc.returncode} before it was ready")
+        try:
+            httpx.get(base_url + "/", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise SystemExit(f"server not ready after {timeout:.0f}s")
+
+
+@contextmanager
+def local_server(catalog=None):
+    """
+    Base URL of one uvicorn worker on a free port, stopped on exit.
+    catalog=(cards, mcc_data, merchants) serves that instead of the data
+    files, via a compiled snapshot. Ledger / profile DBs go to a temp dir.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {k: v for k, v in os.environ.items() if k != "SWIPESMART_RULESET_SNAPSHOT"}
+        env.update({
+            "SWIPESMART_WATCH_INTERVAL": "0",
+            "SWIPESMART_LEDGER_PATH": str(Path(tmp) / "ledger.db"),
+            "SWIPESMART_PROFILES_PATH": str(Path(tmp) / "profiles.db"),
+        })
+        if catalog is not None:
+            import ruleset
+            import ruleset_bin
+
+            path = Path(tmp) / "ruleset.snap"
+            ruleset_bin.compile_snapshot(ruleset.Ruleset(*catalog), path)
+            env["SWIPESMART_RULESET_SNAPSHOT"] = str(path)
+
+        port = _free_port()
+        cmd = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--no-access-log",
+        ]
+        proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            _wait_ready(proc, base_url)
+            yield base_url
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def _catalog(n_cards: int | None, n_merchants: int, seed: int):
+    """(cards, mcc_data, merchants) for --cards n, or the repo's data files for None."""
+    if n_cards is None:
+        from mcc_index import load_mcc_data
+        from merchant_index import load_merchants
+        from rules import load_cards
+
+        return load_cards(), load_mcc_data(), load_merchants()
+    rng = random.Random(seed)
+    return synthetic_cards(n_cards, rng), synthetic_mcc_data(1_000, rng), synthetic_merchants(n_merchants, rng)
+
+
+def run_once(base_url: str, catalog, args, slos: dict) -> dict:
+    cards, _, merchants = catalog
+    rng = random.Random(args.seed)
+    card_names = [c["name"] for c in cards]
+    n = max(1, int(args.rate * args.duration))
+    warmup = int(args.rate * args.warmup)
+
+    # 1) one request mix, warmup taken from its tail so measured requests are cold in the cache
+    bodies = request_mix(n + warmup, merchants, card_names, rng, args.fcy_share, args.wallets)
+    if warmup:
+        asyncio.run(drive(
+            base_url, bodies[n:], arrival_offsets(warmup, args.rate, rng, args.arrivals == "poisson"),
+            args.timeout, args.connections,
+        ))
+
+    # 2) the measured run
+    offsets = arrival_offsets(n, args.rate, rng, args.arrivals == "poisson")
+    summary = summarize(asyncio.run(drive(base_url, bodies[:n], offsets, args.timeout, args.connections)),
+                        args.rate, args.duration)
+    summary["slo"] = check_slos(summary, slos)
+    summary["pass"] = all(check["pass"] for check in summary["slo"].values())
+    return {"cards": len(cards), "merchants": len(merchants), **summary}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="running server to test instead of starting one")
+    parser.add_argument("--cards", type=int, nargs="+", help="synthetic catalog size(s) instead of the data files")
+    parser.add_argument("--merchants", type=int, default=20_000, help="synthetic merchants (with --cards)")
+    parser.add_argument("--rate", type=float, default=200.0, help="offered requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds first")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--fcy-share", type=float, default=0.2)
+    parser.add_argument("--wallets", type=int, nargs="+", default=[0, 0, 1, 3, 6],
+                        help="enabled_cards sizes to draw from, 0 = all cards")
+    parser.add_argument("--connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--slo", action="append", default=[], metavar="METRIC=VALUE",
+                        help=f"{', '.join(SLO_METRICS)} (default p99_ms=100, error_rate=0.001)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, help="also write the JSON report here")
+    args = parser.parse_args(argv)
+
+    if args.url and args.cards:
+        parser.error("--cards starts its own server; drop --url")
+    if args.rate <= 0 or args.duration <= 0:
+        parser.error("--rate and --duration must be positive")
+    slos = parse_slos(args.slo)
+
+    runs = []
+    for n_cards in args.cards or [None]:
+        catalog = _catalog(n_cards, args.merchants, args.seed)
+        if args.url:
+            runs.append({"target": args.url, **run_once(args.url.rstrip("/"), catalog, args, slos)})
+        else:
+            with local_server(catalog if n_cards is not None else None) as base_url:
+                runs.append({"target": "local uvicorn, 1 worker", **run_once(base_url, catalog, args, slos)})
+        r = runs[-1]
+        print(
+            f"{r['cards']:>6} cards: {r['achieved_rps']} req/s of {args.rate:g} offered, "
+            f"p50 {r['latency_ms']['p50']} ms, p99 {r['latency_ms']['p99']} ms, "
+            f"errors {r['error_rate']:.2%} -> {'PASS' if r['pass'] else 'FAIL'}",
+            file=sys.stderr,
+        )
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "endpoint": ENDPOINT,
+        "arrivals": args.arrivals,
+        "mix": {"fcy_share": args.fcy_share, "wallets": args.wallets, "unknown_share": UNKNOWN_SHARE},
+        "slos": slos,
+        "runs": runs,
+        "pass": all(r["pass"] for r in runs),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text)
+    return 0 if report["pass"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Merchant lookup benchmark: MerchantIndex vs the old linear substring scan.
+
+Run from backend/:
+    python -m bench.merchant_lookup
+"""
+
+import random
+import time
+
+from bench.synthetic import TLDS, synthetic_merchants
+from merchant_index import MerchantIndex
+
+SIZES = (10, 1_000, 100_000)
+LOOKUPS = 2_000
+
+
+def scan_lookup(merchant_map: dict, host: str):
+    """The pre-index get_merchant_info loop, kept for comparison."""
+    for key, info in merchant_map.items():
+        if key in host:
+            return info
+    return None
+
+
+def synthetic_hosts(merchants: dict, rng: random.Random) -> list:
+    keys = list(merchants)
+    hosts = []
+    for i in range(LOOKUPS):
+        if i % 2:
+            # hit: www.<brand>.<tld>
+            hosts.append(f"www.{rng.choice(keys)}.{rng.choice(TLDS)}")
+        else:
+            # miss: unknown merchant
+            hosts.append(f"shop.unknown-{i}.{rng.choice(TLDS)}")
+    return hosts
+
+
+def _per_lookup_us(fn, hosts) -> float:
+    start = time.perf_counter()
+    for host in hosts:
+        fn(host)
+    return (time.perf_counter() - start) / len(hosts) * 1e6
+
+
+def run(sizes=SIZES, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for n in sizes:
+        merchants = synthetic_merchants(n, rng)
+        hosts = synthetic_hosts(merchants, rng)
+
+        start = time.perf_counter()
+        index = MerchantIndex(merchants)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        # the scan is O(merchants) per lookup; sample fewer hosts at 100k
+        scan_hosts = hosts if n <= 1_000 else hosts[:50]
+        rows.append(
+            {
+                "merchants": n,
+                "index_build_ms": round(build_ms, 2),
+                "index_lookup_us": round(_per_lookup_us(index.lookup, hosts), 3),
+                "scan_lookup_us": round(
+                    _per_lookup_us(lambda h: scan_lookup(merchants, h), scan_hosts), 3
+                ),
+            }
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"{'merchants':>10} {'build ms':>10} {'index us':>10} {'scan us':>12}")
+    for row in run():
+        print(
+            f"{row['merchants']:>10} {row['index_build_ms']:>10} "
+            f"{row['index_lookup_us']:>10} {row['scan_lookup_us']:>12}"
+        )
@@ -0,0 +1,81 @@
+"""
+Month planner (optimizer.plan_month) benchmark.
+
+Plans synthetic months of log-normal txns over synthetic catalogs and
+reports best-of-REPEATS wall time, with the plan's uplift over greedy.
+Exits non-zero when the 3000 txn × 50 card plan takes longer than
+--max-seconds.
+
+Run from backend/:
+    python -m bench.month_plan
+    python -m bench.month_plan --txns 300 3000 10000 --cards 50 200
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from bench.synthetic import CATEGORIES, synthetic_cards
+from optimizer import plan_month
+from rules import compile_cards
+
+REPEATS = 3
+BUDGET_SIZE = (3000, 50)  # (txns, cards) held to --max-seconds
+
+
+def synthetic_month(n: int, rng: random.Random) -> list:
+    """n plan_month txns: (amount, (category, is_online, mcc, is_fcy))."""
+    return [
+        (round(rng.lognormvariate(3.5, 1.0), 2), (rng.choice(CATEGORIES), rng.random() < 0.5, "", rng.random() < 0.1))
+        for _ in range(n)
+    ]
+
+
+def run(txn_sizes=(300, 3000, 5000), card_sizes=(50,), mode: str = "miles", seed: int = 5) -> list:
+    rows = []
+    for n_cards in card_sizes:
+        cards = compile_cards(synthetic_cards(n_cards, random.Random(seed)))
+        for n_txns in txn_sizes:
+            txns = synthetic_month(n_txns, random.Random(seed + n_txns))
+            runs = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                result = plan_month(cards, txns, mode)
+                runs.append(time.perf_counter() - start)
+            rows.append(
+                {
+                    "txns": n_txns,
+                    "cards": n_cards,
+                    "seconds": round(min(runs), 3),
+                    "total": round(result["total"], 2),
+                    "greedy_total": round(result["greedy_total"], 2),
+                }
+            )
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--txns", type=int, nargs="+", default=[300, 3000, 5000])
+    parser.add_argument("--cards", type=int, nargs="+", default=[50])
+    parser.add_argument("--mode", default="miles", choices=("miles", "cashback"))
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    rows = run(args.txns, args.cards, args.mode, args.seed)
+    print(f"{'txns':>6} {'cards':>6} {'seconds':>8} {'total':>12} {'greedy':>12}")
+    for row in rows:
+        print(f"{row['txns']:>6} {row['cards']:>6} {row['seconds']:>8} {row['total']:>12} {row['greedy_total']:>12}")
+
+    ok = True
+    for row in rows:
+        if (row["txns"], row["cards"]) == BUDGET_SIZE:
+            ok = row["seconds"] <= args.max_seconds
+            print(f"{BUDGET_SIZE[0]} txns x {BUDGET_SIZE[1]} cards: {row['seconds']}s ({'within' if ok else 'OVER'} {args.max_seconds}s)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
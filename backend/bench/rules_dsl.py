@@ -0,0 +1,139 @@
+"""
+Card rule (rule_dsl.py) evaluation benchmark.
+
+Per card evaluation, in microseconds, over the same txn contexts:
+- hard-coded: compute_card_rewards on cards without rules (today's engine)
+- interpreted: compute_card_rewards on the same cards with rules, which
+  walks the rule JSON on every call
+- compiled: CompiledCard.rewards with the rules compiled at load time
+- compiled, no rules: CompiledCard.rewards on the rule-free cards
+plus the rules on their own (compiled closure vs interpret_rules) for a
+card with the most rules. Exits non-zero when compiled is more than
+--max-ratio times the hard-coded cost.
+
+Run from backend/:
+    python -m bench.rules_dsl
+    python -m bench.rules_dsl --cards 200 --share 1.0 --rules 8
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from bench.synthetic import synthetic_cards, synthetic_merchants, synthetic_requests, with_synthetic_rules
+from merchant_index import MerchantIndex
+from rule_dsl import interpret_rules
+from rules import category_chain, compile_cards, compute_card_rewards, txn_currency
+
+REPEATS = 5
+
+
+def _best_us(fn, contexts, per_call: int) -> float:
+    """Best-of-REPEATS time per evaluation."""
+    runs = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for ctx in contexts:
+            fn(*ctx)
+        runs.append((time.perf_counter() - start) / (len(contexts) * per_call) * 1e6)
+    return min(runs)
+
+
+def run(n_cards: int = 200, share: float = 0.3, max_rules: int = 4, n_contexts: int = 500, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    plain = synthetic_cards(n_cards, rng)
+    merchants = synthetic_merchants(2_000, rng)
+    ruled = with_synthetic_rules(plain, merchants, rng, share, max_rules)
+    compiled_plain, compiled_ruled = compile_cards(plain), compile_cards(ruled)
+
+    # 1) txn contexts: mostly known merchants, some amounts on rule thresholds
+    index = MerchantIndex(merchants)
+    contexts = []
+    for p in synthetic_requests(n_contexts, merchants, [], rng):
+        found = index.match(p["url"].split("/")[2])
+        merchant, (category, is_online, mcc) = found if found else ("", ("general", True, "0000"))
+        amount = rng.choice((p["amount"], 20, 50, 100))
+        contexts.append((amount, category, is_online, mcc, p["currency"], merchant))
+
+    # 2) whole-card evaluation
+    def reference(cards):
+        def fn(amount, category, is_online, mcc, currency, merchant):
+            for card in cards:
+                compute_card_rewards(card, amount, category, is_online, mcc, "miles", currency, merchant)
+        return fn
+
+    def compiled(cards):
+        def fn(amount, category, is_online, mcc, currency, merchant):
+            is_fcy = currency != "SGD"
+            for card in cards:
+                card.rewards(amount, category, is_online, mcc, is_fcy, merchant=merchant, currency=currency)
+        return fn
+
+    timings = {
+        "hard_coded_us": _best_us(reference(plain), contexts, n_cards),
+        "interpreted_us": _best_us(reference(ruled), contexts, n_cards),
+        "compiled_us": _best_us(compiled(compiled_ruled), contexts, n_cards),
+        "compiled_no_rules_us": _best_us(compiled(compiled_plain), contexts, n_cards),
+    }
+
+    # 3) rules alone, for the card with the most rules
+    raw = max(ruled, key=lambda c: len(c.get("rules", [])))
+    card = compiled_ruled[ruled.index(raw)]
+    rule_contexts = [
+        (merchant, category, is_online, mcc, txn_currency(currency != "SGD", currency), amount)
+        for amount, category, is_online, mcc, currency, merchant in contexts
+    ]
+    chains = {ctx[1]: category_chain(ctx[1]) for ctx in rule_contexts}
+    timings["rules_per_card"] = len(raw.get("rules", []))
+    timings["rules_compiled_us"] = _best_us(card.rule, rule_contexts, 1)
+    timings["rules_interpreted_us"] = _best_us(
+        lambda m, cat, o, mcc, cur, a: interpret_rules(raw["rules"], m, chains[cat], o, mcc, cur, a),
+        rule_contexts,
+        1,
+    )
+
+    rule_cards = sum(1 for c in ruled if c.get("rules"))
+    return {
+        "cards": n_cards,
+        "cards_with_rules": rule_cards,
+        "rules": sum(len(c.get("rules", [])) for c in ruled),
+        **{k: round(v, 3) if isinstance(v, float) else v for k, v in timings.items()},
+        "compiled_vs_hard_coded": round(timings["compiled_us"] / timings["hard_coded_us"], 2),
+        "interpreted_vs_hard_coded": round(timings["interpreted_us"] / timings["hard_coded_us"], 2),
+        "compiled_vs_no_rules": round(timings["compiled_us"] / timings["compiled_no_rules_us"], 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--share", type=float, default=0.3, help="fraction of cards that get rules")
+    parser.add_argument("--rules", type=int, default=4, help="max rules per card")
+    parser.add_argument("--contexts", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-ratio", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    row = run(args.cards, args.share, args.rules, args.contexts, args.seed)
+    print(f"{row['cards']} cards, {row['cards_with_rules']} with rules ({row['rules']} rules)")
+    print(f"  {'per card eval':<28} {'us':>8} {'x hard-coded':>13}")
+    for label, key in (
+        ("hard-coded (no rules)", "hard_coded_us"),
+        ("interpreted rules", "interpreted_us"),
+        ("compiled rules", "compiled_us"),
+        ("compiled, no rules", "compiled_no_rules_us"),
+    ):
+        print(f"  {label:<28} {row[key]:>8} {row[key] / row['hard_coded_us']:>13.2f}")
+    print(
+        f"  rules only, {row['rules_per_card']}-rule card: compiled {row['rules_compiled_us']} us, "
+        f"interpreted {row['rules_interpreted_us']} us"
+    )
+
+    ok = row["compiled_vs_hard_coded"] <= args.max_ratio
+    print(f"compiled / hard-coded = {row['compiled_vs_hard_coded']} ({'within' if ok else 'OVER'} {args.max_ratio}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Recommendation hot-path benchmark suite.
+
+For each synthetic catalog size it measures:
+- compute_card_rewards (reference) vs CompiledCard.rewards, per card
+- get_merchant_info, per lookup
+- recommend_card called in-process, uncached and cached
+- POST /recommend-card through the FastAPI TestClient (p50/p95/p99),
+  full and slim (top_k / fields / include_reason=false), with bytes
+- bytes allocated per uncached recommend_card call (tracemalloc)
+
+Results go to bench/results/<timestamp>[-label].json so runs can be
+compared over time. Everything is offline and seeded.
+
+Run from backend/:
+    python -m bench.run
+    python -m bench.run --cards 18 200 1000 --label after-change
+    python -m bench.run --compare bench/results/a.json bench/results/b.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import main
+import ruleset
+from bench.synthetic import synthetic_cards, synthetic_mcc_data, synthetic_merchants, synthetic_requests
+from rules import compute_card_rewards
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+DEFAULT_CARD_SIZES = (18, 200, 1000)
+DEFAULT_MERCHANTS = 100_000
+DEFAULT_MCCS = 1_000
+
+# what the popup needs: a few rows, no per-card notes, no reason text
+SLIM_VIEW = {"top_k": 5, "fields": ["card_name", "miles", "cashback"], "include_reason": False}
+
+
+def _percentiles(samples_us: list) -> dict:
+    samples = sorted(samples_us)
+
+    def pct(p):
+        return round(samples[min(len(samples) - 1, int(p / 100 * len(samples)))], 3)
+
+    return {
+        "mean_us": round(statistics.fmean(samples), 3),
+        "p50_us": pct(50),
+        "p95_us": pct(95),
+        "p99_us": pct(99),
+        "n": len(samples),
+    }
+
+
+def _timed(fn, args_list) -> list:
+    out = []
+    for args in args_list:
+        start = time.perf_counter_ns()
+        fn(*args)
+        out.append((time.perf_counter_ns() - start) / 1e3)
+    return out
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_catalog(n_cards: int, n_merchants: int, n_mccs: int, n_requests: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    cards = synthetic_cards(n_cards, rng)
+    merchants = synthetic_merchants(n_merchants, rng)
+    mcc_data = synthetic_mcc_data(n_mccs, rng)
+
+    start = time.perf_counter()
+    snapshot = ruleset.install(ruleset.Ruleset(cards, mcc_data, merchants))
+    load_ms = (time.perf_counter() - start) * 1e3
+
+    card_names = [c["name"] for c in cards]
+    payloads = synthetic_requests(n_requests, merchants, card_names, rng)
+    reqs = [main.RecommendationRequest(**p) for p in payloads]
+    contexts = []
+    for r in reqs:
+        category, is_online, mcc = main.get_merchant_info(r.url)
+        contexts.append((r.amount, main.category_from_mcc(mcc, category), is_online, mcc, r.currency))
+
+    # per-card rule evaluation (sampled so large catalogs stay quick)
+    sample = contexts[: max(1, 20_000 // n_cards)]
+    ref = _timed(
+        lambda a, cat, o, m, cur: [compute_card_rewards(c, a, cat, o, m, "miles", cur) for c in cards],
+        sample,
+    )
+    fast = _timed(
+        lambda a, cat, o, m, cur: [c.rewards(a, cat, o, m, cur != "SGD") for c in snapshot.compiled_cards],
+        sample,
+    )
+
+    merchant = _timed(main.get_merchant_info, [(r.url,) for r in reqs])
+
+    # unique amounts -> every call misses the cache
+    main.RESULT_CACHE.clear()
+    uncached = _timed(main.recommend_card, [(r,) for r in reqs])
+    cached = _timed(main.recommend_card, [(reqs[0],)] * len(reqs))
+
+    tracemalloc.start()
+    allocated = []
+    for r in reqs[:200]:
+        main.RESULT_CACHE.clear()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        main.recommend_card(r)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - before)
+    tracemalloc.stop()
+
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    main.RESULT_CACHE.clear()
+    sizes = {"full": [], "slim": []}
+
+    def post(p, view):
+        sizes[view].append(len(client.post("/recommend-card", json=p).content))
+
+    endpoint = _timed(post, [(p, "full") for p in payloads])
+    main.RESULT_CACHE.clear()
+    slim = _timed(post, [({**p, **SLIM_VIEW}, "slim") for p in payloads])
+
+    return {
+        "cards": n_cards,
+        "merchants": n_merchants,
+        "mccs": n_mccs,
+        "ruleset_load_ms": round(load_ms, 2),
+        "reference_rewards_per_card": _percentiles([t / n_cards for t in ref]),
+        "compiled_rewards_per_card": _percentiles([t / n_cards for t in fast]),
+        "get_merchant_info": _percentiles(merchant),
+        "recommend_card_uncached": _percentiles(uncached),
+        "recommend_card_cached": _percentiles(cached),
+        "endpoint_recommend_card": _percentiles(endpoint),
+        "endpoint_recommend_card_slim": _percentiles(slim),
+        "response_bytes": {view: int(statistics.fmean(n)) for view, n in sizes.items()},
+        "peak_bytes_per_request": {
+            "mean": int(statistics.fmean(allocated)),
+            "max": max(allocated),
+        },
+    }
+
+
+def run(card_sizes, n_merchants, n_mccs, n_requests, seed) -> dict:
+    original = ruleset.current()
+    try:
+        catalogs = [
+            bench_catalog(n, n_merchants, n_mccs, n_requests, seed) for n in card_sizes
+        ]
+    finally:
+        ruleset.install(original)
+        main.RESULT_CACHE.clear()
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "requests_per_catalog": n_requests,
+        "catalogs": catalogs,
+    }
+
+
+def compare(old_path: Path, new_path: Path):
+    """Print p50 changes between two result files, per catalog size."""
+    old = {c["cards"]: c for c in json.loads(old_path.read_text())["catalogs"]}
+    new = {c["cards"]: c for c in json.loads(new_path.read_text())["catalogs"]}
+    for n in sorted(old.keys() & new.keys()):
+        print(f"--- {n} cards ---")
+        for metric, value in new[n].items():
+            if not isinstance(value, dict) or "p50_us" not in value:
+                continue
+            before, after = old[n][metric]["p50_us"], value["p50_us"]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"{metric:32} {before:>10.2f} -> {after:>10.2f} us  ({change:+.1f}%)")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, nargs="+", default=list(DEFAULT_CARD_SIZES))
+    parser.add_argument("--merchants", type=int, default=DEFAULT_MERCHANTS)
+    parser.add_argument("--mccs", type=int, default=DEFAULT_MCCS)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = run(args.cards, args.merchants, args.mccs, args.requests, args.seed)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    out = RESULTS_DIR / f"{stamp}{'-' + args.label if args.label else ''}.json"
+    out.write_text(json.dumps(result, indent=2))
+
+    for c in result["catalogs"]:
+        print(
+            f"{c['cards']:>6} cards: recommend_card p50 {c['recommend_card_uncached']['p50_us']}us, "
+            f"endpoint p50 {c['endpoint_recommend_card']['p50_us']}us "
+            f"(slim {c['endpoint_recommend_card_slim']['p50_us']}us), "
+            f"{c['peak_bytes_per_request']['mean']} B/request"
+        )
+    print(f"saved {out}")
+
+
+if __name__ == "__main__":
+    main_cli()
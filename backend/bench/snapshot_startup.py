@@ -0,0 +1,183 @@
+"""
+Worker startup time and memory: JSON data files vs the compiled binary
+snapshot (ruleset_bin.py).
+
+Writes a synthetic catalog as data files, compiles it, then starts
+--workers fresh processes per mode side by side, like uvicorn workers.
+Each one does a worker's full `import main` (the ruleset is loaded at
+import) with the catalog wired in through the environment, touches every
+merchant entry and reports:
+- import_ms: `import main` inside the process
+- ready_ms: process spawn to imported, interpreter startup included
+- rss_mb: resident memory, counting shared pages in full
+- pss_mb: proportional set size, where shared pages are split between
+  the processes mapping them (Linux only; this is what sharing saves)
+
+"json" points SWIPESMART_CARDS_PATH / _MCC_PATH / _MERCHANTS_PATH at the
+catalog; "snapshot" sets SWIPESMART_RULESET_SNAPSHOT. "baseline" only
+imports the third-party stack main uses (fastapi, numpy), so the other
+rows can be read relative to it.
+
+Run from backend/:
+    python -m bench.snapshot_startup
+    python -m bench.snapshot_startup --cards 1000 --merchants 100000 --workers 8
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench.synthetic import synthetic_cards, synthetic_mcc_data, synthetic_merchants
+
+MODES = ("baseline", "json", "snapshot")
+
+
+def _memory_mb() -> dict:
+    """Rss / Pss of this process from /proc (None where unavailable)."""
+    out = {"rss_mb": None, "pss_mb": None}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    out[f"{key.lower()}_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        out["rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return out
+
+
+def child(mode: str):
+    """One worker: import, report import time, wait for the go-ahead, report memory."""
+    start = time.perf_counter()
+    if mode == "baseline":
+        import fastapi  # noqa: F401
+        import numpy  # noqa: F401
+    else:
+        import main  # noqa: F401  (loads the ruleset named by the environment)
+    import_ms = (time.perf_counter() - start) * 1e3
+
+    if mode != "baseline":
+        import ruleset
+
+        # a long-running worker ends up touching all of it
+        snapshot = ruleset.current()
+        merchants = snapshot.merchants
+        for key in merchants:
+            merchants[key]
+        float(snapshot.rate_table.mpd.sum())
+
+    print(json.dumps({"import_ms": round(import_ms, 2)}), flush=True)
+    sys.stdin.readline()  # measure once every worker has loaded
+    print(json.dumps(_memory_mb()), flush=True)
+    sys.stdin.readline()
+
+
+def _env(mode: str, data_dir: Path) -> dict:
+    env = {k: v for k, v in os.environ.items() if not k.startswith("SWIPESMART_")}
+    env["SWIPESMART_WATCH_INTERVAL"] = "0"
+    if mode == "json":
+        env["SWIPESMART_CARDS_PATH"] = str(data_dir / "cards_data.json")
+        env["SWIPESMART_MCC_PATH"] = str(data_dir / "mcc_data.json")
+        env["SWIPESMART_MERCHANTS_PATH"] = str(data_dir / "merchants.json")
+    elif mode == "snapshot":
+        env["SWIPESMART_RULESET_SNAPSHOT"] = str(data_dir / "ruleset.snap")
+    return env
+
+
+def _write_catalog(data_dir: Path, n_cards: int, n_merchants: int, seed: int):
+    import ruleset
+    import ruleset_bin
+
+    rng = random.Random(seed)
+    cards = synthetic_cards(n_cards, rng)
+    merchants = synthetic_merchants(n_merchants, rng)
+    mcc_data = synthetic_mcc_data(1_000, rng)
+
+    (data_dir / "cards_data.json").write_text(json.dumps(cards))
+    (data_dir / "mcc_data.json").write_text(json.dumps(mcc_data))
+    rows = [
+        {"match": match, "category": cat, "online": online, "mcc": mcc}
+        for match, (cat, online, mcc) in merchants.items()
+    ]
+    (data_dir / "merchants.json").write_text(json.dumps(rows))
+    size = ruleset_bin.compile_snapshot(ruleset.Ruleset(cards, mcc_data, merchants), data_dir / "ruleset.snap")
+    return size
+
+
+def _run_mode(mode: str, data_dir: Path, workers: int) -> dict:
+    cmd = [sys.executable, "-m", "bench.snapshot_startup", "--child", mode]
+    spawned = time.perf_counter()
+    procs = [
+        subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=_env(mode, data_dir))
+        for _ in range(workers)
+    ]
+    try:
+        imports, ready = [], []
+        for p in procs:
+            imports.append(json.loads(p.stdout.readline())["import_ms"])
+            ready.append(round((time.perf_counter() - spawned) * 1e3, 1))
+        for p in procs:
+            p.stdin.write("\n")
+            p.stdin.flush()
+        mems = [json.loads(p.stdout.readline()) for p in procs]
+    finally:
+        for p in procs:
+            p.communicate("\n")
+
+    def total(key):
+        values = [m[key] for m in mems]
+        return None if None in values else round(sum(values), 1)
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "import_ms_mean": round(sum(imports) / len(imports), 2),
+        "import_ms_max": max(imports),
+        "ready_ms_max": max(ready),
+        "rss_mb_total": total("rss_mb"),
+        "pss_mb_total": total("pss_mb"),
+    }
+
+
+def run(n_cards: int, n_merchants: int, workers: int, seed: int = 7) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        size = _write_catalog(data_dir, n_cards, n_merchants, seed)
+        json_size = sum((data_dir / name).stat().st_size for name in ("cards_data.json", "mcc_data.json", "merchants.json"))
+        print(f"{n_cards} cards, {n_merchants} merchants: JSON {json_size / 1e6:.1f} MB, snapshot {size / 1e6:.1f} MB")
+        return [_run_mode(mode, data_dir, workers) for mode in MODES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=1_000)
+    parser.add_argument("--merchants", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--child", metavar="MODE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    rows = run(args.cards, args.merchants, args.workers, args.seed)
+    print(f"{'mode':<10}{'workers':>8}{'import ms':>11}{'max ms':>10}{'ready ms':>10}{'RSS MB':>10}{'PSS MB':>10}")
+    for r in rows:
+        print(
+            f"{r['mode']:<10}{r['workers']:>8}{r['import_ms_mean']:>11}{r['import_ms_max']:>10}{r['ready_ms_max']:>10}"
+            f"{r['rss_mb_total'] or '-':>10}{r['pss_mb_total'] or '-':>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
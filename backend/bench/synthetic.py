@@ -0,0 +1,145 @@
+"""
+Synthetic data generators for benchmarks: card catalogs, merchant maps,
+MCC tables and request mixes that look like the real data files but at
+any size. Everything is driven by a seeded random.Random, so runs are
+reproducible.
+"""
+
+import random
+import string
+
+CATEGORIES = (
+    "shopping", "online_shopping", "groceries", "dining", "fast_food",
+    "travel", "travel_air", "travel_hotel", "travel_agency", "transport",
+    "ride_hailing", "entertainment", "utilities", "telecom", "education",
+    "healthcare", "insurance", "govt", "quasi_cash", "general",
+)
+ISSUERS = ("DBS", "Citi", "UOB", "OCBC", "HSBC", "SCB", "Maybank", "AMEX")
+TLDS = ("sg", "com", "com.sg", "com.my", "co.id")
+CURRENCIES = ("SGD",) * 4 + ("USD", "MYR", "JPY")
+
+
+def _word(rng: random.Random, lo: int = 5, hi: int = 12) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(lo, hi)))
+
+
+def synthetic_cards(n: int, rng: random.Random) -> list[dict]:
+    """n cards in cards_data.json shape with a realistic mix of rules."""
+    cards = []
+    for i in range(n):
+        is_miles = rng.random() < 0.6
+        base = round(rng.uniform(0.4, 1.4), 1) if is_miles else 0
+        card = {
+            "name": f"{rng.choice(ISSUERS)} Synthetic {i}",
+            "issuer": rng.choice(ISSUERS),
+            "type": "miles" if is_miles else "cashback",
+            "base_mpd": base,
+            "fcy_mpd": round(rng.uniform(1.5, 3.0), 1) if is_miles and rng.random() < 0.7 else None,
+            "online_mpd": 4.0 if is_miles and rng.random() < 0.3 else None,
+            "category_mpd": {
+                c: round(rng.uniform(1.0, 8.0), 1)
+                for c in rng.sample(CATEGORIES, rng.randint(0, 3))
+            },
+            "blocked_categories": rng.sample(("insurance", "govt", "quasi_cash", "travel"), rng.randint(0, 3)),
+            "blocked_mccs": ["6300"] if rng.random() < 0.5 else [],
+            "bonus_cap_amount": rng.choice((None, None, 300, 600, 1000, 2000)),
+            "cashback_rate": 0.0 if is_miles else round(rng.uniform(0.5, 10.0), 1),
+            "annual_fee": rng.choice((0, 80, 180, 194.4, 256.8)),
+            "annual_fee_waivable": rng.random() < 0.9,
+            "notes": f"Synthetic card {i}.",
+        }
+        if is_miles and rng.random() < 0.3:
+            card["no_fcy_bonus"] = True
+        cards.append(card)
+    return cards
+
+
+def synthetic_rules(rng: random.Random, merchant_keys: list, n_rules: int) -> list[dict]:
+    """
+    n_rules card rules (rule_dsl.py) over the given merchants: partner
+    merchant boosts, MCC range blocks, amount-banded category bonuses and
+    FCY-only offers.
+    """
+    rules = []
+    for k in range(n_rules):
+        kind = rng.randrange(4)
+        if kind == 0 and merchant_keys:
+            when = {"merchant": rng.sample(merchant_keys, min(len(merchant_keys), rng.randint(1, 8)))}
+            then = {"cashback_rate": round(rng.uniform(5.0, 20.0), 1)}
+        elif kind == 1:
+            lo = rng.randint(4000, 9000)
+            when = {"mcc": [f"{lo}-{lo + rng.randint(0, 50)}", str(rng.randint(4000, 9999))]}
+            then = {"block": True}
+        elif kind == 2:
+            when = {"category": rng.sample(CATEGORIES, 2), "amount": {"min": rng.choice((20, 50, 100))}}
+            then = {"mpd": round(rng.uniform(2.0, 6.0), 1)}
+        else:
+            when = {"online": True, "not": {"currency": ["SGD"]}}
+            then = {"mpd": round(rng.uniform(2.0, 4.0), 1), "cashback_rate": round(rng.uniform(1.0, 5.0), 1)}
+        rules.append({"name": f"synthetic rule {k}", "when": when, "then": then})
+    return rules
+
+
+def with_synthetic_rules(cards: list, merchants: dict, rng: random.Random, share: float = 0.3, max_rules: int = 4):
+    """Copies of cards, share of them given 1..max_rules synthetic rules."""
+    keys = list(merchants)
+    out = []
+    for card in cards:
+        card = dict(card)
+        if rng.random() < share:
+            card["rules"] = synthetic_rules(rng, keys, rng.randint(1, max_rules))
+        out.append(card)
+    return out
+
+
+def synthetic_merchants(n: int, rng: random.Random) -> dict:
+    """{brand label: (category, is_online, mcc)}, like load_merchants()."""
+    merchants = {}
+    while len(merchants) < n:
+        merchants[_word(rng)] = (
+            rng.choice(CATEGORIES),
+            rng.random() < 0.7,
+            str(rng.randint(3000, 9999)),
+        )
+    return merchants
+
+
+def synthetic_mcc_data(n: int, rng: random.Random) -> dict:
+    """mcc_data.json-shaped document: the brand ranges plus up to n exact codes."""
+    pool = [c for c in range(1000, 10000) if not 3000 <= c <= 3999]
+    codes = sorted(rng.sample(pool, min(n, len(pool))))
+    return {
+        "ranges": [
+            {"from": "3000", "to": "3299", "category": "travel_air", "label": "Airlines"},
+            {"from": "3351", "to": "3441", "category": "car_rental", "label": "Car rental agencies"},
+            {"from": "3501", "to": "3999", "category": "travel_hotel", "label": "Hotels and resorts"},
+        ],
+        "codes": [
+            {"mcc": f"{code:04d}", "category": rng.choice(CATEGORIES), "label": f"Synthetic {code}"}
+            for code in codes
+        ],
+    }
+
+
+def synthetic_requests(n: int, merchants: dict, card_names: list, rng: random.Random) -> list[dict]:
+    """
+    /recommend-card payloads: mostly known merchants, log-normal amounts,
+    some FCY, and a mix of all-cards and small enabled_cards wallets.
+    """
+    keys = list(merchants)
+    requests = []
+    for i in range(n):
+        if keys and rng.random() < 0.8:
+            host = f"www.{rng.choice(keys)}.{rng.choice(TLDS)}"
+        else:
+            host = f"shop-{i}.example.{rng.choice(TLDS)}"
+        payload = {
+            "url": f"https://{host}/checkout",
+            "amount": round(rng.lognormvariate(4.0, 1.0), 2),
+            "currency": rng.choice(CURRENCIES),
+            "mode": rng.choice(("miles", "miles", "cashback")),
+        }
+        if card_names and rng.random() < 0.5:
+            payload["enabled_cards"] = rng.sample(card_names, min(len(card_names), rng.randint(1, 6)))
+        requests.append(payload)
+    return requests
@@ -0,0 +1,184 @@
+"""
+Break-even amounts between cards for one merchant context.
+
+For a fixed context a card's earn is piecewise linear in the amount:
+the bonus rate up to what's left of bonus_cap_amount, then the base rate
+(the cap-aware model of CompiledCard._cap_split_rewards; with no cap it's
+a single line through the origin). Card rules with amount conditions
+(rule_dsl.py) change the rates at their thresholds, so such a card's
+curve is built band by band and may jump there; pieces start inclusive,
+like the rules' amount min. The best card for every amount is
+the upper envelope of those curves, built by divide and conquer: split
+the cards in half, build each half's envelope, merge the two by walking
+their breakpoints and splitting pieces where the lines cross. An envelope
+of n such curves has O(n) pieces, so this is O(n log n) overall. All
+arithmetic is in Fractions of the rates as written in the data (1.4 is
+7/5, not the nearest binary float), so crossovers are exact, not
+sampled, for the unrounded earn.
+
+Ties go to the card listed first, like recommend_card.
+"""
+
+from fractions import Fraction
+
+_ZERO = Fraction(0)
+
+
+def _q(x) -> Fraction:
+    # via repr: the shortest decimal that round-trips, i.e. what the data file says
+    return Fraction(repr(float(x)))
+
+
+def _band_curve(card, rates, is_online: bool, is_fcy: bool, mode: str, cap_used: float) -> list:
+    """Pieces on [0, inf) if rates = card.rates_for(...) held for every amount."""
+    if rates is None:  # blocked
+        return [(_ZERO, _ZERO, _ZERO)]
+    mpd, cashback_rate = rates
+    slot = (2 if is_online else 0) + (1 if is_fcy else 0)
+    if mode == "miles":
+        rate = _q(mpd)
+        base = _q(min(mpd, card.base_rates[slot]))
+    elif cashback_rate:
+        rate = _q(cashback_rate) / 100
+        base = _q(min(cashback_rate, card.base_cashback_rate)) / 100
+    else:
+        return [(_ZERO, _ZERO, _ZERO)]
+
+    cap = card.bonus_cap_amount
+    if not cap or rate == base:
+        return [(_ZERO, rate, _ZERO)]
+    remaining = max(_q(cap) - _q(cap_used), _ZERO)
+    if remaining == 0:
+        return [(_ZERO, base, _ZERO)]
+    # past the cap: bonus on `remaining`, base on the rest
+    return [(_ZERO, rate, _ZERO), (remaining, base, (rate - base) * remaining)]
+
+
+def earn_curve(
+    card, category: str, is_online: bool, mcc: str, is_fcy: bool, mode: str, cap_used: float = 0.0,
+    merchant: str = "", currency: str | None = None,
+) -> list:
+    """
+    Pieces [(start, slope, intercept)] of the card's earn on [0, inf),
+    starts ascending from 0. Earn is miles, or cashback in dollars.
+    """
+    bounds = [_q(b) for b in card.amount_bounds if b > 0]
+    if not bounds:
+        rates = card.rates_for(category, is_online, mcc, is_fcy, merchant, currency, 0.0)
+        return _band_curve(card, rates, is_online, is_fcy, mode, cap_used)
+
+    # one band per pair of thresholds; the rules answer the same for any amount inside
+    pieces = []
+    for lo, hi in zip([_ZERO] + bounds, bounds + [None]):
+        rates = card.rates_for(category, is_online, mcc, is_fcy, merchant, currency, float(lo))
+        band = _band_curve(card, rates, is_online, is_fcy, mode, cap_used)
+        for k, (start, slope, intercept) in enumerate(band):
+            end = band[k + 1][0] if k + 1 < len(band) else None
+            if (end is not None and end <= lo) or (hi is not None and start >= hi):
+                continue
+            start = max(start, lo)
+            if pieces and pieces[-1][1:] == (slope, intercept):
+                continue
+            pieces.append((start, slope, intercept))
+    return pieces
+
+
+def _append(out: list, start, slope, intercept, card: int):
+    last = out[-1] if out else None
+    if last is not None and last[1:] == (slope, intercept, card):
+        return
+    out.append((start, slope, intercept, card))
+
+
+def _merge(f_env: list, g_env: list) -> list:
+    """Upper envelope of two envelopes; f_env wins ties (it holds the lower card indices)."""
+    starts = sorted({p[0] for p in f_env} | {p[0] for p in g_env})
+    out = []
+    i = j = 0
+    for k, x0 in enumerate(starts):
+        while i + 1 < len(f_env) and f_env[i + 1][0] <= x0:
+            i += 1
+        while j + 1 < len(g_env) and g_env[j + 1][0] <= x0:
+            j += 1
+        x1 = starts[k + 1] if k + 1 < len(starts) else None
+        f, g = f_env[i], g_env[j]
+
+        # d(x) = f(x) - g(x); the sign just right of x0 picks the winner
+        ds = f[1] - g[1]
+        dc = f[2] - g[2]
+        d0 = ds * x0 + dc
+        f_wins = d0 > 0 or (d0 == 0 and ds >= 0)
+        win, lose = (f, g) if f_wins else (g, f)
+        _append(out, x0, *win[1:])
+
+        # the loser overtakes inside this interval?
+        if ds != 0:
+            xc = -dc / ds
+            if xc > x0 and (x1 is None or xc < x1):
+                _append(out, xc, *lose[1:])
+    return out
+
+
+def upper_envelope(curves: list) -> list:
+    """
+    Envelope pieces [(start, slope, intercept, card index)] of
+    curves[i] = earn_curve(...) for card i.
+    """
+
+    def build(lo, hi):
+        if hi - lo == 1:
+            return [(start, slope, intercept, lo) for start, slope, intercept in curves[lo]]
+        mid = (lo + hi) // 2
+        return _merge(build(lo, mid), build(mid, hi))
+
+    return build(0, len(curves)) if curves else []
+
+
+def break_even(
+    cards, category: str, is_online: bool, mcc: str, is_fcy: bool, mode: str, cap_used=None,
+    merchant: str = "", currency: str | None = None,
+) -> dict:
+    """
+    Best card per amount interval plus the crossover amounts.
+    cap_used: {card name: spend this month} (empty = a fresh month).
+    """
+    cap_used = cap_used or {}
+    curves = [
+        earn_curve(card, category, is_online, mcc, is_fcy, mode, cap_used.get(card.name, 0.0), merchant, currency)
+        for card in cards
+    ]
+    envelope = upper_envelope(curves)
+
+    # 1) consecutive pieces of the same card are one interval (its cap kink isn't a crossover)
+    intervals = []
+    for start, slope, intercept, i in envelope:
+        if intervals and intervals[-1]["card"] == i:
+            continue
+        if intervals:
+            intervals[-1]["to"] = start
+        intervals.append({"from": start, "to": None, "card": i, "slope": slope, "intercept": intercept})
+
+    # 2) crossovers between neighbouring intervals
+    crossovers = []
+    for prev, cur in zip(intervals, intervals[1:]):
+        x = cur["from"]
+        crossovers.append(
+            {
+                "amount": float(x),
+                "from_card": cards[prev["card"]].name,
+                "to_card": cards[cur["card"]].name,
+                "earn": round(float(cur["slope"] * x + cur["intercept"]), 4),
+            }
+        )
+
+    return {
+        "intervals": [
+            {
+                "from": float(iv["from"]),
+                "to": None if iv["to"] is None else float(iv["to"]),
+                "best_card": cards[iv["card"]].name,
+            }
+            for iv in intervals
+        ],
+        "crossovers": crossovers,
+    }
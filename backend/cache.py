@@ -0,0 +1,100 @@
+"""
+Bounded in-process cache for /recommend-card responses.
+
+Entries are evicted LRU once maxsize is reached and expire after ttl
+seconds. Every get/put carries the ruleset version the answer was (or
+will be) computed with, and entries are stored under (version, key), so
+a data change can never serve a stale recommendation. During a reload,
+requests still holding the old snapshot and requests on the new one
+each see their own entries instead of wiping each other's; the old
+version's entries age out through the LRU and TTL.
+
+All operations take a lock, so it is safe to share across uvicorn's
+threadpool workers running the sync endpoint. Cached values are shared
+between callers and must be treated as read-only.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # (version, key) -> (expires_at, value)
+        self._version = None  # newest version seen
+        self._versions = OrderedDict()  # recently seen versions, for the invalidations count
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        # caller holds the lock; counts each new version once, however
+        # often old and new snapshots alternate while it rolls out
+        if version in self._versions:
+            self._versions.move_to_end(version)
+            return
+        if self._versions:
+            self.invalidations += 1
+        self._versions[version] = None
+        if len(self._versions) > 8:
+            self._versions.popitem(last=False)
+        self._version = version
+
+    def get(self, key, version):
+        """Cached value for key under this ruleset version, or None."""
+        with self._lock:
+            self._check_version(version)
+            key = (version, key)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version):
+        with self._lock:
+            self._check_version(version)
+            key = (version, key)
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
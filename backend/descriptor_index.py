@@ -0,0 +1,178 @@
+"""
+Free-text merchant descriptor → merchant.
+
+Statements and card terminals name merchants like "SHOPEE SINGAPORE MP"
+or "COLD STORAGE-JEWEL 0234", not URLs. DescriptorIndex resolves those
+against the merchants.json rules: every rule gives a name (a brand
+label, or a domain without www and TLD labels, so "mall.shopee.sg" is
+"mall shopee") and any "aliases" listed for it give more names.
+
+Descriptors and names are normalized the same way: lower case, words of
+letters and digits, minus filler (NOISE) and store numbers (digit-only
+words longer than two characters). Candidates come from two inverted
+indexes:
+- words: names sharing a word with the descriptor, or whose word starts
+  a longer descriptor word ("SHOPEEPAY" starts with "shopee");
+- trigrams of the name with spaces removed, for descriptors that run
+  words together or split them ("SHOPEESG", "COLD STORAGE" for
+  "coldstorage"); at least MIN_CONTAINMENT of them must appear in the
+  descriptor with its spaces removed. Trigrams shared by more than MAX_POSTINGS names are
+  skipped, so a lookup touches a bounded number of postings; the
+  trigram pass only runs when no name matched word for word.
+
+A name's confidence is the share of it found in the descriptor: its
+words (1.0 each, PREFIX_WEIGHT for a prefix), or FUZZY_WEIGHT × the
+fraction of its trigrams present. The best name at or above
+MIN_CONFIDENCE wins; ties go to the longer, more specific name.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from itertools import chain
+
+MIN_CONFIDENCE = 0.6
+PREFIX_WEIGHT = 0.9
+FUZZY_WEIGHT = 0.9
+MIN_PREFIX = 4  # shortest name word matched as a prefix of a descriptor word
+MIN_FUZZY = 5  # shortest squashed name matched by trigrams
+MIN_CONTAINMENT = 0.75  # share of a name's trigrams the descriptor must contain
+MAX_POSTINGS = 512
+
+# legal suffixes, places and web / TLD labels that say nothing about the merchant
+NOISE = frozenset({
+    "pte", "ltd", "limited", "inc", "llc", "corp", "co", "plc", "the", "and",
+    "sg", "sgp", "sgd", "sin", "singapore", "spore",
+    "www", "com", "net", "org", "my", "id", "ph", "th", "vn", "hk", "tw", "jp", "au", "uk", "io",
+    "mp",
+})
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def words(text: str) -> tuple:
+    """Normalized words of a descriptor or merchant name."""
+    return tuple(
+        w for w in _WORD.findall(text.lower())
+        if w not in NOISE and not (len(w) > 2 and w.isdigit())
+    )
+
+
+def _trigrams(squashed: str) -> set:
+    return {squashed[i:i + 3] for i in range(len(squashed) - 2)}
+
+
+class DescriptorIndex:
+    """Word and trigram index over merchant names; aliases is {alias: merchants.json key}."""
+
+    def __init__(self, merchants, aliases=None):
+        self._merchants = merchants
+        self._keys = []  # per name: merchants.json key
+        self._sizes = []  # per name: (distinct words, characters)
+        self._grams = []  # per name: trigram count
+        self._by_word = {}
+        self._by_gram = {}
+
+        names = [(key, key) for key in merchants]
+        names += [(alias, key) for alias, key in (aliases or {}).items() if key in merchants]
+        seen = set()
+        for name, key in names:
+            name_words = words(name)
+            if not name_words or (name_words, key) in seen:
+                continue
+            seen.add((name_words, key))
+            n = len(self._keys)
+            squashed = "".join(name_words)
+            grams = _trigrams(squashed) if len(squashed) >= MIN_FUZZY else set()
+            self._keys.append(key)
+            self._sizes.append((len(set(name_words)), len(squashed)))
+            self._grams.append(len(grams))
+            for w in set(name_words):
+                self._by_word.setdefault(w, []).append(n)
+            for g in grams:
+                self._by_gram.setdefault(g, []).append(n)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _word_scores(self, desc_words: tuple) -> dict:
+        """{name: confidence} for names sharing words with the descriptor."""
+        by_word = self._by_word
+        found = {}  # name -> {name word: weight}
+        for w in set(desc_words):
+            for n in by_word.get(w, ()):
+                found.setdefault(n, {})[w] = 1.0
+            for cut in range(MIN_PREFIX, len(w)):
+                prefix = w[:cut]
+                for n in by_word.get(prefix, ()):
+                    hit = found.setdefault(n, {})
+                    if hit.get(prefix, 0.0) < PREFIX_WEIGHT:
+                        hit[prefix] = PREFIX_WEIGHT
+        sizes = self._sizes
+        return {n: sum(hit.values()) / sizes[n][0] for n, hit in found.items()}
+
+    def _gram_scores(self, desc_words: tuple) -> dict:
+        """{name: confidence} for names whose trigrams appear in the squashed descriptor."""
+        postings = []
+        for g in _trigrams("".join(desc_words)):
+            names = self._by_gram.get(g)
+            if names is not None and len(names) <= MAX_POSTINGS:
+                postings.append(names)
+        if not postings:
+            return {}
+        grams = self._grams
+        scores = {}
+        # most names share a trigram or two by chance; every name has 3+
+        # trigrams, so stop at the first count below what the shortest needs
+        least = math.ceil(3 * MIN_CONTAINMENT)
+        for n, count in Counter(chain.from_iterable(postings)).most_common():
+            if count < least:
+                break
+            if count >= MIN_CONTAINMENT * grams[n]:
+                scores[n] = FUZZY_WEIGHT * count / grams[n]
+        return scores
+
+    def resolve(self, text: str):
+        """(merchants.json key, (category, is_online, mcc), confidence) for a descriptor, or None."""
+        desc_words = words(text)
+        if not desc_words:
+            return None
+
+        # 1) word matches; a full one can't be beaten by trigrams
+        scores = self._word_scores(desc_words)
+        if not scores or max(scores.values()) < 1.0:
+            for n, confidence in self._gram_scores(desc_words).items():
+                if confidence > scores.get(n, 0.0):
+                    scores[n] = confidence
+
+        # 2) best confidence, then the most specific name
+        best = None
+        for n, confidence in scores.items():
+            if confidence < MIN_CONFIDENCE:
+                continue
+            rank = (round(confidence, 6), self._sizes[n], -n)
+            if best is None or rank > best[0]:
+                best = (rank, n)
+        if best is None:
+            return None
+        key = self._keys[best[1]]
+        return key, self._merchants[key], min(best[0][0], 1.0)
+
+
+_lock = threading.Lock()
+_built = (None, None)  # (ruleset version, DescriptorIndex)
+
+
+def for_snapshot(snapshot) -> DescriptorIndex:
+    """The index for a ruleset snapshot, built on first use per version (not at load)."""
+    global _built
+    version, index = _built
+    if version == snapshot.version:
+        return index
+    with _lock:
+        version, index = _built
+        if version != snapshot.version:
+            index = DescriptorIndex(snapshot.merchants, snapshot.aliases)
+            _built = (snapshot.version, index)
+        return index
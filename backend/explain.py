@@ -0,0 +1,136 @@
+"""
+Explain traces for /recommend-card (request flag "explain": true).
+
+card_trace() replays compute_card_rewards' decisions for one card from
+its raw cards_data.json entry (block checks, card rules, online /
+category / FCY overrides, cashback and cap evaluation) and pairs them
+with what the compiled card actually returned and how long it took, so
+a surprising pick can be followed step by step. It runs only for
+explain requests; the normal path never builds any of this.
+"""
+
+from time import perf_counter
+
+from rule_dsl import interpret_rules
+from rules import category_chain, txn_currency
+
+
+def _rate_steps(card: dict, chain: tuple, is_online: bool, is_fcy: bool) -> tuple[list, float]:
+    """The mpd override chain as steps, and the mpd it ends with (before card rules)."""
+    steps = []
+    base_mpd = card.get("base_mpd", 0.0)
+    mpd = base_mpd
+    steps.append({"step": "base_mpd", "mpd": mpd})
+
+    online_mpd = card.get("online_mpd")
+    if is_online:
+        if online_mpd:
+            mpd = online_mpd
+        steps.append({"step": "online_mpd", "applied": bool(online_mpd), "mpd": mpd})
+
+    category_mpd = card.get("category_mpd", {})
+    matched = next((c for c in chain if c in category_mpd), None)
+    if matched is not None:
+        mpd = category_mpd[matched]
+    steps.append({
+        "step": "category_mpd",
+        "applied": matched is not None,
+        "matched": matched,
+        "inherited": matched is not None and matched != chain[0],
+        "mpd": mpd,
+    })
+
+    if is_fcy:
+        fcy_mpd = card.get("fcy_mpd")
+        if card.get("no_fcy_bonus", False):
+            mpd = fcy_mpd if fcy_mpd is not None else base_mpd
+            why = "no_fcy_bonus: bonuses are SGD-only"
+        elif fcy_mpd is not None and fcy_mpd > mpd:
+            mpd = fcy_mpd
+            why = "fcy_mpd is higher"
+        else:
+            why = "no fcy_mpd" if fcy_mpd is None else "fcy_mpd is not higher"
+        steps.append({"step": "fcy_mpd", "fcy_mpd": fcy_mpd, "reason": why, "mpd": mpd})
+    return steps, mpd
+
+
+def card_trace(card: dict, compiled, amount: float, category: str, is_online: bool, mcc: str,
+               is_fcy: bool, cap_used: float | None = None, merchant: str = "", currency: str | None = None) -> dict:
+    """Decision steps for one card plus its real (compiled) result and evaluation time."""
+    chain = category_chain(category)
+    steps = []
+
+    # 1) blocks
+    blocked_categories = card.get("blocked_categories", [])
+    hit = next((c for c in chain if c in blocked_categories), None)
+    steps.append({"step": "blocked_categories", "checked": list(chain), "hit": hit})
+    mcc_hit = bool(mcc and mcc in card.get("blocked_mccs", []))
+    steps.append({"step": "blocked_mccs", "mcc": mcc, "hit": mcc_hit})
+    blocked = hit is not None or mcc_hit
+
+    # 2) card rules (first match wins)
+    effect = None
+    if not blocked and card.get("rules"):
+        effect = interpret_rules(
+            card["rules"], merchant, chain, is_online, mcc, txn_currency(is_fcy, currency), amount
+        )
+        steps.append({
+            "step": "rules",
+            "rules": len(card["rules"]),
+            "matched": effect.name if effect is not None else None,
+            "effect": {k: v for k, v in effect._asdict().items() if k != "name"} if effect is not None else None,
+        })
+        blocked = effect is not None and effect.block
+
+    # 3) rates, cashback and cap
+    if not blocked:
+        rate_steps, mpd = _rate_steps(card, chain, is_online, is_fcy)
+        steps.extend(rate_steps)
+        if effect is not None and effect.mpd is not None:
+            steps.append({"step": "rule_mpd", "rule": effect.name, "mpd": effect.mpd})
+
+        cashback_rate = card.get("cashback_rate", 0.0)
+        source = "cashback_rate"
+        if effect is not None and effect.cashback_rate is not None:
+            cashback_rate, source = effect.cashback_rate, f"rule '{effect.name}'"
+        steps.append({"step": "cashback_rate", "rate": cashback_rate, "source": source})
+
+        cap = card.get("bonus_cap_amount")
+        if cap:
+            if cap_used is None:
+                steps.append({"step": "bonus_cap", "cap": cap, "tracked": False, "txn_exceeds_cap": amount > cap})
+            else:
+                remaining = max(cap - cap_used, 0.0)
+                steps.append({
+                    "step": "bonus_cap",
+                    "cap": cap,
+                    "tracked": True,
+                    "used": round(cap_used, 2),
+                    "remaining": round(remaining, 2),
+                    "bonus_amount": round(min(max(amount, 0.0), remaining), 2),
+                    "base_amount": round(amount - min(max(amount, 0.0), remaining), 2),
+                })
+
+    # 4) the real answer, from the compiled card the request path uses
+    start = perf_counter()
+    result = compiled.rewards(
+        amount, category, is_online, mcc, is_fcy, cap_used=cap_used, merchant=merchant, currency=currency
+    )
+    elapsed = perf_counter() - start
+    return {
+        "card_name": compiled.name,
+        "steps": steps,
+        "blocked": result["blocked"],
+        "miles": result["miles"],
+        "cashback": result["cashback"],
+        "effective_mpd": result.get("effective_mpd"),
+        "eval_us": round(elapsed * 1e6, 2),
+    }
+
+
+def stage_timings(marks: list) -> dict:
+    """[(stage, perf_counter())] marks -> {stage: microseconds since the previous mark}."""
+    out = {}
+    for (_, before), (stage, at) in zip(marks, marks[1:]):
+        out[stage] = round(out.get(stage, 0.0) + (at - before) * 1e6, 2)
+    return out
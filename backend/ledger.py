@@ -0,0 +1,125 @@
+"""
+Per-user monthly spend ledger, used for cap-aware recommendations.
+
+Every recorded txn is appended to the `spend` table (never updated) and
+added to a `monthly_totals` row keyed by (user, month, card) in the same
+transaction. Reads go through an in-memory LRU of per-(user, month)
+totals, so remaining bonus headroom is a dict lookup; a cold (user, month)
+costs one primary-key range query on monthly_totals, never a rescan of
+spend history. Other workers write the same file, so every read first
+checks PRAGMA data_version and drops the LRU when another connection has
+committed since the last look. A new month is simply a new key, so rollovers start from
+zero without touching older rows.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+LEDGER_PATH = Path(os.environ.get("SWIPESMART_LEDGER_PATH", Path(__file__).parent / "ledger.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spend (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    card_name TEXT NOT NULL,
+    month TEXT NOT NULL,
+    amount REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS monthly_totals (
+    user_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    card_name TEXT NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (user_id, month, card_name)
+) WITHOUT ROWID;
+"""
+
+
+def month_key(when: datetime | None = None) -> str:
+    """Statement month as 'YYYY-MM' (local time)."""
+    return (when or datetime.now()).strftime("%Y-%m")
+
+
+class SpendLedger:
+    def __init__(self, path=LEDGER_PATH, max_cached_months: int = 50_000):
+        self.path = str(path)
+        self.max_cached_months = max_cached_months
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._totals = OrderedDict()  # (user_id, month) -> {card_name: total}
+        self._data_version = None  # PRAGMA data_version the LRU was filled at
+
+    def _month_totals(self, user_id: str, month: str) -> dict:
+        # caller holds the lock
+        # 1) another connection (worker) committed: the cached totals may be stale
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._totals.clear()
+            self._data_version = data_version
+
+        # 2) cached (user, month), else one range query
+        key = (user_id, month)
+        totals = self._totals.get(key)
+        if totals is not None:
+            self._totals.move_to_end(key)
+            return totals
+
+        rows = self._conn.execute(
+            "SELECT card_name, total FROM monthly_totals WHERE user_id = ? AND month = ?",
+            (user_id, month),
+        ).fetchall()
+        totals = dict(rows)
+        self._totals[key] = totals
+        while len(self._totals) > self.max_cached_months:
+            self._totals.popitem(last=False)
+        return totals
+
+    def record(self, user_id: str, card_name: str, amount: float, when: datetime | None = None) -> float:
+        """Append one txn. Returns the card's new total for that month."""
+        if not math.isfinite(amount):
+            raise ValueError(f"bad amount {amount!r}")
+        month = month_key(when)
+        with self._lock:
+            totals = self._month_totals(user_id, month)
+            # finite amounts can still add up past float range
+            if not math.isfinite(totals.get(card_name, 0.0) + amount):
+                raise ValueError(f"month total for {card_name!r} out of range")
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO spend (user_id, card_name, month, amount, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (user_id, card_name, month, amount, time.time()),
+                )
+                # the stored total also counts what other workers added since the read
+                (total,) = self._conn.execute(
+                    "INSERT INTO monthly_totals (user_id, month, card_name, total) "
+                    "VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, month, card_name) DO UPDATE SET total = total + excluded.total "
+                    "RETURNING total",
+                    (user_id, month, card_name, amount),
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            totals[card_name] = float(total)
+            return totals[card_name]
+
+    def month_totals(self, user_id: str, month: str | None = None) -> dict:
+        """{card_name: spend so far} for the user's month (copy)."""
+        with self._lock:
+            return dict(self._month_totals(user_id, month or month_key()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
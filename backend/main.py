@@ -1,12 +1,59 @@
-from fastapi import FastAPI
+import gzip
+import hashlib
+import heapq
+import json
+import math
+import os
+from contextlib import asynccontextmanager
+from time import perf_counter
+
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 from urllib.parse import urlparse
 
-from mcc_map import MCC_CATEGORY_MAP
-from rules import CARDS, compute_card_rewards
+import descriptor_index
+import metrics
+import profiling
+import ruleset
+from batch import best_card_indices
+from breakeven import break_even
+from cache import RecommendationCache
+from explain import card_trace, stage_timings
+from ledger import SpendLedger, month_key
+from optimizer import plan_month
+from profiles import ProfileStore, validate_valuations
+from replay import StatementReplay, open_statement, replay_lines
+from rules import fee_warning
+from singleflight import AsyncSingleFlight, SingleFlight
+from wallet import choose_wallet
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+# seconds between data file checks; 0 disables the watcher
+RULESET_WATCH_INTERVAL = float(os.environ.get("SWIPESMART_WATCH_INTERVAL", "2"))
+
+ruleset_watcher = None
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ruleset_watcher
+    if RULESET_WATCH_INTERVAL > 0:
+        ruleset_watcher = ruleset.RulesetWatcher(RULESET_WATCH_INTERVAL)
+        ruleset_watcher.start()
+    yield
+    if ruleset_watcher is not None:
+        ruleset_watcher.stop()
+        ruleset_watcher = None
+
+
+app = FastAPI(lifespan=lifespan)
 
 # (from chrome://extensions)
 EXTENSION_ID = "aaeaknjonfeaofipbnkfenbnfndkhmco"
@@ -23,6 +70,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # or ["POST"] if you want to be strict
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
@@ -32,46 +80,220 @@ class RecommendationRequest(BaseModel):
     currency: str = "SGD"
     mode: str = "miles"  # "miles" or "cashback"
     enabled_cards: list[str] | None = None 
+    user_id: str | None = None  # enables cap-aware earn from the spend ledger
+    profile_id: str | None = None  # stored wallet / mode / valuations, see PUT /profiles
+    # slim responses: the defaults return the full breakdown and reason text
+    top_k: int | None = Field(None, ge=0)  # only the k best breakdown entries
+    fields: list[str] | None = None  # keep only these keys in breakdown entries
+    include_reason: bool = True  # False skips reason / annual_fee_warning
+    explain: bool = False  # add a per-card decision trace and stage timings (skips the cache)
+
+
+class BatchRecommendationRequest(BaseModel):
+    items: list[RecommendationRequest]  # user_id / explain are ignored here
+    include_breakdown: bool = False
+
+
+class PlannedTransaction(BaseModel):
+    url: str
+    amount: float
+    currency: str = "SGD"
+    mcc: str | None = None  # overrides the MCC detected from the URL
+
+
+class MonthPlanRequest(BaseModel):
+    transactions: list[PlannedTransaction]
+    mode: str = "miles"
+    enabled_cards: list[str] | None = None
+    user_id: str | None = None  # start from this month's ledger spend
+    profile_id: str | None = None
+
+
+class BreakEvenRequest(BaseModel):
+    url: str
+    currency: str = "SGD"
+    mode: str = "miles"
+    mcc: str | None = None  # overrides the MCC detected from the URL
+    enabled_cards: list[str] | None = None
+    user_id: str | None = None  # start from this month's ledger spend
+    profile_id: str | None = None
+
+
+class SpendLine(BaseModel):
+    amount: float  # SGD per month
+    category: str | None = None
+    url: str | None = None  # a merchant instead of a category: category / MCC / online come from merchants.json
+    mcc: str | None = None  # overrides the category's / merchant's MCC
+    online: bool = False  # with category
+    currency: str = "SGD"
+    txn_amount: float | None = None  # typical txn size, for card rules on amount (default: amount)
+
+
+class WalletRequest(BaseModel):
+    spend: list[SpendLine]  # one month
+    max_cards: int = 3
+    enabled_cards: list[str] | None = None  # cards to choose from (default: the whole catalog)
+    valuations: dict[str, float] | None = None  # SGD per mile / per cashback dollar
+    profile_id: str | None = None  # valuations from this profile, unless the request sends them
+    waive_fees: bool = True  # count annual_fee_waivable fees as waived
+    top_n: int = 3
+
+
+class DescriptorRequest(BaseModel):
+    descriptor: str  # statement / terminal text, e.g. "NTUC FP-TAMPINES 123"
+
+
+class SpendRecord(BaseModel):
+    user_id: str
+    card_name: str
+    amount: float
+
 
+class ProfilingUpdate(BaseModel):
+    sample_rate: float  # fraction of /recommend-card requests to profile, 0 = off
 
-# Hardcoded merchant+MCC map (URL-based)
-MERCHANT_MAP = {
-    "shopee": ("shopping", True, "5311"),
-    "lazada": ("shopping", True, "5311"),
-    "qoo10": ("shopping", True, "5311"),
-    "amazon": ("shopping", True, "5311"),
-    "agoda": ("travel", True, "4722"),
-    "booking": ("travel", True, "4722"),
-    "expedia": ("travel", True, "4722"),
-    "ntuc": ("groceries", False, "5411"),
-    "fairprice": ("groceries", False, "5411"),
-    "coldstorage": ("groceries", False, "5411"),
-}
 
+class ProfileUpdate(BaseModel):
+    wallet: list[str] = []  # card names; empty means every card
+    mode: str = "miles"
+    valuations: dict[str, float] = {}  # SGD per mile / per cashback dollar
 
-def category_from_mcc(mcc: str, fallback_category: str = "general") -> str:
-    """Map MCC → category, or fall back if unknown."""
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+# (merchant context, amount, FCY, mode, enabled cards or wallet mask, view options) -> response
+RESULT_CACHE = RecommendationCache(maxsize=4096, ttl=300.0)
+
+# normalized descriptor -> (merchants.json key, info, confidence), and the
+# descriptors that resolved to nothing, so repeats skip the index either way
+DESCRIPTOR_CACHE = RecommendationCache(maxsize=8192, ttl=3600.0)
+UNKNOWN_DESCRIPTORS = RecommendationCache(maxsize=8192, ttl=600.0)
+
+# SGD; far past any real spend, small enough that sums and earn stay finite
+MAX_AMOUNT = 1e12
+
+# identical requests in flight at the same time share one computation:
+# INFLIGHT per result-cache key across threadpool threads,
+# ASYNC_INFLIGHT per request payload on the event loop
+INFLIGHT = SingleFlight()
+ASYNC_INFLIGHT = AsyncSingleFlight()
+
+_ledger = None
+_profiles = None
+
+
+def get_ledger() -> SpendLedger:
+    """Open the spend ledger on first use (not at import)."""
+    global _ledger
+    if _ledger is None:
+        _ledger = SpendLedger()
+    return _ledger
+
+
+def get_profiles() -> ProfileStore:
+    """Open the profile store on first use (not at import)."""
+    global _profiles
+    if _profiles is None:
+        _profiles = ProfileStore()
+    return _profiles
+
+
+def _get_profile(profile_id: str | None):
+    """Stored profile for profile_id, None if no id was sent; unknown ids are a 404."""
+    if not profile_id:
+        return None
+    profile = get_profiles().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile {profile_id!r}")
+    return profile
+
+
+def _check_amount(amount: float, label: str) -> None:
+    """400 for NaN / inf, and for amounts so large that earn or totals overflow float."""
+    if not math.isfinite(amount) or abs(amount) > MAX_AMOUNT:
+        raise HTTPException(status_code=400, detail=f"{label} must be a finite number up to {MAX_AMOUNT:g}")
+
+
+def _request_mode(mode: str, explicit: bool, profile=None) -> str:
+    """Sanitized mode; a stored profile's mode applies unless the request set one."""
+    if profile is not None and not explicit:
+        mode = profile.mode
+    mode = mode.lower()
+    return mode if mode in ("miles", "cashback") else "miles"
+
+
+def _enabled_cards(snapshot: ruleset.Ruleset, enabled) -> tuple:
+    """Compiled cards named in enabled (all cards when it's empty)."""
+    if enabled:
+        return tuple(c for c in snapshot.compiled_cards if c.name in enabled)
+    return snapshot.compiled_cards
+
+
+def _with_value(response: dict, profile) -> dict:
+    """Add estimated_value when the profile has reward valuations."""
+    if profile is None or not profile.valuations:
+        return response
+    return {**response, "estimated_value": profile.value(response["estimated_miles"], response["estimated_cashback"])}
+
+
+def category_from_mcc(
+    mcc: str, fallback_category: str = "general", snapshot: ruleset.Ruleset | None = None
+) -> str:
+    """Map MCC → category (exact code or MCC range), or fall back if unknown."""
     if not mcc:
         return fallback_category
-    return MCC_CATEGORY_MAP.get(mcc, fallback_category)
+    snapshot = snapshot or ruleset.current()
+    return snapshot.mcc_index.category(mcc, fallback_category)
 
 
-def get_merchant_info(url: str):
+def get_merchant(url: str, snapshot: ruleset.Ruleset | None = None):
     """
-    Basic v1:
     - Look at hostname (e.g. shopee.sg, agoda.com)
-    - Match against MERCHANT_MAP keys
-    Returns: (category, is_online, mcc)
+    - Match against the merchant index (domain suffix / brand label rules)
+    Returns: (merchants.json key or "", (category, is_online, mcc))
     """
     parsed = urlparse(url)
     host = (parsed.hostname or "").lower()
 
-    for key, (category, is_online, mcc) in MERCHANT_MAP.items():
-        if key in host:
-            return category, is_online, mcc
+    snapshot = snapshot or ruleset.current()
+    found = snapshot.merchant_index.match(host)
+    if found is not None:
+        return found
 
     # default fallback
-    return "general", True, "0000"
+    return "", ("general", True, "0000")
+
+
+def resolve_descriptor(text: str, snapshot: ruleset.Ruleset | None = None):
+    """
+    - Normalize a free-text descriptor (e.g. "SHOPEE SINGAPORE MP")
+    - Match it against merchant names and aliases (descriptor_index.py)
+    Returns: (merchants.json key or "", (category, is_online, mcc), confidence)
+    """
+    snapshot = snapshot or ruleset.current()
+    key = " ".join(descriptor_index.words(text))
+    found = DESCRIPTOR_CACHE.get(key, snapshot.version)
+    if found is None and UNKNOWN_DESCRIPTORS.get(key, snapshot.version) is None:
+        found = descriptor_index.for_snapshot(snapshot).resolve(key)
+        if found is None:
+            UNKNOWN_DESCRIPTORS.put(key, True, snapshot.version)
+        else:
+            DESCRIPTOR_CACHE.put(key, found, snapshot.version)
+    if found is None:
+        return "", ("general", True, "0000"), 0.0
+    return found
+
+
+def get_merchant_info(url: str, snapshot: ruleset.Ruleset | None = None):
+    """(category, is_online, mcc) for a URL, see get_merchant."""
+    return get_merchant(url, snapshot)[1]
 
 
 @app.get("/")
@@ -79,41 +301,451 @@ def root():
     return {"message": "SwipeSmart backend running"}
 
 
-@app.post("/recommend-card")
-def recommend_card(req: RecommendationRequest):
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    cache = RESULT_CACHE.stats()
+    extra = [
+        ("swipesmart_cache_hits_total", "counter", "Result cache hits.", cache["hits"]),
+        ("swipesmart_cache_misses_total", "counter", "Result cache misses.", cache["misses"]),
+        ("swipesmart_cache_evictions_total", "counter", "Result cache LRU evictions.", cache["evictions"]),
+        ("swipesmart_cache_entries", "gauge", "Result cache size.", cache["size"]),
+        ("swipesmart_coalesced_thread_total", "counter", "Cache misses that reused an in-flight computation.",
+         INFLIGHT.stats()["coalesced"]),
+        ("swipesmart_coalesced_async_total", "counter", "Requests that reused an in-flight request on the event loop.",
+         ASYNC_INFLIGHT.stats()["coalesced"]),
+        ("swipesmart_ruleset_cards", "gauge", "Cards in the live ruleset.", len(ruleset.current().cards)),
+    ]
+    return PlainTextResponse(
+        metrics.render(extra), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/admin/cache-stats")
+def cache_stats():
+    return {
+        **RESULT_CACHE.stats(),
+        "single_flight": {"thread": INFLIGHT.stats(), "async": ASYNC_INFLIGHT.stats()},
+        "descriptors": {"resolved": DESCRIPTOR_CACHE.stats(), "unknown": UNKNOWN_DESCRIPTORS.stats()},
+    }
+
+
+def _ruleset_info(snapshot: ruleset.Ruleset) -> dict:
+    return {
+        "ruleset_version": snapshot.version,
+        "loaded_at": snapshot.loaded_at,
+        "cards": len(snapshot.cards),
+        "mccs": len(snapshot.mcc_index),
+        "merchants": len(snapshot.merchants),
+    }
+
+
+@app.get("/admin/profiling")
+def profiling_status():
+    return profiling.status()
+
+
+@app.post("/admin/profiling")
+def configure_profiling(body: ProfilingUpdate):
+    """Profile this fraction of /recommend-card requests; 0 switches off and dumps the aggregate."""
+    try:
+        return profiling.configure(body.sample_rate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/admin/profiling/dump")
+def dump_profiling():
+    """Write the aggregate profile so far to SWIPESMART_PROFILE_DIR."""
+    dumped = profiling.dump()
+    if dumped is None:
+        raise HTTPException(status_code=404, detail="No sampled requests to dump")
+    return dumped
+
+
+@app.get("/admin/ruleset")
+def ruleset_info():
+    info = _ruleset_info(ruleset.current())
+    info["watcher_error"] = ruleset_watcher.last_error if ruleset_watcher else None
+    return info
+
+
+@app.post("/admin/reload")
+def reload_ruleset():
+    """Re-read cards / MCC / merchant data and swap it in if it changed."""
+    try:
+        snapshot, changed = ruleset.reload()
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Reload failed, keeping current rules: {e}")
+    info = _ruleset_info(snapshot)
+    info["changed"] = changed
+    return info
+
+
+# (version, ETag, JSON bytes, gzipped bytes) of the client snapshot, built once per version
+_client_snapshot = (None, "", b"", b"")
+
+
+def _encoded_client_snapshot(snapshot: ruleset.Ruleset) -> tuple[str, bytes, bytes]:
+    global _client_snapshot
+    version, etag, body, gzipped = _client_snapshot
+    if version != snapshot.version:
+        body = json.dumps(ruleset.client_snapshot(snapshot), separators=(",", ":")).encode()
+        gzipped = gzip.compress(body, mtime=0)
+        # hash of the payload, not just the data version, so a server
+        # upgrade that compiles the same data differently is a new ETag
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        _client_snapshot = (snapshot.version, etag, body, gzipped)
+    return etag, body, gzipped
+
+
+@app.get("/ruleset")
+def ruleset_snapshot(request: Request):
+    """
+    Compact, versioned ruleset for client-side scoring (extension/scoring.js).
+    Send the ETag back in If-None-Match to get a 304 while the rules are
+    unchanged. Served gzipped when accepted.
+    """
+    etag, body, gzipped = _encoded_client_snapshot(ruleset.current())
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        body = gzipped
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.post("/spend")
+def record_spend(rec: SpendRecord):
+    """Log a txn made on a card so later recommendations know the cap headroom."""
+    cards = {c.name: c for c in ruleset.current().compiled_cards}
+    card = cards.get(rec.card_name)
+    if card is None:
+        raise HTTPException(status_code=404, detail=f"Unknown card {rec.card_name!r}")
+    if not math.isfinite(rec.amount) or rec.amount <= 0:
+        raise HTTPException(status_code=400, detail="amount must be a positive number")
+
+    try:
+        month_total = get_ledger().record(rec.user_id, rec.card_name, rec.amount)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "user_id": rec.user_id,
+        "card_name": rec.card_name,
+        "month_total": round(month_total, 2),
+        "bonus_cap_amount": card.bonus_cap_amount,
+    }
+
+
+@app.get("/spend/{user_id}")
+def spend_summary(user_id: str):
+    """This month's spend and remaining bonus cap per card."""
+    totals = get_ledger().month_totals(user_id)
+    cards = []
+    for card in ruleset.current().compiled_cards:
+        spent = totals.get(card.name, 0.0)
+        if not spent and not card.bonus_cap_amount:
+            continue
+        cap = card.bonus_cap_amount
+        cards.append(
+            {
+                "card_name": card.name,
+                "spent": round(spent, 2),
+                "bonus_cap_amount": cap,
+                "cap_remaining": round(max(cap - spent, 0.0), 2) if cap else None,
+            }
+        )
+    return {"user_id": user_id, "month": month_key(), "cards": cards}
+
+
+def _profile_info(profile) -> dict:
+    snapshot = ruleset.current()
+    known = {c.name for c in snapshot.compiled_cards}
+    info = profile.to_dict()
+    # wallet names the live ruleset doesn't have (renamed / removed cards)
+    info["unknown_cards"] = [name for name in profile.wallet if name not in known]
+    info["ruleset_version"] = snapshot.version
+    return info
+
+
+@app.put("/profiles/{profile_id}")
+def put_profile(profile_id: str, body: ProfileUpdate):
+    """Create or replace a stored profile; requests can then send just profile_id."""
+    try:
+        profile = get_profiles().put(profile_id, body.wallet, body.mode.lower(), body.valuations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _profile_info(profile)
+
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    return _profile_info(_get_profile(profile_id))
+
+
+@app.delete("/profiles/{profile_id}")
+def delete_profile(profile_id: str):
+    if not get_profiles().delete(profile_id):
+        raise HTTPException(status_code=404, detail=f"Unknown profile {profile_id!r}")
+    return {"profile_id": profile_id, "deleted": True}
+
+
+def recommend_card(req: RecommendationRequest) -> dict:
+    """Recommendation as a plain dict (used by the endpoint, tools and benchmarks)."""
+    if req.explain:
+        return explain_recommendation(req)
+
+    # stage timing marks, only collected when metrics are enabled
+    marks = [("start", perf_counter())] if metrics.ENABLED else None
+
+    # the whole request uses one snapshot, even if a reload swaps it meanwhile
+    snapshot = ruleset.current()
+    profile = _get_profile(req.profile_id)
+
     # 1) detect from URL first
-    category_from_url, is_online, mcc = get_merchant_info(req.url)
+    merchant, (category_from_url, is_online, mcc) = get_merchant(req.url, snapshot)
+    if marks:
+        marks.append(("merchant", perf_counter()))
 
     # 2) if MCC known, override category using MCC map
-    category = category_from_mcc(mcc, fallback_category=category_from_url)
+    category = category_from_mcc(mcc, fallback_category=category_from_url, snapshot=snapshot)
+    if marks:
+        marks.append(("mcc", perf_counter()))
+
+    # 3) sanitize mode / currency / view options
+    mode = _request_mode(req.mode, "mode" in req.model_fields_set, profile)
+    currency = req.currency.upper()
+    is_fcy = currency != "SGD"
+
+    fields = tuple(req.fields) if req.fields is not None else None
+    view = (req.top_k, fields, req.include_reason)
+
+    # explicit enabled_cards win; otherwise a profile's wallet, precompiled
+    # for this ruleset version, so neither path filters cards on a cache hit
+    enabled = frozenset(req.enabled_cards or [])
+    subset = profile.subset(snapshot) if profile is not None and not enabled else None
+    selection = subset.mask if subset is not None else enabled
+
+    # cap-aware answers depend on this month's spend, so they skip the cache
+    if req.user_id:
+        cap_used = get_ledger().month_totals(req.user_id)
+        if marks:
+            marks.append(("ledger", perf_counter()))
+        cards = subset.cards if subset is not None else _enabled_cards(snapshot, enabled)
+        response, best, evaluated = _build_recommendation(
+            snapshot, category, is_online, mcc, req.amount, is_fcy, mode, cards, view, cap_used, marks,
+            merchant, currency,
+        )
+        if marks:
+            _record_metrics(marks, "bypass", req, response, best, evaluated)
+        return _with_value(response, profile)
+
+    # 4) repeat lookups (same tab, amount, mode, cards, view) come from the cache;
+    # merchant / currency only split the key where some card rule tests them
+    rule_key = snapshot.rate_table.rule_key(merchant, currency, req.amount)
+    key = (category, is_online, mcc, req.amount, is_fcy, mode, selection, view, rule_key)
+    cached = RESULT_CACHE.get(key, snapshot.version)
+    if marks:
+        marks.append(("cache", perf_counter()))
+    if cached is not None:
+        if marks:
+            _record_metrics(marks, "hit", req, cached)
+        return _with_value(cached, profile)
+
+    # 5) a miss: concurrent misses on the same key share one computation
+    def compute():
+        cards = subset.cards if subset is not None else _enabled_cards(snapshot, enabled)
+        built = _build_recommendation(
+            snapshot, category, is_online, mcc, req.amount, is_fcy, mode, cards, view, marks=marks,
+            merchant=merchant, currency=currency,
+        )
+        RESULT_CACHE.put(key, built[0], snapshot.version)
+        return built
+
+    (response, best, evaluated), shared = INFLIGHT.do((snapshot.version, key), compute)
+    if marks:
+        if shared:
+            marks.append(("coalesced", perf_counter()))
+            _record_metrics(marks, "coalesced", req, response)
+        else:
+            _record_metrics(marks, "miss", req, response, best, evaluated)
+    return _with_value(response, profile)
+
+
+def explain_recommendation(req: RecommendationRequest) -> dict:
+    """
+    recommend_card computed fresh (no cache), plus an "explain" trace:
+    merchant / MCC detection, every card's decisions (explain.card_trace)
+    and how long each stage took.
+    """
+    marks = [("start", perf_counter())]
+    snapshot = ruleset.current()
+    profile = _get_profile(req.profile_id)
+
+    host = (urlparse(req.url).hostname or "").lower()
+    merchant, (category_from_url, is_online, mcc) = get_merchant(req.url, snapshot)
+    marks.append(("merchant", perf_counter()))
+    category = category_from_mcc(mcc, fallback_category=category_from_url, snapshot=snapshot)
+    marks.append(("mcc", perf_counter()))
+
+    mode = _request_mode(req.mode, "mode" in req.model_fields_set, profile)
+    currency = req.currency.upper()
+    is_fcy = currency != "SGD"
+    view = (req.top_k, tuple(req.fields) if req.fields is not None else None, req.include_reason)
+
+    enabled = frozenset(req.enabled_cards or [])
+    if profile is not None and not enabled:
+        cards = profile.subset(snapshot).cards
+    else:
+        cards = _enabled_cards(snapshot, enabled)
+    cap_used = None
+    if req.user_id:
+        cap_used = get_ledger().month_totals(req.user_id)
+        marks.append(("ledger", perf_counter()))
+
+    response, best, _ = _build_recommendation(
+        snapshot, category, is_online, mcc, req.amount, is_fcy, mode, cards, view, cap_used, marks,
+        merchant, currency,
+    )
+
+    # traced after timing, so tracing doesn't inflate the stages
+    raw = {card["name"]: card for card in snapshot.cards}
+    traces = [
+        card_trace(
+            raw[card.name], card, req.amount, category, is_online, mcc, is_fcy,
+            None if cap_used is None else cap_used.get(card.name, 0.0), merchant, currency,
+        )
+        for card in cards
+    ]
+    top = max((t[mode] for t in traces if not t["blocked"]), default=None)
+    ties = [t["card_name"] for t in traces if top and not t["blocked"] and t[mode] == top]
+
+    return {
+        **_with_value(response, profile),
+        "explain": {
+            "merchant": {
+                "host": host,
+                "match": merchant or None,
+                "category": category_from_url,
+                "is_online": is_online,
+                "mcc": mcc,
+            },
+            "category": {
+                "from_merchant": category_from_url,
+                "from_mcc": snapshot.mcc_index.category(mcc) if mcc else None,
+                "used": category,
+            },
+            "currency": currency,
+            "is_fcy": is_fcy,
+            "mode": mode,
+            "cap_tracking": cap_used is not None,
+            "cache": "bypassed",
+            "cards_considered": len(cards),
+            # the first card (in cards_data.json order) with the top score wins ties
+            "selection": {"score": mode, "best_card": best["card_name"] if best else None, "tied": ties},
+            "cards": traces,
+            "stages_us": stage_timings(marks),
+            "total_us": round((marks[-1][1] - marks[0][1]) * 1e6, 2),
+        },
+    }
+
+
+def _request_key(req: RecommendationRequest) -> tuple:
+    """Normalized payload: requests with equal keys get the same answer."""
+    return (
+        req.url,
+        req.amount,
+        req.currency.upper(),
+        req.mode.lower() if "mode" in req.model_fields_set else None,
+        frozenset(req.enabled_cards or ()),
+        req.profile_id,
+        req.top_k,
+        tuple(req.fields) if req.fields is not None else None,
+        req.include_reason,
+    )
+
+
+async def recommend_card_async(req: RecommendationRequest) -> dict:
+    """
+    recommend_card for async callers. Identical requests in flight on this
+    event loop wait for one threadpool run instead of each taking a thread.
+    Cap-aware (user_id), explain and profiled requests are never shared.
+    """
+    if profiling.SAMPLE_RATE and profiling.sampled():
+        return await run_in_threadpool(profiling.profiled, recommend_card, req)
+    if req.user_id or req.explain:
+        return await run_in_threadpool(recommend_card, req)
+    response, _ = await ASYNC_INFLIGHT.do(_request_key(req), lambda: run_in_threadpool(recommend_card, req))
+    return response
+
+
+@app.post("/recommend-card", response_class=FastJSONResponse)
+async def recommend_card_endpoint(req: RecommendationRequest):
+    # returning a Response directly skips FastAPI's jsonable_encoder pass
+    return FastJSONResponse(await recommend_card_async(req))
+
+
+def _record_metrics(
+    marks: list,
+    cache: str,
+    req: RecommendationRequest,
+    response: dict,
+    best_card_result: dict | None = None,
+    cards_evaluated: int | None = None,
+):
+    outcomes = ()
+    # hits and coalesced waiters didn't evaluate anything, so only count computed answers
+    if cache not in ("hit", "coalesced"):
+        if best_card_result is None:
+            outcomes = ("no_card",)
+        else:
+            outcomes = tuple(o for o in ("blocked", "capped") if best_card_result.get(o))
+    metrics.record_recommendation(
+        marks, cache, response["mode"], response["category"], req.currency, cards_evaluated, outcomes
+    )
 
-    # 3) sanitize mode
-    mode = req.mode.lower()
-    if mode not in ("miles", "cashback"):
-        mode = "miles"
 
+def _build_recommendation(
+    snapshot: ruleset.Ruleset,
+    category: str,
+    is_online: bool,
+    mcc: str,
+    amount: float,
+    is_fcy: bool,
+    mode: str,
+    cards_to_consider,
+    view: tuple = (None, None, True),
+    cap_used: dict | None = None,
+    marks: list | None = None,
+    merchant: str = "",
+    currency: str | None = None,
+) -> tuple[dict, dict | None, int]:
+    """
+    Returns (response, best card's full result, cards evaluated).
+    cards_to_consider is the user's card selection (see _enabled_cards),
+    view is (top_k, breakdown fields, include_reason); merchant and
+    currency are only for card rules.
+    """
+    top_k, fields, include_reason = view
     breakdown = []
     best_card_result = None
     best_score = -1.0
 
-    # 4) compute rewards for each card
-    
-    # filter cards by user selection (if provided)
-    enabled = set(req.enabled_cards or [])
-    if enabled:
-        cards_to_consider = [c for c in CARDS if c["name"] in enabled]
-    else:
-        cards_to_consider = CARDS
-
+    # 5) compute rewards for each card
     for card in cards_to_consider:
-        result = compute_card_rewards(
-            card=card,
-            amount=req.amount,
+        result = card.rewards(
+            amount=amount,
             category=category,
             is_online=is_online,
             mcc=mcc,
-            mode=mode,
-            currency=req.currency,
+            is_fcy=is_fcy,
+            cap_used=None if cap_used is None else cap_used.get(card.name, 0.0),
+            merchant=merchant,
+            currency=currency,
         )
         breakdown.append(result)
 
@@ -123,16 +755,25 @@ def recommend_card(req: RecommendationRequest):
             best_score = score
             best_card_result = result
 
-    # 5) sort the full breakdown
-    breakdown = sorted(
-        breakdown,
-        key=lambda x: x["miles"] if mode == "miles" else x["cashback"],
-        reverse=True,
-    )
+    if marks:
+        marks.append(("cards", perf_counter()))
+
+    # 6) sort the breakdown; a heap when only the top k are wanted
+    # (nlargest is stable, so it keeps the same order as the full sort)
+    if top_k is not None and top_k < len(breakdown):
+        breakdown = heapq.nlargest(top_k, breakdown, key=lambda x: x[mode])
+    else:
+        breakdown = sorted(breakdown, key=lambda x: x[mode], reverse=True)
 
-    # 6) no suitable card
+    # projected entries only carry the requested keys
+    if fields is not None:
+        breakdown = [{f: r[f] for f in fields if f in r} for r in breakdown]
+    if marks:
+        marks.append(("sort", perf_counter()))
+
+    # 7) no suitable card
     if not best_card_result:
-        return {
+        response = {
             "best_card": None,
             "estimated_miles": 0.0,
             "estimated_cashback": 0.0,
@@ -140,43 +781,49 @@ def recommend_card(req: RecommendationRequest):
             "is_online": is_online,
             "mcc": mcc,
             "mode": mode,
-            "reason": "No suitable card found with current rules.",
+            "reason": "No suitable card found with current rules." if include_reason else None,
             "annual_fee_warning": None,
             "breakdown": breakdown,
+            "ruleset_version": snapshot.version,
         }
+        return response, None, len(cards_to_consider)
 
-    # 7) annual fee notes
+    reason = None
     annual_fee_warning = None
-    fee = best_card_result.get("annual_fee")
-    if fee:
-        if best_card_result.get("annual_fee_waivable", True):
-            annual_fee_warning = (
-                f"{best_card_result['card_name']} has around S${fee} annual fee. Usually waivable."
-            )
-        else:
-            annual_fee_warning = (
-                f"{best_card_result['card_name']} has around S${fee} annual fee and may NOT be waivable."
-            )
-
-    # 8) human-friendly reasoning
-    reason_parts = [
-        f"Picked {best_card_result['card_name']} based on category '{category}', "
-        f"online={is_online}, MCC={mcc}."
-    ]
+    if include_reason:
+        # 8) annual fee notes
+        annual_fee_warning = fee_warning(
+            best_card_result["card_name"],
+            best_card_result.get("annual_fee"),
+            best_card_result.get("annual_fee_waivable", True),
+        )
+        if marks:
+            marks.append(("fee_warning", perf_counter()))
 
-    if best_card_result.get("blocked"):
-        reason_parts.append("Note: this card is blocked for this category/MCC.")
+        # 9) human-friendly reasoning
+        reason_parts = [
+            f"Picked {best_card_result['card_name']} based on category '{category}', "
+            f"online={is_online}, MCC={mcc}."
+        ]
 
-    if best_card_result.get("cap_note"):
-        reason_parts.append(best_card_result["cap_note"])
+        if best_card_result.get("blocked"):
+            reason_parts.append("Note: this card is blocked for this category/MCC.")
 
-    if best_card_result.get("notes"):
-        reason_parts.append(best_card_result["notes"])
+        if best_card_result.get("rule"):
+            reason_parts.append(f"Card rule applied: {best_card_result['rule']}.")
 
-    reason = " ".join(reason_parts).strip()
+        if best_card_result.get("cap_note"):
+            reason_parts.append(best_card_result["cap_note"])
 
-    # 9) final response
-    return {
+        if best_card_result.get("notes"):
+            reason_parts.append(best_card_result["notes"])
+
+        reason = " ".join(reason_parts).strip()
+        if marks:
+            marks.append(("reason", perf_counter()))
+
+    # 10) final response
+    response = {
         "best_card": best_card_result["card_name"],
         "estimated_miles": best_card_result.get("miles", 0.0),
         "estimated_cashback": best_card_result.get("cashback", 0.0),
@@ -187,4 +834,338 @@ def recommend_card(req: RecommendationRequest):
         "reason": reason,
         "annual_fee_warning": annual_fee_warning,
         "breakdown": breakdown,
+        "ruleset_version": snapshot.version,
     }
+    return response, best_card_result, len(cards_to_consider)
+
+
+@app.post("/recommend-card/batch")
+def recommend_card_batch(req: BatchRecommendationRequest):
+    """
+    Score many transactions in one call (statement / cart replay).
+    Items sharing a merchant context (and card-rule key, see
+    RateTable.rule_key) are scored together as an amount × card-rate
+    matrix; results match /recommend-card per item.
+    """
+    snapshot = ruleset.current()
+    merchant_cache = {}
+    profiles = {}
+    subsets = {}  # wallet mask -> CardSubset
+    groups = {}
+
+    # 1) resolve merchant context once per URL, group items by context
+    for i, item in enumerate(req.items):
+        ctx = merchant_cache.get(item.url)
+        if ctx is None:
+            merchant, (category_from_url, is_online, mcc) = get_merchant(item.url, snapshot)
+            category = category_from_mcc(mcc, fallback_category=category_from_url, snapshot=snapshot)
+            ctx = merchant_cache[item.url] = (category, is_online, mcc, merchant)
+
+        profile = None
+        if item.profile_id:
+            profile = profiles.get(item.profile_id)
+            if profile is None:
+                profile = profiles[item.profile_id] = _get_profile(item.profile_id)
+        mode = _request_mode(item.mode, "mode" in item.model_fields_set, profile)
+        currency = item.currency.upper()
+        is_fcy = currency != "SGD"
+        rule_key = snapshot.rate_table.rule_key(ctx[3], currency, item.amount)
+
+        # card selection: enabled names, or a profile's wallet mask
+        selection = frozenset(item.enabled_cards or [])
+        if profile is not None and not selection:
+            subset = profile.subset(snapshot)
+            selection = subset.mask
+            subsets[selection] = subset
+
+        groups.setdefault((ctx, mode, is_fcy, rule_key, selection), []).append(i)
+
+    results = [None] * len(req.items)
+
+    # 2) score each group as a matrix
+    for (ctx, mode, is_fcy, rule_key, selection), indices in groups.items():
+        category, is_online, mcc, merchant = ctx
+        index = None
+        cards = snapshot.compiled_cards
+        if isinstance(selection, int):
+            index, cards = subsets[selection].index, subsets[selection].cards
+        elif selection:
+            index = [j for j, c in enumerate(cards) if c.name in selection]
+            cards = [cards[j] for j in index]
+
+        amounts = [req.items[i].amount for i in indices]
+        # items in a group share a rule key, so the first one's currency and amount stand for all
+        first = req.items[indices[0]]
+        mpd, cashback_rate, blocked = snapshot.rate_table.vectors(
+            category, is_online, mcc, is_fcy, index, merchant, first.currency.upper(), first.amount
+        )
+        best = best_card_indices(amounts, mpd, cashback_rate, mode)
+
+        for i, amount, card_idx in zip(indices, amounts, best.tolist()):
+            if card_idx < 0 or blocked[card_idx]:
+                entry = {
+                    "best_card": None if card_idx < 0 else cards[card_idx].name,
+                    "estimated_miles": 0.0,
+                    "estimated_cashback": 0.0,
+                }
+            else:
+                cb = float(cashback_rate[card_idx])
+                entry = {
+                    "best_card": cards[card_idx].name,
+                    "estimated_miles": round(amount * float(mpd[card_idx]), 2),
+                    "estimated_cashback": round(amount * cb / 100, 2) if cb else 0.0,
+                }
+            entry["category"] = category
+            entry["is_online"] = is_online
+            entry["mcc"] = mcc
+            entry["mode"] = mode
+            profile = profiles.get(req.items[i].profile_id)
+            if profile is not None and profile.valuations:
+                entry["estimated_value"] = profile.value(entry["estimated_miles"], entry["estimated_cashback"])
+
+            if req.include_breakdown:
+                breakdown = [
+                    card.rewards(
+                        amount, category, is_online, mcc, is_fcy,
+                        merchant=merchant, currency=req.items[i].currency.upper(),
+                    )
+                    for card in cards
+                ]
+                breakdown.sort(key=lambda x: x[mode], reverse=True)
+                entry["breakdown"] = breakdown
+
+            results[i] = entry
+
+    # returning a Response skips jsonable_encoder, which dominates at 100k items
+    return FastJSONResponse(
+        {"count": len(results), "ruleset_version": snapshot.version, "results": results}
+    )
+
+
+@app.post("/optimize-month")
+def optimize_month(req: MonthPlanRequest):
+    """
+    Assign a month of planned txns to cards to maximise total miles /
+    cashback under each card's bonus cap (see optimizer.plan_month).
+    """
+    snapshot = ruleset.current()
+    profile = _get_profile(req.profile_id)
+    mode = _request_mode(req.mode, "mode" in req.model_fields_set, profile)
+
+    if profile is not None and not req.enabled_cards:
+        cards = list(profile.subset(snapshot).cards)
+    else:
+        cards = list(_enabled_cards(snapshot, set(req.enabled_cards or [])))
+
+    merchant_cache = {}
+    classes = {}  # (ctx, rule key) -> txn class, see optimizer.plan_month
+    txns = []
+    for i, t in enumerate(req.transactions):
+        _check_amount(t.amount, f"transactions[{i}]: amount")
+        found = merchant_cache.get(t.url)
+        if found is None:
+            found = merchant_cache[t.url] = get_merchant(t.url, snapshot)
+        merchant, (category_from_url, is_online, mcc) = found
+        mcc = t.mcc or mcc
+        category = category_from_mcc(mcc, fallback_category=category_from_url, snapshot=snapshot)
+        currency = t.currency.upper()
+        ctx = (category, is_online, mcc, currency != "SGD")
+        rule_key = snapshot.rate_table.rule_key(merchant, currency, t.amount)
+        cls = classes.get((ctx, rule_key))
+        if cls is None:
+            cls = classes[(ctx, rule_key)] = ctx + (merchant, currency, t.amount)
+        txns.append((t.amount, cls))
+
+    cap_used = get_ledger().month_totals(req.user_id) if req.user_id else {}
+    result = plan_month(cards, txns, mode, cap_used)
+
+    assignments = []
+    per_card = {}
+    for i, (card_idx, r) in enumerate(zip(result["plan"], result["results"])):
+        assignments.append(
+            {
+                "index": i,
+                "card_name": r["card_name"],
+                "miles": r["miles"],
+                "cashback": r["cashback"],
+                "capped": r["capped"],
+            }
+        )
+        totals = per_card.setdefault(r["card_name"], {"spend": 0.0, "miles": 0.0, "cashback": 0.0})
+        totals["spend"] += txns[i][0]
+        totals["miles"] += r["miles"]
+        totals["cashback"] += r["cashback"]
+
+    return {
+        "mode": mode,
+        "total": round(result["total"], 2),
+        "greedy_total": round(result["greedy_total"], 2),
+        "uplift": round(result["total"] - result["greedy_total"], 2),
+        "per_card": {
+            name: {k: round(v, 2) for k, v in totals.items()} for name, totals in per_card.items()
+        },
+        "assignments": assignments,
+        "ruleset_version": snapshot.version,
+    }
+
+
+@app.post("/optimize-wallet")
+def optimize_wallet(req: WalletRequest):
+    """
+    Which max_cards cards to hold for a monthly spend profile, by net
+    annual value after fees (see wallet.choose_wallet).
+    """
+    if not 1 <= req.max_cards <= 10:
+        raise HTTPException(status_code=400, detail="max_cards must be between 1 and 10")
+    if not 1 <= req.top_n <= 20:
+        raise HTTPException(status_code=400, detail="top_n must be between 1 and 20")
+
+    snapshot = ruleset.current()
+    profile = _get_profile(req.profile_id)
+    valuations = dict(profile.valuations) if profile is not None else {}
+    valuations.update(req.valuations or {})
+    try:
+        validate_valuations(valuations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    lines = []
+    for i, line in enumerate(req.spend):
+        _check_amount(line.amount, f"spend[{i}]: amount")
+        if line.txn_amount is not None:
+            _check_amount(line.txn_amount, f"spend[{i}]: txn_amount")
+        if line.amount < 0:
+            raise HTTPException(status_code=400, detail=f"spend[{i}]: amount must not be negative")
+        if line.url:
+            merchant, (category, is_online, mcc) = get_merchant(line.url, snapshot)
+        elif line.category:
+            merchant, category, is_online, mcc = "", line.category, line.online, ""
+        else:
+            raise HTTPException(status_code=400, detail=f"spend[{i}]: send a category or a url")
+        mcc = line.mcc or mcc
+        category = category_from_mcc(mcc, fallback_category=category, snapshot=snapshot)
+        currency = line.currency.upper()
+        txn_amount = line.txn_amount if line.txn_amount is not None else line.amount
+        lines.append((line.amount, (category, is_online, mcc, currency != "SGD", merchant, currency, txn_amount)))
+
+    cards = _enabled_cards(snapshot, set(req.enabled_cards or []))
+    result = choose_wallet(cards, lines, req.max_cards, valuations, req.waive_fees, req.top_n)
+    return {
+        "max_cards": req.max_cards,
+        "waive_fees": req.waive_fees,
+        "spend_lines": [
+            {"category": ctx[0], "is_online": ctx[1], "mcc": ctx[2], "currency": ctx[5], "monthly_spend": amount}
+            for amount, ctx in lines
+        ],
+        **result,
+        "ruleset_version": snapshot.version,
+    }
+
+
+@app.post("/break-even")
+def break_even_curves(req: BreakEvenRequest):
+    """
+    Which card is best at every amount for this merchant, and the exact
+    amounts where the winner changes (see breakeven.py). Earn is
+    cap-aware: bonus rates stop at each card's remaining bonus cap.
+    """
+    snapshot = ruleset.current()
+    profile = _get_profile(req.profile_id)
+    mode = _request_mode(req.mode, "mode" in req.model_fields_set, profile)
+    currency = req.currency.upper()
+    is_fcy = currency != "SGD"
+
+    if profile is not None and not req.enabled_cards:
+        cards = profile.subset(snapshot).cards
+    else:
+        cards = _enabled_cards(snapshot, set(req.enabled_cards or []))
+
+    merchant, (category_from_url, is_online, mcc) = get_merchant(req.url, snapshot)
+    mcc = req.mcc or mcc
+    category = category_from_mcc(mcc, fallback_category=category_from_url, snapshot=snapshot)
+
+    cap_used = get_ledger().month_totals(req.user_id) if req.user_id else {}
+    result = break_even(cards, category, is_online, mcc, is_fcy, mode, cap_used, merchant, currency)
+    return {
+        "category": category,
+        "is_online": is_online,
+        "mcc": mcc,
+        "mode": mode,
+        "is_fcy": is_fcy,
+        **result,
+        "ruleset_version": snapshot.version,
+    }
+
+
+@app.post("/resolve-merchant")
+def resolve_merchant(req: DescriptorRequest):
+    """Category, online flag and MCC for a statement / terminal descriptor, with a match confidence."""
+    snapshot = ruleset.current()
+    key, (category, is_online, mcc), confidence = resolve_descriptor(req.descriptor, snapshot)
+    return {
+        "descriptor": req.descriptor,
+        "merchant": key or None,
+        "category": category,
+        "is_online": is_online,
+        "mcc": mcc,
+        "confidence": round(confidence, 3),
+        "ruleset_version": snapshot.version,
+    }
+
+
+def _statement_context(merchant: str, mcc: str, snapshot: ruleset.Ruleset):
+    """
+    Merchant context (category, is_online, mcc, merchant key) for a
+    statement row; a row's own MCC wins over the detected one.
+    """
+    url = merchant if "://" in merchant else f"https://{merchant}"
+    key, (category_from_url, is_online, detected_mcc) = get_merchant(url, snapshot)
+    if not key and "://" not in merchant:
+        # not a known host: try it as a descriptor ("NTUC FP-TAMPINES 123")
+        key, (category_from_url, is_online, detected_mcc), _ = resolve_descriptor(merchant, snapshot)
+    mcc = mcc or detected_mcc
+    category = category_from_mcc(mcc, fallback_category=category_from_url, snapshot=snapshot)
+    return category, is_online, mcc, key
+
+
+@app.post("/replay-statement")
+async def replay_statement(
+    request: Request,
+    mode: str | None = None,
+    enabled_cards: list[str] | None = Query(None),
+    profile_id: str | None = None,
+):
+    """
+    Replay a statement CSV (request body) and stream, per row, the card
+    recommend_card would have picked and what was missed, as NDJSON.
+    See replay.py for columns and output lines.
+    """
+    snapshot = ruleset.current()
+    profile = _get_profile(profile_id)
+    mode = _request_mode(mode or "miles", mode is not None, profile)
+
+    enabled = set(enabled_cards or [])
+    index = None
+    if enabled:
+        index = [j for j, c in enumerate(snapshot.compiled_cards) if c.name in enabled]
+    elif profile is not None:
+        index = profile.subset(snapshot).index
+
+    # the header is read up front so a bad file is a 400, not a broken stream
+    try:
+        columns, records = await open_statement(request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid statement: {e}")
+
+    replay = StatementReplay(
+        snapshot.rate_table,
+        lambda merchant, mcc: _statement_context(merchant, mcc, snapshot),
+        mode,
+        index,
+    )
+    return StreamingResponse(
+        replay_lines(replay, columns, records),
+        media_type="application/x-ndjson",
+        headers={"X-Ruleset-Version": snapshot.version},
+    )
+
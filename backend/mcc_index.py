@@ -0,0 +1,150 @@
+"""
+MCC -> (category, label) index, loaded from mcc_data.json.
+
+The data file has exact codes plus inclusive code ranges (airlines
+3000–3299, car rental 3351–3441, hotels 3501–3999 are assigned per
+brand, so they're listed as ranges rather than enumerated). Lookup is a
+dict hit for exact codes, otherwise a bisect over the sorted range
+starts; an exact code wins over a range containing it.
+
+Entries share their (category, label) tuples and ranges live in flat
+lists, so the index stays small and lookup cost doesn't grow with the
+table.
+"""
+
+import bisect
+import json
+import os
+from pathlib import Path
+
+MCC_DATA_PATH = Path(os.environ.get("SWIPESMART_MCC_PATH", Path(__file__).parent / "mcc_data.json"))
+
+
+def _code(value, what: str) -> str:
+    if not (isinstance(value, str) and len(value) == 4 and value.isdigit()):
+        raise ValueError(f"{what}: MCC must be a 4-digit string, got {value!r}")
+    return value
+
+
+def validate_mcc_data(data: dict):
+    """Raise ValueError on a malformed mcc_data.json document."""
+    if not isinstance(data, dict):
+        raise ValueError("mcc data must be an object with 'codes' and 'ranges'")
+    seen = set()
+    for i, entry in enumerate(data.get("codes", [])):
+        if not isinstance(entry, dict):
+            raise ValueError(f"codes[{i}] must be an object")
+        code = _code(entry.get("mcc"), f"codes[{i}]")
+        if not isinstance(entry.get("category"), str):
+            raise ValueError(f"codes[{i}] ({code}): 'category' must be a string")
+        if code in seen:
+            raise ValueError(f"codes[{i}]: duplicate MCC {code}")
+        seen.add(code)
+
+    spans = []
+    for i, entry in enumerate(data.get("ranges", [])):
+        if not isinstance(entry, dict):
+            raise ValueError(f"ranges[{i}] must be an object")
+        start = int(_code(entry.get("from"), f"ranges[{i}].from"))
+        end = int(_code(entry.get("to"), f"ranges[{i}].to"))
+        if start > end:
+            raise ValueError(f"ranges[{i}]: 'from' is after 'to'")
+        if not isinstance(entry.get("category"), str):
+            raise ValueError(f"ranges[{i}]: 'category' must be a string")
+        spans.append((start, end))
+    spans.sort()
+    for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+        if start <= prev_end:
+            raise ValueError(f"MCC ranges overlap at {start:04d}")
+
+
+def load_mcc_data(path=MCC_DATA_PATH) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    validate_mcc_data(data)
+    return data
+
+
+class MccIndex:
+    """Read-only MCC lookup built from an mcc_data.json document."""
+
+    __slots__ = ("_codes", "_starts", "_ends", "_range_values", "_size")
+
+    def __init__(self, data: dict):
+        values = {}  # (category, label) -> shared tuple
+
+        def intern(category, label):
+            key = (category, label or "")
+            return values.setdefault(key, key)
+
+        self._codes = {
+            e["mcc"]: intern(e["category"], e.get("label")) for e in data.get("codes", [])
+        }
+        ranges = sorted(
+            (int(e["from"]), int(e["to"]), intern(e["category"], e.get("label")))
+            for e in data.get("ranges", [])
+        )
+        self._starts = [r[0] for r in ranges]
+        self._ends = [r[1] for r in ranges]
+        self._range_values = [r[2] for r in ranges]
+
+        # distinct codes covered (exact codes inside a range count once)
+        covered = sum(end - start + 1 for start, end, _ in ranges)
+        self._size = covered + sum(1 for c in self._codes if self._range_of(int(c)) is None)
+
+    def _range_of(self, code: int):
+        i = bisect.bisect_right(self._starts, code) - 1
+        if i >= 0 and code <= self._ends[i]:
+            return self._range_values[i]
+        return None
+
+    def lookup(self, mcc: str):
+        """(category, label) for mcc, or None if it isn't covered."""
+        entry = self._codes.get(mcc)
+        if entry is not None:
+            return entry
+        if mcc and len(mcc) == 4 and mcc.isdigit():
+            return self._range_of(int(mcc))
+        return None
+
+    def category(self, mcc: str, default: str | None = None) -> str | None:
+        entry = self.lookup(mcc)
+        return entry[0] if entry is not None else default
+
+    def label(self, mcc: str) -> str | None:
+        entry = self.lookup(mcc)
+        return entry[1] if entry is not None else None
+
+    def export(self) -> dict:
+        """Compact {"codes": {mcc: category}, "ranges": [[from, to, category]]} (no labels)."""
+        return {
+            "codes": {mcc: v[0] for mcc, v in self._codes.items()},
+            "ranges": [
+                [start, end, v[0]]
+                for start, end, v in zip(self._starts, self._ends, self._range_values)
+            ],
+        }
+
+    def to_data(self) -> dict:
+        """The index as an mcc_data.json document (MccIndex(ix.to_data()) rebuilds it)."""
+
+        def entry(value, **key):
+            category, label = value
+            return {**key, "category": category, **({"label": label} if label else {})}
+
+        return {
+            "ranges": [
+                entry(v, **{"from": f"{start:04d}", "to": f"{end:04d}"})
+                for start, end, v in zip(self._starts, self._ends, self._range_values)
+            ],
+            "codes": [entry(v, mcc=mcc) for mcc, v in self._codes.items()],
+        }
+
+    def categories(self) -> set:
+        return {v[0] for v in self._codes.values()} | {v[0] for v in self._range_values}
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return f"MccIndex(codes={len(self._codes)}, ranges={len(self._starts)})"
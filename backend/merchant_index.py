@@ -0,0 +1,105 @@
+"""
+Hostname → merchant lookup.
+
+merchants.json holds two kinds of rules:
+- domain rules ("shopee.sg", "mall.shopee.sg"): match the host or any
+  subdomain of it, stored in a reversed-label suffix trie
+- brand rules ("shopee"): match any host that has that exact label,
+  so one rule covers shopee.sg, shopee.com.my, www.shopee.ph, ...
+
+Lookup walks the host's labels once, so cost depends on the host length,
+not on how many merchants are loaded. The most specific rule wins:
+the longest matching domain rule, else the brand label closest to the
+TLD. Unlike a substring scan, "notbooking.example" no longer matches
+"booking".
+"""
+
+import json
+import os
+from pathlib import Path
+
+MERCHANTS_PATH = Path(os.environ.get("SWIPESMART_MERCHANTS_PATH", Path(__file__).parent / "merchants.json"))
+
+# trie node key holding the rule value (can't clash with a host label)
+_VALUE = "$"
+
+
+def load_merchants(path=MERCHANTS_PATH) -> dict:
+    """Read merchants.json into {match: (category, is_online, mcc)}."""
+    with open(path, "r") as f:
+        rows = json.load(f)
+
+    merchants = {}
+    for row in rows:
+        key = row["match"].strip().lower().strip(".")
+        if not key:
+            raise ValueError(f"Empty merchant match in {path}")
+        merchants[key] = (row["category"], bool(row["online"]), str(row["mcc"]))
+    return merchants
+
+
+def load_merchant_aliases(path=MERCHANTS_PATH) -> dict:
+    """
+    {alias: match} from the optional "aliases" lists in merchants.json:
+    other names a merchant goes by on statements and terminals
+    ("ntuc fp", "cold storage"), used by descriptor_index.
+    """
+    with open(path, "r") as f:
+        rows = json.load(f)
+
+    aliases = {}
+    for row in rows:
+        key = row["match"].strip().lower().strip(".")
+        for alias in row.get("aliases", []):
+            if not isinstance(alias, str) or not alias.strip():
+                raise ValueError(f"Merchant {key!r} in {path}: aliases must be non-empty strings")
+            aliases[alias.strip().lower()] = key
+    return aliases
+
+
+class MerchantIndex:
+    def __init__(self, merchants: dict):
+        self._trie = {}
+        self._brands = {}
+
+        for key, info in merchants.items():
+            if "." in key:
+                node = self._trie
+                for label in reversed(key.split(".")):
+                    node = node.setdefault(label, {})
+                node[_VALUE] = (key, info)
+            else:
+                self._brands[key] = info
+
+    def lookup(self, host: str):
+        """
+        Returns (category, is_online, mcc) for the host, or None.
+        host should already be lower-cased (urlparse().hostname is).
+        """
+        found = self.match(host)
+        return None if found is None else found[1]
+
+    def match(self, host: str):
+        """Like lookup, but returns (merchants.json key, info) so card rules can test the merchant."""
+        labels = host.rstrip(".").split(".")
+
+        # 1) longest domain-suffix match
+        best = None
+        node = self._trie
+        for label in reversed(labels):
+            node = node.get(label)
+            if node is None:
+                break
+            if _VALUE in node:
+                best = node[_VALUE]
+        if best is not None:
+            return best
+
+        # 2) brand label, nearest the registrable domain first
+        brands = self._brands
+        for label in reversed(labels):
+            info = brands.get(label)
+            if info is not None:
+                return label, info
+
+        return None
@@ -0,0 +1,185 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Hot-path code guards every measurement with `if metrics.ENABLED:`, so
+with SWIPESMART_METRICS=0 the cost is one global bool check per stage
+and nothing is timed or recorded. When enabled, recommend_card only
+appends (stage, perf_counter()) marks to a local list and hands them to
+record_recommendation() once, which updates every metric under a single
+lock acquisition.
+"""
+
+import bisect
+import os
+import threading
+
+ENABLED = os.environ.get("SWIPESMART_METRICS", "1") != "0"
+
+# one lock for all metrics: a request's updates are applied together
+_LOCK = threading.Lock()
+
+# seconds; recommend_card stages run in microseconds, requests in ms
+LATENCY_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0,
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+
+    def _inc(self, label_values: tuple, amount: float = 1):
+        # caller holds _LOCK
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def inc(self, *label_values, amount: float = 1):
+        with _LOCK:
+            self._inc(label_values, amount)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _LOCK:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_fmt_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def _new_series(self, label_values: tuple) -> list:
+        series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        return series
+
+    def _observe(self, value: float, label_values: tuple):
+        # caller holds _LOCK
+        series = self._series.get(label_values) or self._new_series(label_values)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def observe(self, value: float, *label_values):
+        with _LOCK:
+            self._observe(value, label_values)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _LOCK:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                labels = _fmt_labels(self.labels + ("le",), label_values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _fmt_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "swipesmart_stage_seconds",
+    "Time spent in each recommend_card stage.",
+    labels=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "swipesmart_request_seconds",
+    "End-to-end recommend_card time, by cache outcome.",
+    labels=("cache",),
+)
+CARDS_EVALUATED = Histogram(
+    "swipesmart_cards_evaluated",
+    "Cards scored per uncached recommendation.",
+    buckets=COUNT_BUCKETS,
+)
+REQUESTS = Counter(
+    "swipesmart_recommendations_total",
+    "Recommendations served, by mode, category and currency.",
+    labels=("mode", "category", "currency"),
+)
+OUTCOMES = Counter(
+    "swipesmart_best_card_outcomes_total",
+    "Uncached recommendations whose best card was blocked / over the bonus cap.",
+    labels=("outcome",),
+)
+
+ALL = (STAGE_SECONDS, REQUEST_SECONDS, CARDS_EVALUATED, REQUESTS, OUTCOMES)
+
+
+def currency_label(currency: str) -> str:
+    """Keep label cardinality bounded: ISO-style codes only."""
+    code = currency.upper()
+    return code if len(code) == 3 and code.isalpha() else "other"
+
+
+def record_recommendation(
+    marks: list,
+    cache: str,
+    mode: str,
+    category: str,
+    currency: str,
+    cards_evaluated: int | None = None,
+    outcomes: tuple = (),
+):
+    """
+    Record one recommend_card call. marks is [(stage, perf_counter())...]
+    starting with ("start", t0); each later mark closes the stage named
+    by it. cache is "hit" / "miss" / "bypass" / "coalesced".
+    """
+    request_labels = (mode, category, currency_label(currency))
+    stage_series = STAGE_SECONDS._series
+    stage_buckets = STAGE_SECONDS.buckets
+    bisect_left = bisect.bisect_left
+    with _LOCK:
+        # inlined Histogram._observe: this loop runs once per stage per request
+        start = prev = marks[0][1]
+        for stage, t in marks[1:]:
+            dt = t - prev
+            prev = t
+            key = (stage,)
+            series = stage_series.get(key) or STAGE_SECONDS._new_series(key)
+            series[bisect_left(stage_buckets, dt)] += 1
+            series[-1] += dt
+        REQUEST_SECONDS._observe(prev - start, (cache,))
+        REQUESTS._inc(request_labels)
+        if cards_evaluated is not None:
+            CARDS_EVALUATED._observe(cards_evaluated, ())
+        for outcome in outcomes:
+            OUTCOMES._inc((outcome,))
+
+
+def render(extra=()) -> str:
+    """
+    Prometheus text format. extra: (name, type, help, value) tuples for
+    values owned elsewhere (e.g. the result cache's own counters).
+    """
+    lines = []
+    for metric in ALL:
+        lines.extend(metric.render())
+    for name, kind, help_text, value in extra:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
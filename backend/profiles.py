@@ -0,0 +1,195 @@
+"""
+Stored user card profiles: wallet, preferred mode and reward valuations.
+
+A client registers its profile once (PUT /profiles/{profile_id}) and then
+sends only profile_id instead of the enabled_cards list with every request.
+Profiles live in a local SQLite table behind an in-memory LRU. Other
+workers write the same file: when PRAGMA data_version says another
+connection has committed, a cached profile is checked against its row
+(one primary-key read) before it is served again. Each
+profile's wallet is compiled against a ruleset version into a CardSubset
+(index array + bitmask) on first use, so requests skip the per-call name
+filtering and caches can key on the small bitmask instead of a set of names.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+PROFILES_PATH = Path(os.environ.get("SWIPESMART_PROFILES_PATH", Path(__file__).parent / "profiles.db"))
+
+MODES = ("miles", "cashback")
+# SGD value of one mile / one cashback dollar, used for estimated_value
+VALUATION_KEYS = ("miles", "cashback")
+DEFAULT_VALUATIONS = {"miles": 0.0, "cashback": 1.0}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    profile_id TEXT PRIMARY KEY,
+    wallet TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    valuations TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class CardSubset:
+    """
+    The cards one wallet selects from one ruleset version.
+    index is None for "all cards"; mask has bit j set for compiled_cards[j].
+    """
+
+    __slots__ = ("version", "index", "cards", "mask")
+
+    def __init__(self, version, index, cards, mask):
+        self.version = version
+        self.index = index
+        self.cards = cards
+        self.mask = mask
+
+
+def compile_subset(snapshot, wallet) -> CardSubset:
+    """CardSubset for the card names in wallet (empty wallet = every card)."""
+    cards = snapshot.compiled_cards
+    if not wallet:
+        return CardSubset(snapshot.version, None, cards, (1 << len(cards)) - 1)
+    names = set(wallet)
+    index = [j for j, card in enumerate(cards) if card.name in names]
+    mask = 0
+    for j in index:
+        mask |= 1 << j
+    return CardSubset(snapshot.version, np.array(index, dtype=np.intp), tuple(cards[j] for j in index), mask)
+
+
+def validate_profile(mode: str, valuations: dict):
+    """Raise ValueError on a bad mode or valuation."""
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    validate_valuations(valuations)
+
+
+def validate_valuations(valuations: dict):
+    """Raise ValueError on an unknown or negative valuation."""
+    for key, value in valuations.items():
+        if key not in VALUATION_KEYS:
+            raise ValueError(f"unknown valuation {key!r} (expected {', '.join(VALUATION_KEYS)})")
+        if value < 0:
+            raise ValueError(f"valuation {key!r} must not be negative")
+
+
+class Profile:
+    __slots__ = ("profile_id", "wallet", "mode", "valuations", "updated_at", "_subset")
+
+    def __init__(self, profile_id: str, wallet, mode: str, valuations: dict, updated_at: float):
+        self.profile_id = profile_id
+        self.wallet = tuple(wallet)
+        self.mode = mode
+        self.valuations = dict(valuations)
+        self.updated_at = updated_at
+        self._subset = None
+
+    def subset(self, snapshot) -> CardSubset:
+        """The wallet compiled against snapshot, rebuilt only when its version changes."""
+        subset = self._subset
+        if subset is None or subset.version != snapshot.version:
+            subset = self._subset = compile_subset(snapshot, self.wallet)
+        return subset
+
+    def value(self, miles: float, cashback: float) -> float:
+        """SGD value of an earn under this profile's valuations."""
+        v = self.valuations
+        return round(
+            miles * v.get("miles", DEFAULT_VALUATIONS["miles"])
+            + cashback * v.get("cashback", DEFAULT_VALUATIONS["cashback"]),
+            2,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "wallet": list(self.wallet),
+            "mode": self.mode,
+            "valuations": dict(self.valuations),
+            "updated_at": self.updated_at,
+        }
+
+
+class ProfileStore:
+    def __init__(self, path=PROFILES_PATH, max_cached: int = 50_000):
+        self.path = str(path)
+        self.max_cached = max_cached
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()  # profile_id -> (Profile, data_version it was last checked at)
+
+    def _data_version(self) -> int:
+        # changes when another connection (worker) commits to the file
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _remember(self, profile: Profile, data_version: int):
+        # caller holds the lock
+        self._profiles[profile.profile_id] = (profile, data_version)
+        self._profiles.move_to_end(profile.profile_id)
+        while len(self._profiles) > self.max_cached:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Profile | None:
+        with self._lock:
+            # 1) cached and nobody else has written since it was checked
+            data_version = self._data_version()
+            profile, checked = self._profiles.get(profile_id, (None, None))
+            if profile is not None and checked == data_version:
+                self._profiles.move_to_end(profile_id)
+                return profile
+
+            # 2) otherwise the row decides: gone, unchanged (keeps the compiled wallet) or replaced
+            row = self._conn.execute(
+                "SELECT wallet, mode, valuations, updated_at FROM profiles WHERE profile_id = ?",
+                (profile_id,),
+            ).fetchone()
+            if row is None:
+                self._profiles.pop(profile_id, None)
+                return None
+            wallet, mode, valuations, updated_at = row
+            if profile is None or profile.updated_at != updated_at:
+                profile = Profile(profile_id, json.loads(wallet), mode, json.loads(valuations), updated_at)
+            self._remember(profile, data_version)
+            return profile
+
+    def put(self, profile_id: str, wallet, mode: str = "miles", valuations: dict | None = None) -> Profile:
+        """Create or replace a profile. Raises ValueError on invalid fields."""
+        valuations = valuations or {}
+        validate_profile(mode, valuations)
+        # dedupe, keep the caller's order
+        profile = Profile(profile_id, dict.fromkeys(wallet), mode, valuations, time.time())
+        with self._lock:
+            # read first: a write from another worker after ours must still trigger a check
+            data_version = self._data_version()
+            self._conn.execute(
+                "INSERT INTO profiles (profile_id, wallet, mode, valuations, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (profile_id) DO UPDATE SET wallet = excluded.wallet, mode = excluded.mode, "
+                "valuations = excluded.valuations, updated_at = excluded.updated_at",
+                (profile_id, json.dumps(profile.wallet), mode, json.dumps(profile.valuations), profile.updated_at),
+            )
+            self._remember(profile, data_version)
+        return profile
+
+    def delete(self, profile_id: str) -> bool:
+        with self._lock:
+            self._profiles.pop(profile_id, None)
+            cur = self._conn.execute("DELETE FROM profiles WHERE profile_id = ?", (profile_id,))
+            return cur.rowcount > 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,114 @@
+"""
+Sampled request profiling, switched on at runtime (POST /admin/profiling).
+
+While SAMPLE_RATE > 0, that fraction of /recommend-card requests runs
+under cProfile and the stats are merged into one aggregate. dump()
+writes it to PROFILE_DIR as a .pstats file (open with pstats or
+snakeviz) plus a text summary of the most expensive functions; switching
+sampling off dumps automatically. Only one request is profiled at a
+time: a sampled request that finds the profiler busy runs normally.
+
+With SAMPLE_RATE at 0 (the default) the request path only reads one
+float.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from pathlib import Path
+
+PROFILE_DIR = Path(os.environ.get("SWIPESMART_PROFILE_DIR", Path(__file__).parent / "profiling"))
+
+# fraction of requests profiled; 0 = off
+SAMPLE_RATE = 0.0
+
+_lock = threading.Lock()  # guards everything below
+_busy = threading.Lock()  # held while a request is profiled
+_stats = None  # pstats.Stats aggregate since sampling was switched on
+_samples = 0
+_skipped = 0  # sampled while another request was being profiled
+_since = None
+_last_dump = None
+
+
+def sampled() -> bool:
+    return random.random() < SAMPLE_RATE
+
+
+def profiled(fn, *args):
+    """fn(*args) under cProfile, merged into the aggregate."""
+    global _skipped
+    if not _busy.acquire(blocking=False):
+        with _lock:
+            _skipped += 1
+        return fn(*args)
+    try:
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args)
+        finally:
+            _add(profile)
+    finally:
+        _busy.release()
+
+
+def _add(profile):
+    global _stats, _samples
+    with _lock:
+        if _stats is None:
+            _stats = pstats.Stats(profile)
+        else:
+            _stats.add(profile)
+        _samples += 1
+
+
+def configure(sample_rate: float) -> dict:
+    """Set the sample rate. Switching on starts a fresh aggregate; switching off dumps the current one."""
+    global SAMPLE_RATE, _stats, _samples, _skipped, _since
+    if not 0.0 <= sample_rate <= 1.0:
+        raise ValueError("sample_rate must be between 0 and 1")
+    dumped = None
+    if sample_rate == 0.0 and SAMPLE_RATE > 0.0:
+        SAMPLE_RATE = 0.0
+        dumped = dump()
+    elif sample_rate > 0.0 and SAMPLE_RATE == 0.0:
+        with _lock:
+            _stats, _samples, _skipped, _since = None, 0, 0, time.time()
+    SAMPLE_RATE = sample_rate
+    return {**status(), "dumped": dumped}
+
+
+def dump(top: int = 40) -> dict | None:
+    """Write the aggregate to PROFILE_DIR; None when nothing has been sampled yet."""
+    global _last_dump
+    with _lock:
+        if _stats is None:
+            return None
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stem = PROFILE_DIR / f"recommend-card-{time.strftime('%Y%m%d-%H%M%S')}-{_samples}"
+        _stats.dump_stats(f"{stem}.pstats")
+
+        text = io.StringIO()
+        summary = pstats.Stats(f"{stem}.pstats", stream=text)
+        text.write(f"{_samples} sampled requests since {time.ctime(_since)}\n")
+        summary.sort_stats("cumulative").print_stats(top)
+        Path(f"{stem}.txt").write_text(text.getvalue())
+
+        _last_dump = {"pstats": f"{stem}.pstats", "summary": f"{stem}.txt", "samples": _samples}
+        return _last_dump
+
+
+def status() -> dict:
+    with _lock:
+        return {
+            "sample_rate": SAMPLE_RATE,
+            "samples": _samples,
+            "skipped_busy": _skipped,
+            "since": _since,
+            "profile_dir": str(PROFILE_DIR),
+            "last_dump": _last_dump,
+        }
@@ -0,0 +1,359 @@
+"""
+Statement replay: a bank statement CSV in, NDJSON recommendations out.
+
+Rows flow through a chain of generators, so memory stays bounded by one
+chunk however long the statement is:
+
+    body bytes -> records() -> open_statement() -> replay_lines()
+    (replay_lines scores CHUNK_ROWS rows at a time with score_chunk)
+
+Columns (header row, any order, case-insensitive): date, merchant,
+amount, currency, mcc, card_used. merchant and amount are required;
+merchant may be a URL, a host, a brand label or a statement descriptor
+("NTUC FP-TAMPINES 123", see descriptor_index.py). Output lines:
+
+    {"type": "row", ...}     what recommend_card would pick vs the card used;
+                             refunds / reversals (amount <= 0) have
+                             "refund": true and no best card or earn
+    {"type": "error", ...}   a row that couldn't be parsed (replay carries on)
+    {"type": "totals", ...}  running totals after every chunk; the last
+                             one has "done": true
+"""
+
+import codecs
+import csv
+import heapq
+import json
+import math
+
+from starlette.concurrency import run_in_threadpool
+
+from batch import best_card_indices
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+COLUMNS = ("date", "merchant", "amount", "currency", "mcc", "card_used")
+REQUIRED_COLUMNS = ("merchant", "amount")
+
+# rows scored per matrix call / per totals line
+CHUNK_ROWS = 1000
+
+# merchant contexts and rate tables kept between chunks; cleared when full
+_MAX_CONTEXTS = 10_000
+
+# one malformed record (a stray quote, no newlines) can't buffer the rest of the upload
+MAX_RECORD_LINES = 50
+MAX_RECORD_CHARS = 64 * 1024
+
+
+class RecordError(ValueError):
+    """Yielded by records() in place of a record it gave up on."""
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+
+
+async def records(chunks):
+    """
+    Split a byte stream into CSV records (strings), without buffering it.
+    A record only ends on a newline outside quotes, so quoted fields may
+    contain newlines. A quote still open after MAX_RECORD_LINES lines or
+    MAX_RECORD_CHARS characters yields a RecordError for the record's
+    first line, and the lines after it are read again as new records; a
+    longer line without a newline yields a RecordError and is skipped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    parts = []
+    size = 0
+    in_quotes = False
+    skipping = False  # dropping the rest of an over-long line
+
+    def split(text):
+        nonlocal in_quotes, size
+        for line in text:
+            parts.append(line)
+            size += len(line)
+            # "" escapes come in pairs, so odd counts toggle quoting
+            if line.count('"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes:
+                record = "\n".join(parts).rstrip("\r")
+                parts.clear()
+                size = 0
+                if record.strip():
+                    yield record
+            elif len(parts) > MAX_RECORD_LINES or size > MAX_RECORD_CHARS:
+                yield RecordError(f"unterminated quote: record runs past {MAX_RECORD_LINES} lines / {MAX_RECORD_CHARS} chars")
+                rest = parts[1:]
+                parts.clear()
+                size = 0
+                in_quotes = False
+                # at most MAX_RECORD_LINES lines, so this nests at most that deep
+                yield from split(rest)
+
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if skipping:
+            cut = text.find("\n")
+            if cut < 0:
+                continue
+            text = text[cut + 1:]
+            skipping = False
+        lines = (tail + text).split("\n")
+        tail = lines.pop()
+        for record in split(lines):
+            yield record
+        if len(tail) > MAX_RECORD_CHARS:
+            yield RecordError(f"line longer than {MAX_RECORD_CHARS} characters")
+            tail = ""
+            parts.clear()
+            size = 0
+            in_quotes = False
+            skipping = True
+
+    text = decoder.decode(b"", final=True)
+    lines = (tail + ("" if skipping else text)).split("\n")
+    for record in split(lines):
+        yield record
+    if parts:
+        # unterminated quote at EOF: hand csv what we have
+        yield "\n".join(parts)
+
+
+async def open_statement(chunks):
+    """
+    Read the header record. Returns (column -> index, remaining records).
+    Raises ValueError if the header is missing or lacks required columns.
+    """
+    recs = records(chunks)
+    header = None
+    async for record in recs:
+        if isinstance(record, RecordError):
+            raise ValueError(f"bad header: {record}")
+        header = next(csv.reader([record]))
+        break
+    if header is None:
+        raise ValueError("empty statement")
+
+    columns = {}
+    for i, name in enumerate(header):
+        name = name.strip().lower()
+        if name in COLUMNS and name not in columns:
+            columns[name] = i
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    return columns, recs
+
+
+def _parse_row(fields: list, columns: dict) -> tuple:
+    """(date, merchant, amount, currency, mcc, card_used); raises ValueError."""
+
+    def get(name):
+        i = columns.get(name)
+        return fields[i].strip() if i is not None and i < len(fields) else ""
+
+    merchant = get("merchant")
+    if not merchant:
+        raise ValueError("empty merchant")
+    raw_amount = get("amount").replace(",", "").replace("$", "")
+    try:
+        amount = float(raw_amount)
+    except ValueError:
+        raise ValueError(f"bad amount {get('amount')!r}") from None
+    if not math.isfinite(amount):
+        raise ValueError(f"bad amount {get('amount')!r}")
+    currency = (get("currency") or "SGD").upper()
+    return get("date"), merchant, amount, currency, get("mcc"), get("card_used")
+
+
+class StatementReplay:
+    """
+    Scores statement rows against one ruleset snapshot's RateTable
+    (restricted to rate_table.cards[index] when index is given).
+    resolve(merchant, mcc) -> (category, is_online, mcc, merchant key) maps
+    a row to its merchant context (main.py wires in the same lookups as
+    recommend_card).
+    """
+
+    def __init__(self, rate_table, resolve, mode: str = "miles", index=None):
+        self.rate_table = rate_table
+        self.index = index
+        self.cards = rate_table.cards if index is None else tuple(rate_table.cards[j] for j in index)
+        self.resolve = resolve
+        self.mode = mode
+        self._card_index = {card.name: i for i, card in enumerate(self.cards)}
+        self._contexts = {}  # (merchant, mcc) -> context
+        self._rates = {}  # (context, is_fcy, rule key) -> rate vectors
+        self.totals = {
+            "rows": 0,
+            "errors": 0,
+            "spend": 0.0,
+            "refunds": 0.0,
+            "best_earn": 0.0,
+            "actual_earn": 0.0,
+            "missed": 0.0,
+            "missed_by_card": {},
+        }
+
+    def _context(self, merchant: str, mcc: str):
+        key = (merchant, mcc)
+        ctx = self._contexts.get(key)
+        if ctx is None:
+            if len(self._contexts) >= _MAX_CONTEXTS:
+                self._contexts.clear()
+            ctx = self._contexts[key] = self.resolve(merchant, mcc)
+        return ctx
+
+    def _rate_vectors(self, ctx, is_fcy: bool, rule_key: tuple, currency: str, amount: float):
+        # currency / amount: any row with this rule key (see RateTable.rule_key)
+        key = (ctx, is_fcy, rule_key)
+        rates = self._rates.get(key)
+        if rates is None:
+            if len(self._rates) >= _MAX_CONTEXTS:
+                self._rates.clear()
+            category, is_online, mcc, merchant = ctx
+            rates = self._rates[key] = self.rate_table.vectors(
+                category, is_online, mcc, is_fcy, self.index, merchant, currency, amount
+            )
+        return rates
+
+    def _earn(self, amount: float, mpd, cashback_rate, i: int) -> float:
+        # same rounding as CompiledCard.rewards (blocked cards have zero rates)
+        if self.mode == "miles":
+            return round(amount * float(mpd[i]), 2)
+        rate = float(cashback_rate[i])
+        return round(amount * rate / 100, 2) if rate else 0.0
+
+    def score_chunk(self, rows: list) -> list:
+        """rows: [(line, parsed row)]. Returns output dicts in row order."""
+        # 1) merchant context per row, grouped so each group is one matrix
+        groups = {}
+        refunds = []
+        rule_key = self.rate_table.rule_key
+        for k, (_, (_, merchant, amount, currency, mcc, _)) in enumerate(rows):
+            ctx = self._context(merchant, mcc)
+            if amount <= 0:
+                refunds.append((k, ctx))
+                continue
+            key = (ctx, currency != "SGD", rule_key(ctx[3], currency, amount))
+            groups.setdefault(key, []).append(k)
+
+        out = [None] * len(rows)
+        totals = self.totals
+        missed_by_card = totals["missed_by_card"]
+
+        # refunds / reversals earn nothing to compare: no best card, kept out of the earn totals
+        for k, ctx in refunds:
+            out[k] = self._row(rows[k], ctx, None, None, None, None, refund=True)
+            totals["rows"] += 1
+            totals["refunds"] -= rows[k][1][2]
+
+        # 2) best card per row, vectorized per group
+        for (ctx, is_fcy, key), members in groups.items():
+            first = rows[members[0]][1]
+            mpd, cashback_rate, _ = self._rate_vectors(ctx, is_fcy, key, first[3], first[2])
+            amounts = [rows[k][1][2] for k in members]
+            best = best_card_indices(amounts, mpd, cashback_rate, self.mode)
+
+            for k, amount, best_i in zip(members, amounts, best.tolist()):
+                card_used = rows[k][1][5]
+                best_earn = self._earn(amount, mpd, cashback_rate, best_i) if best_i >= 0 else 0.0
+
+                # 3) what the card actually used earned (unknown card -> no comparison)
+                used_i = self._card_index.get(card_used)
+                actual_earn = missed = None
+                if used_i is not None:
+                    actual_earn = self._earn(amount, mpd, cashback_rate, used_i)
+                    missed = round(max(best_earn - actual_earn, 0.0), 2)
+                    totals["actual_earn"] += actual_earn
+                    totals["missed"] += missed
+                    if missed:
+                        missed_by_card[card_used] = missed_by_card.get(card_used, 0.0) + missed
+
+                totals["rows"] += 1
+                totals["spend"] += amount
+                totals["best_earn"] += best_earn
+                best_card = self.cards[best_i].name if best_i >= 0 else None
+                out[k] = self._row(rows[k], ctx, best_card, best_earn, actual_earn, missed)
+        return out
+
+    @staticmethod
+    def _row(row, ctx, best_card, best_earn, actual_earn, missed, refund: bool = False) -> dict:
+        line, (date, merchant, amount, currency, _, card_used) = row
+        category, is_online, mcc, _ = ctx
+        return {
+            "type": "row",
+            "line": line,
+            "date": date,
+            "merchant": merchant,
+            "amount": amount,
+            "currency": currency,
+            "category": category,
+            "is_online": is_online,
+            "mcc": mcc,
+            "card_used": card_used or None,
+            "refund": refund,
+            "best_card": best_card,
+            "best_earn": best_earn,
+            "actual_earn": actual_earn,
+            "missed": missed,
+        }
+
+    def totals_line(self, done: bool = False) -> dict:
+        t = self.totals
+        return {
+            "type": "totals",
+            "mode": self.mode,
+            "rows": t["rows"],
+            "errors": t["errors"],
+            "spend": round(t["spend"], 2),
+            "refunds": round(t["refunds"], 2),
+            "best_earn": round(t["best_earn"], 2),
+            "actual_earn": round(t["actual_earn"], 2),
+            "missed": round(t["missed"], 2),
+            "missed_by_card": {k: round(v, 2) for k, v in t["missed_by_card"].items()},
+            "done": done,
+        }
+
+
+async def replay_lines(replay: StatementReplay, columns: dict, recs, chunk_rows: int = CHUNK_ROWS):
+    """NDJSON byte lines for the records after the header (see module doc)."""
+    line = 1  # header
+    pending = []
+    errors = []
+
+    async def flush():
+        # scoring is CPU-bound: keep it off the event loop
+        scored = await run_in_threadpool(replay.score_chunk, pending) if pending else []
+        # both lists are in line order; keep the output in statement order
+        lines = [_dumps(e) for e in heapq.merge(errors, scored, key=lambda e: e["line"])]
+        lines.append(_dumps(replay.totals_line()))
+        pending.clear()
+        errors.clear()
+        return b"".join(lines)
+
+    async for record in recs:
+        line += 1
+        try:
+            if isinstance(record, RecordError):
+                raise record
+            row = _parse_row(next(csv.reader([record])), columns)
+        except (ValueError, csv.Error) as e:
+            replay.totals["errors"] += 1
+            errors.append({"type": "error", "line": line, "error": str(e)})
+        else:
+            pending.append((line, row))
+        if len(pending) + len(errors) >= chunk_rows:
+            yield await flush()
+
+    if pending or errors:
+        yield await flush()
+    yield _dumps(replay.totals_line(done=True))
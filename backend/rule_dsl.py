@@ -0,0 +1,301 @@
+"""
+Card reward rules: a small declarative language in cards_data.json.
+
+A card may carry a "rules" list. Rules are checked in order and the
+first one whose "when" matches a txn applies its "then" on top of the
+card's regular rates (blocked_categories / blocked_mccs still win):
+
+    "rules": [
+      {"name": "Dairy Farm / BreadTalk partners",
+       "when": {"merchant": ["coldstorage", "giant", "breadtalk"]},
+       "then": {"cashback_rate": 17.0}},
+      {"name": "Overseas dining, S$50+",
+       "when": {"category": ["dining"], "amount": {"min": 50}, "not": {"currency": ["SGD"]}},
+       "then": {"mpd": 4.0}},
+      {"name": "No top-ups", "when": {"mcc": ["4829", "6540-6541"]}, "then": {"block": true}}
+    ]
+
+Conditions (every one given must hold; a list matches any of its values):
+    merchant  merchants.json match keys, e.g. "shopee", "mall.shopee.sg"
+    mcc       codes or inclusive ranges, e.g. "5811-5814"
+    category  categories; a parent also matches its children
+    currency  ISO codes
+    online    true / false
+    amount    {"min": inclusive, "max": exclusive}
+    not       a nested condition object that must not match
+Effects: "mpd" (effective miles per dollar for the txn), "cashback_rate"
+(%), or "block": true.
+
+compile_rules() turns a card's list into one closure at load time, so a
+request pays for a few set lookups, not for walking JSON.
+interpret_rules() walks the JSON on every call. It backs the reference
+compute_card_rewards and the rules benchmark.
+"""
+
+from typing import NamedTuple
+
+CONDITIONS = ("merchant", "mcc", "category", "currency", "online", "amount", "not")
+EFFECTS = ("mpd", "cashback_rate", "block")
+
+
+class RuleEffect(NamedTuple):
+    name: str
+    block: bool
+    mpd: float | None
+    cashback_rate: float | None
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+
+def _mcc_span(value: str):
+    """(lo, hi) for "dddd" or "dddd-dddd", else None."""
+    lo, _, hi = value.partition("-")
+    hi = hi or lo
+    if len(lo) == len(hi) == 4 and lo.isdigit() and hi.isdigit() and int(lo) <= int(hi):
+        return int(lo), int(hi)
+    return None
+
+
+def _validate_when(when, where: str):
+    if not isinstance(when, dict):
+        raise ValueError(f"{where}: 'when' must be an object")
+    for key, value in when.items():
+        if key not in CONDITIONS:
+            raise ValueError(f"{where}: unknown condition {key!r}")
+        if key in ("merchant", "mcc", "category", "currency"):
+            if not isinstance(value, list) or not value or not all(isinstance(v, str) and v for v in value):
+                raise ValueError(f"{where}: {key} must be a non-empty list of strings")
+            if key == "mcc":
+                bad = [v for v in value if _mcc_span(v) is None]
+                if bad:
+                    raise ValueError(f"{where}: bad MCC {bad[0]!r} (use 'dddd' or 'dddd-dddd')")
+        elif key == "online":
+            if not isinstance(value, bool):
+                raise ValueError(f"{where}: online must be true or false")
+        elif key == "amount":
+            if not isinstance(value, dict) or not value or set(value) - {"min", "max"}:
+                raise ValueError(f"{where}: amount must be {{'min': x, 'max': y}}")
+            if not all(_is_number(v) for v in value.values()):
+                raise ValueError(f"{where}: amount bounds must be non-negative numbers")
+            if "min" in value and "max" in value and value["min"] >= value["max"]:
+                raise ValueError(f"{where}: amount min must be below max")
+        else:  # not
+            _validate_when(value, f"{where}.not")
+
+
+def validate_rules(rules, card_name: str) -> None:
+    """Raise ValueError if a card's rules list is malformed."""
+    if not isinstance(rules, list):
+        raise ValueError(f"{card_name}: rules must be a list")
+    for i, rule in enumerate(rules):
+        where = f"{card_name}: rules[{i}]"
+        if not isinstance(rule, dict):
+            raise ValueError(f"{where} must be an object")
+        unknown = set(rule) - {"name", "when", "then"}
+        if unknown:
+            raise ValueError(f"{where}: unknown key {sorted(unknown)[0]!r}")
+        if not isinstance(rule.get("name", ""), str):
+            raise ValueError(f"{where}: name must be a string")
+        _validate_when(rule.get("when", {}), where)
+
+        then = rule.get("then")
+        if not isinstance(then, dict) or not then or set(then) - set(EFFECTS):
+            raise ValueError(f"{where}: 'then' must set mpd, cashback_rate or block")
+        if "block" in then and then["block"] is not True:
+            raise ValueError(f"{where}: block must be true")
+        for key in ("mpd", "cashback_rate"):
+            if key in then and not _is_number(then[key]):
+                raise ValueError(f"{where}: {key} must be a non-negative number")
+
+
+def _effect(rule: dict, i: int) -> RuleEffect:
+    then = rule["then"]
+    return RuleEffect(
+        rule.get("name") or f"rule {i + 1}",
+        bool(then.get("block")),
+        then.get("mpd"),
+        then.get("cashback_rate"),
+    )
+
+
+def normalize_when(when: dict, expand_categories) -> dict:
+    """
+    Canonical form of a condition: merchants lower-cased, currencies
+    upper-cased, categories expanded to their children, MCCs split into
+    {"codes", "ranges"}. This is what gets compiled and what clients get.
+    """
+    out = {}
+    if "merchant" in when:
+        out["merchant"] = sorted({m.strip().lower().strip(".") for m in when["merchant"]})
+    if "mcc" in when:
+        codes, ranges = set(), []
+        for value in when["mcc"]:
+            lo, hi = _mcc_span(value)
+            if lo == hi:
+                codes.add(f"{lo:04d}")
+            else:
+                ranges.append([lo, hi])
+        out["mcc"] = {"codes": sorted(codes), "ranges": sorted(ranges)}
+    if "category" in when:
+        out["category"] = sorted(expand_categories(set(when["category"])))
+    if "currency" in when:
+        out["currency"] = sorted({c.upper() for c in when["currency"]})
+    if "online" in when:
+        out["online"] = when["online"]
+    if "amount" in when:
+        out["amount"] = dict(when["amount"])
+    if "not" in when:
+        out["not"] = normalize_when(when["not"], expand_categories)
+    return out
+
+
+def normalize_rules(rules: list, expand_categories) -> list:
+    return [
+        {"when": normalize_when(rule.get("when", {}), expand_categories), "then": _effect(rule, i)._asdict()}
+        for i, rule in enumerate(rules)
+    ]
+
+
+def _always(merchant, category, is_online, mcc, currency, amount):
+    return True
+
+
+def _compile_when(when: dict):
+    """One predicate(merchant, category, is_online, mcc, currency, amount) for a normalized condition."""
+    tests = []
+    if "merchant" in when:
+        merchants = frozenset(when["merchant"])
+        tests.append(lambda merchant, category, is_online, mcc, currency, amount: merchant in merchants)
+    if "mcc" in when:
+        # ranges expanded into codes (at most 10k), so the test is one set lookup
+        codes = set(when["mcc"]["codes"])
+        for lo, hi in when["mcc"]["ranges"]:
+            codes.update(f"{code:04d}" for code in range(lo, hi + 1))
+        codes = frozenset(codes)
+        tests.append(lambda merchant, category, is_online, mcc, currency, amount: mcc in codes)
+    if "category" in when:
+        categories = frozenset(when["category"])
+        tests.append(lambda merchant, category, is_online, mcc, currency, amount: category in categories)
+    if "currency" in when:
+        currencies = frozenset(when["currency"])
+        tests.append(lambda merchant, category, is_online, mcc, currency, amount: currency in currencies)
+    if "online" in when:
+        online = when["online"]
+        tests.append(lambda merchant, category, is_online, mcc, currency, amount: is_online == online)
+    if "amount" in when:
+        lo = when["amount"].get("min")
+        hi = when["amount"].get("max")
+        if lo is not None and hi is not None:
+            tests.append(lambda merchant, category, is_online, mcc, currency, amount: lo <= amount < hi)
+        elif lo is not None:
+            tests.append(lambda merchant, category, is_online, mcc, currency, amount: amount >= lo)
+        else:
+            tests.append(lambda merchant, category, is_online, mcc, currency, amount: amount < hi)
+    if "not" in when:
+        inner = _compile_when(when["not"])
+        tests.append(
+            lambda merchant, category, is_online, mcc, currency, amount:
+            not inner(merchant, category, is_online, mcc, currency, amount)
+        )
+
+    if not tests:
+        return _always
+    if len(tests) == 1:
+        return tests[0]
+    tests = tuple(tests)
+
+    def all_of(merchant, category, is_online, mcc, currency, amount):
+        for test in tests:
+            if not test(merchant, category, is_online, mcc, currency, amount):
+                return False
+        return True
+
+    return all_of
+
+
+def compile_rules(rules: list, expand_categories):
+    """
+    rule(merchant, category, is_online, mcc, currency, amount) -> first
+    matching RuleEffect or None; None instead of a function for no rules.
+    """
+    if not rules:
+        return None
+    compiled = tuple(
+        (_compile_when(normalize_when(rule.get("when", {}), expand_categories)), _effect(rule, i))
+        for i, rule in enumerate(rules)
+    )
+
+    def first_match(merchant, category, is_online, mcc, currency, amount):
+        for test, effect in compiled:
+            if test(merchant, category, is_online, mcc, currency, amount):
+                return effect
+        return None
+
+    return first_match
+
+
+def amount_bounds(rules: list) -> tuple:
+    """Every amount threshold the rules test, sorted: rates are constant between them."""
+    bounds = set()
+
+    def walk(when):
+        bounds.update(when.get("amount", {}).values())
+        if "not" in when:
+            walk(when["not"])
+
+    for rule in rules:
+        walk(rule.get("when", {}))
+    return tuple(sorted(bounds))
+
+
+def referenced(rules: list, condition: str) -> set:
+    """Every merchant / currency value a card's normalized rules test."""
+    values = set()
+
+    def walk(when):
+        values.update(when.get(condition, ()))
+        if "not" in when:
+            walk(when["not"])
+
+    for rule in rules:
+        walk(rule["when"])
+    return values
+
+
+def _interpret_when(when, merchant, chain, is_online, mcc, currency, amount) -> bool:
+    if "merchant" in when and merchant not in {m.strip().lower().strip(".") for m in when["merchant"]}:
+        return False
+    if "mcc" in when:
+        matched = False
+        for value in when["mcc"]:
+            lo, hi = _mcc_span(value)
+            if mcc == value or (mcc and len(mcc) == 4 and mcc.isdigit() and lo <= int(mcc) <= hi):
+                matched = True
+                break
+        if not matched:
+            return False
+    if "category" in when and not any(c in when["category"] for c in chain):
+        return False
+    if "currency" in when and currency not in {c.upper() for c in when["currency"]}:
+        return False
+    if "online" in when and is_online != when["online"]:
+        return False
+    if "amount" in when:
+        bounds = when["amount"]
+        if "min" in bounds and amount < bounds["min"]:
+            return False
+        if "max" in bounds and amount >= bounds["max"]:
+            return False
+    if "not" in when and _interpret_when(when["not"], merchant, chain, is_online, mcc, currency, amount):
+        return False
+    return True
+
+
+def interpret_rules(rules: list, merchant, category_chain: tuple, is_online, mcc, currency, amount):
+    """Same answer as the compiled rules, re-reading the JSON on every call."""
+    for i, rule in enumerate(rules):
+        if _interpret_when(rule.get("when", {}), merchant, category_chain, is_online, mcc, currency, amount):
+            return _effect(rule, i)
+    return None
@@ -1,10 +1,106 @@
 import json
+import os
 from pathlib import Path
 
-DATA_PATH = Path(__file__).parent / "cards_data.json"
+from rule_dsl import amount_bounds, compile_rules, interpret_rules, normalize_rules, validate_rules
 
-with open(DATA_PATH, "r") as f:
-    CARDS = json.load(f)
+DATA_PATH = Path(os.environ.get("SWIPESMART_CARDS_PATH", Path(__file__).parent / "cards_data.json"))
+
+_RATE_FIELDS = (
+    "base_mpd",
+    "fcy_mpd",
+    "online_mpd",
+    "cashback_rate",
+    "base_cashback_rate",
+    "bonus_cap_amount",
+    "annual_fee",
+)
+
+
+def validate_cards(cards) -> None:
+    """Raise ValueError if cards_data.json content can't be used safely."""
+    if not isinstance(cards, list):
+        raise ValueError("cards data must be a list of cards")
+
+    seen = set()
+    for i, card in enumerate(cards):
+        if not isinstance(card, dict):
+            raise ValueError(f"card #{i} is not an object")
+        name = card.get("name")
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"card #{i} has no name")
+        if name in seen:
+            raise ValueError(f"duplicate card name {name!r}")
+        seen.add(name)
+
+        for field in _RATE_FIELDS:
+            value = card.get(field)
+            if value is not None and (
+                isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0
+            ):
+                raise ValueError(f"{name}: {field} must be a non-negative number")
+
+        category_mpd = card.get("category_mpd", {})
+        if not isinstance(category_mpd, dict) or not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) and v >= 0
+            for v in category_mpd.values()
+        ):
+            raise ValueError(f"{name}: category_mpd must map category -> non-negative number")
+
+        for field in ("blocked_categories", "blocked_mccs"):
+            value = card.get(field, [])
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError(f"{name}: {field} must be a list of strings")
+
+        if "rules" in card:
+            validate_rules(card["rules"], name)
+
+
+def load_cards(path=DATA_PATH) -> list[dict]:
+    with open(path, "r") as f:
+        cards = json.load(f)
+    validate_cards(cards)
+    return cards
+
+
+# ---------- category hierarchy ----------
+#
+# MCCs resolve to leaf categories (travel_air, fast_food, ...) while card
+# rules are often written against the parent ("travel"). A rule on a parent
+# applies to every child that has no rule of its own, and blocking a parent
+# blocks its children.
+CATEGORY_PARENTS = {
+    "travel_air": "travel",
+    "travel_hotel": "travel",
+    "travel_agency": "travel",
+    "car_rental": "travel",
+    "fast_food": "dining",
+    "online_shopping": "shopping",
+    "ride_hailing": "transport",
+}
+
+
+def category_chain(category: str) -> tuple:
+    """category followed by its ancestors, most specific first."""
+    chain = [category]
+    while chain[-1] in CATEGORY_PARENTS:
+        chain.append(CATEGORY_PARENTS[chain[-1]])
+    return tuple(chain)
+
+
+def with_child_categories(categories: set) -> set:
+    """categories plus every child category under one of them."""
+    return set(categories) | {
+        child for child in CATEGORY_PARENTS
+        if any(c in categories for c in category_chain(child)[1:])
+    }
+
+
+def txn_currency(is_fcy: bool, currency: str | None = None) -> str:
+    """Currency code rules see; callers that only know is_fcy get "" for FCY."""
+    if currency:
+        return currency
+    return "" if is_fcy else "SGD"
 
 
 def compute_card_rewards(
@@ -15,17 +111,20 @@ def compute_card_rewards(
     mcc: str,
     mode: str = "miles",
     currency: str = "SGD",
+    merchant: str = "",
 ) -> dict:
     """
     Returns a dict with miles, cashback, blocked/cap info, notes, etc.
     mode = "miles" or "cashback".
-    Handles FCY, SGD-only bonus cards, caps, etc.
+    Handles FCY, SGD-only bonus cards, caps, card rules, etc.
+    merchant is the matched merchants.json key (for rules).
     """
 
     name = card["name"]
     mode = mode.lower()
     currency = currency.upper()
     is_fcy = currency != "SGD"
+    chain = category_chain(category)
 
     # ---------- 1) blocked logic ----------
     blocked = False
@@ -34,7 +133,7 @@ def compute_card_rewards(
     blocked_categories = card.get("blocked_categories", [])
     blocked_mccs = card.get("blocked_mccs", [])
 
-    if category in blocked_categories:
+    if any(c in blocked_categories for c in chain):
         blocked = True
         blocked_reason = f"Category '{category}' is blocked for {name}."
 
@@ -43,8 +142,16 @@ def compute_card_rewards(
         extra = f"MCC {mcc} is blocked for {name}."
         blocked_reason = (blocked_reason + " " + extra).strip()
 
+    # card rules: the first matching rule adjusts this txn (see rule_dsl.py)
+    effect = None
+    if not blocked and card.get("rules"):
+        effect = interpret_rules(card["rules"], merchant, chain, is_online, mcc, currency, amount)
+        if effect is not None and effect.block:
+            blocked = True
+            blocked_reason = f"Excluded by rule '{effect.name}' for {name}."
+
     if blocked:
-        return {
+        result = {
             "card_name": name,
             "card_type": card.get("type", "miles"),
             "miles": 0.0,
@@ -57,6 +164,9 @@ def compute_card_rewards(
             "annual_fee": card.get("annual_fee"),
             "annual_fee_waivable": card.get("annual_fee_waivable", True),
         }
+        if effect is not None:
+            result["rule"] = effect.name
+        return result
 
     # ---------- 2) miles logic ----------
     base_mpd = card.get("base_mpd", 0.0)
@@ -72,9 +182,12 @@ def compute_card_rewards(
     if is_online and online_mpd:
         mpd = online_mpd
 
-    # category-specific override (stronger than generic online)
-    if category in category_mpd:
-        mpd = category_mpd[category]
+    # category-specific override (stronger than generic online);
+    # the most specific category in the chain with a rule wins
+    for c in chain:
+        if c in category_mpd:
+            mpd = category_mpd[c]
+            break
 
     # FCY adjustments
     if is_fcy:
@@ -85,10 +198,16 @@ def compute_card_rewards(
             # normal FCY upgrade (e.g. PRVI, PMiles, 90N)
             mpd = fcy_mpd
 
+    # a matching rule's rate replaces the result of all of the above
+    if effect is not None and effect.mpd is not None:
+        mpd = effect.mpd
+
     miles = amount * mpd
 
     # ---------- 3) cashback logic ----------
     cashback_rate = card.get("cashback_rate", 0.0)  # % value
+    if effect is not None and effect.cashback_rate is not None:
+        cashback_rate = effect.cashback_rate
     cashback = amount * cashback_rate / 100 if cashback_rate else 0.0
 
     # ---------- 4) bonus cap warnings ----------
@@ -110,7 +229,7 @@ def compute_card_rewards(
                 f"This app doesn't track monthly usage yet."
             )
 
-    return {
+    result = {
         "card_name": name,
         "card_type": card.get("type", "miles"),
         "miles": round(miles, 2),
@@ -125,3 +244,331 @@ def compute_card_rewards(
         "is_fcy": is_fcy,
         "effective_mpd": mpd,
     }
+    if effect is not None:
+        result["rule"] = effect.name
+    return result
+
+
+def fee_warning(name: str, fee, waivable: bool = True) -> str | None:
+    """Annual fee note shown with a recommendation (None if no fee)."""
+    if not fee:
+        return None
+    if waivable:
+        return f"{name} has around S${fee} annual fee. Usually waivable."
+    return f"{name} has around S${fee} annual fee and may NOT be waivable."
+
+
+# ---------- compiled rule engine ----------
+#
+# compute_card_rewards() above is the reference implementation: it re-reads
+# every field of the raw card dict on each call. The recommendation hot path
+# instead uses CompiledCard objects built once at load time, which hold the
+# same rules with every per-request lookup pre-resolved.
+
+# index into CompiledCard.rates tuples: (is_online, is_fcy) -> slot
+def _rate_slot(is_online: bool, is_fcy: bool) -> int:
+    return (2 if is_online else 0) + (1 if is_fcy else 0)
+
+
+class CompiledCard:
+    """
+    Immutable, pre-resolved view of one card from cards_data.json.
+
+    rates / category_rates hold the final effective mpd for each
+    (is_online, is_fcy) combination, so evaluation is a dict lookup
+    plus a multiply instead of the override chain in compute_card_rewards.
+    The card's "rules" are compiled into one closure (rule), or None.
+    """
+
+    __slots__ = (
+        "name",
+        "card_type",
+        "blocked_categories",
+        "blocked_mccs",
+        "default_rates",
+        "category_rates",
+        "base_rates",
+        "cashback_rate",
+        "base_cashback_rate",
+        "bonus_cap_amount",
+        "cap_exceeded_note",
+        "cap_within_note",
+        "notes",
+        "annual_fee",
+        "annual_fee_waivable",
+        "rule",
+        "rules",
+        "amount_bounds",
+    )
+
+    def __init__(self, card: dict):
+        name = card["name"]
+        set_ = object.__setattr__
+        set_(self, "name", name)
+        set_(self, "card_type", card.get("type", "miles"))
+        # blocking a parent category blocks its children too
+        blocked_categories = with_child_categories(set(card.get("blocked_categories", [])))
+        set_(self, "blocked_categories", frozenset(blocked_categories))
+        set_(self, "blocked_mccs", frozenset(card.get("blocked_mccs", [])))
+
+        base_mpd = card.get("base_mpd", 0.0)
+        fcy_mpd = card.get("fcy_mpd")
+        online_mpd = card.get("online_mpd")
+        no_fcy_bonus = card.get("no_fcy_bonus", False)
+
+        def resolve(start_local: float, start_online: float) -> tuple:
+            # same override order as compute_card_rewards, evaluated once
+            rates = [0.0, 0.0, 0.0, 0.0]
+            for is_online, start in ((False, start_local), (True, start_online)):
+                rates[_rate_slot(is_online, False)] = start
+                if no_fcy_bonus:
+                    fcy = fcy_mpd if fcy_mpd is not None else base_mpd
+                elif fcy_mpd is not None and fcy_mpd > start:
+                    fcy = fcy_mpd
+                else:
+                    fcy = start
+                rates[_rate_slot(is_online, True)] = fcy
+            return tuple(rates)
+
+        online_start = online_mpd if online_mpd else base_mpd
+        set_(self, "default_rates", resolve(base_mpd, online_start))
+
+        category_mpd = card.get("category_mpd", {})
+        category_rates = {cat: resolve(mpd, mpd) for cat, mpd in category_mpd.items()}
+        # children without their own rule inherit the nearest ancestor's
+        for child in CATEGORY_PARENTS:
+            if child in category_rates:
+                continue
+            for ancestor in category_chain(child)[1:]:
+                if ancestor in category_mpd:
+                    category_rates[child] = category_rates[ancestor]
+                    break
+        set_(self, "category_rates", category_rates)
+        # what spend earns once the monthly bonus cap is used up
+        set_(self, "base_rates", resolve(base_mpd, base_mpd))
+
+        set_(self, "cashback_rate", card.get("cashback_rate", 0.0))
+        set_(self, "base_cashback_rate", card.get("base_cashback_rate") or 0.0)
+
+        bonus_cap_amount = card.get("bonus_cap_amount")
+        set_(self, "bonus_cap_amount", bonus_cap_amount)
+        if bonus_cap_amount:
+            set_(
+                self,
+                "cap_exceeded_note",
+                f"Bonus rate for {name} usually capped at about "
+                f"S${bonus_cap_amount:.0f}/month; this txn exceeds that.",
+            )
+            set_(
+                self,
+                "cap_within_note",
+                f"Bonus earn for {name} usually capped at about "
+                f"S${bonus_cap_amount:.0f}/month. "
+                f"This app doesn't track monthly usage yet.",
+            )
+        else:
+            set_(self, "cap_exceeded_note", "")
+            set_(self, "cap_within_note", "")
+
+        set_(self, "notes", card.get("notes", ""))
+        set_(self, "annual_fee", card.get("annual_fee"))
+        set_(self, "annual_fee_waivable", card.get("annual_fee_waivable", True))
+
+        rules = card.get("rules", [])
+        set_(self, "rule", compile_rules(rules, with_child_categories))
+        # normalized copy for clients that evaluate rules themselves (GET /ruleset)
+        set_(self, "rules", normalize_rules(rules, with_child_categories))
+        set_(self, "amount_bounds", amount_bounds(rules))
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"CompiledCard({self.name!r})"
+
+    def mpd_for(self, category: str, is_online: bool, is_fcy: bool) -> float:
+        """Effective miles-per-dollar for this context (ignores blocks)."""
+        rates = self.category_rates.get(category, self.default_rates)
+        return rates[_rate_slot(is_online, is_fcy)]
+
+    def is_blocked(self, category: str, mcc: str) -> bool:
+        """blocked_categories / blocked_mccs only; rules can block more."""
+        return category in self.blocked_categories or bool(mcc and mcc in self.blocked_mccs)
+
+    def rates_for(
+        self,
+        category: str,
+        is_online: bool,
+        mcc: str,
+        is_fcy: bool,
+        merchant: str = "",
+        currency: str | None = None,
+        amount: float = 0.0,
+    ):
+        """(mpd, cashback_rate) for this txn after rules, or None when it's blocked."""
+        if category in self.blocked_categories or (mcc and mcc in self.blocked_mccs):
+            return None
+        mpd = self.category_rates.get(category, self.default_rates)[_rate_slot(is_online, is_fcy)]
+        cashback_rate = self.cashback_rate
+        if self.rule is not None:
+            effect = self.rule(merchant, category, is_online, mcc, txn_currency(is_fcy, currency), amount)
+            if effect is not None:
+                if effect.block:
+                    return None
+                if effect.mpd is not None:
+                    mpd = effect.mpd
+                if effect.cashback_rate is not None:
+                    cashback_rate = effect.cashback_rate
+        return mpd, cashback_rate
+
+    def rewards(
+        self,
+        amount: float,
+        category: str,
+        is_online: bool,
+        mcc: str,
+        is_fcy: bool,
+        cap_used: float | None = None,
+        merchant: str = "",
+        currency: str | None = None,
+    ) -> dict:
+        """
+        Fast equivalent of compute_card_rewards(card, ...).
+        Callers resolve is_fcy once per request instead of once per card.
+
+        cap_used: this month's spend already on the card (from the ledger).
+        When given, the txn is split into the part still inside
+        bonus_cap_amount (bonus rate) and the rest (base rate).
+        merchant / currency: the matched merchants.json key and the txn
+        currency, only looked at by card rules.
+        """
+        name = self.name
+
+        # ---------- 1) blocked logic ----------
+        if category in self.blocked_categories or (mcc and mcc in self.blocked_mccs):
+            reasons = []
+            if category in self.blocked_categories:
+                reasons.append(f"Category '{category}' is blocked for {name}.")
+            if mcc and mcc in self.blocked_mccs:
+                reasons.append(f"MCC {mcc} is blocked for {name}.")
+            return self._blocked_result(" ".join(reasons))
+
+        # ---------- 2) miles + cashback ----------
+        rates = self.category_rates.get(category, self.default_rates)
+        mpd = rates[(2 if is_online else 0) + (1 if is_fcy else 0)]
+        cashback_rate = self.cashback_rate
+        effect = None
+        if self.rule is not None:
+            effect = self.rule(merchant, category, is_online, mcc, txn_currency(is_fcy, currency), amount)
+            if effect is not None:
+                if effect.block:
+                    result = self._blocked_result(f"Excluded by rule '{effect.name}' for {name}.")
+                    result["rule"] = effect.name
+                    return result
+                if effect.mpd is not None:
+                    mpd = effect.mpd
+                if effect.cashback_rate is not None:
+                    cashback_rate = effect.cashback_rate
+        cashback = amount * cashback_rate / 100 if cashback_rate else 0.0
+
+        # ---------- 3) bonus cap warnings ----------
+        capped = False
+        cap_note = ""
+        bonus_cap_amount = self.bonus_cap_amount
+        if bonus_cap_amount and cap_used is not None:
+            result = self._cap_split_rewards(amount, mpd, cashback_rate, is_online, is_fcy, cap_used)
+        else:
+            if bonus_cap_amount:
+                if amount > bonus_cap_amount:
+                    capped = True
+                    cap_note = self.cap_exceeded_note
+                else:
+                    cap_note = self.cap_within_note
+            result = self._result(amount * mpd, cashback, capped, cap_note, is_fcy, mpd)
+        if effect is not None:
+            result["rule"] = effect.name
+        return result
+
+    def _blocked_result(self, reason: str) -> dict:
+        return {
+            "card_name": self.name,
+            "card_type": self.card_type,
+            "miles": 0.0,
+            "cashback": 0.0,
+            "blocked": True,
+            "blocked_reason": reason,
+            "capped": False,
+            "cap_note": "",
+            "notes": self.notes,
+            "annual_fee": self.annual_fee,
+            "annual_fee_waivable": self.annual_fee_waivable,
+        }
+
+    def _result(self, miles, cashback, capped, cap_note, is_fcy, mpd) -> dict:
+        return {
+            "card_name": self.name,
+            "card_type": self.card_type,
+            "miles": round(miles, 2),
+            "cashback": round(cashback, 2),
+            "blocked": False,
+            "blocked_reason": "",
+            "capped": capped,
+            "cap_note": cap_note,
+            "notes": self.notes,
+            "annual_fee": self.annual_fee,
+            "annual_fee_waivable": self.annual_fee_waivable,
+            "is_fcy": is_fcy,
+            "effective_mpd": mpd,
+        }
+
+    def _cap_split_rewards(self, amount, mpd, cashback_rate, is_online, is_fcy, cap_used) -> dict:
+        name = self.name
+        cap = self.bonus_cap_amount
+        remaining = max(cap - cap_used, 0.0)
+        bonus_amount = min(max(amount, 0.0), remaining)
+        base_amount = amount - bonus_amount
+
+        base_mpd = min(mpd, self.base_rates[_rate_slot(is_online, is_fcy)])
+        miles = bonus_amount * mpd + base_amount * base_mpd
+
+        cashback = 0.0
+        if cashback_rate:
+            base_cashback_rate = min(cashback_rate, self.base_cashback_rate)
+            cashback = (bonus_amount * cashback_rate + base_amount * base_cashback_rate) / 100
+
+        capped = base_amount > 0
+        if capped:
+            cap_note = (
+                f"Only S${remaining:.2f} of the S${cap:.0f}/month bonus cap is left on {name}; "
+                f"S${base_amount:.2f} of this txn earns the base rate."
+            )
+        else:
+            cap_note = (
+                f"S${remaining - bonus_amount:.2f} of the S${cap:.0f}/month bonus cap "
+                f"left on {name} after this txn."
+            )
+
+        return {
+            "card_name": name,
+            "card_type": self.card_type,
+            "miles": round(miles, 2),
+            "cashback": round(cashback, 2),
+            "blocked": False,
+            "blocked_reason": "",
+            "capped": capped,
+            "cap_note": cap_note,
+            "notes": self.notes,
+            "annual_fee": self.annual_fee,
+            "annual_fee_waivable": self.annual_fee_waivable,
+            "is_fcy": is_fcy,
+            "effective_mpd": mpd,
+            "cap_remaining": round(remaining, 2),
+            "bonus_amount": round(bonus_amount, 2),
+            "base_amount": round(base_amount, 2),
+        }
+
+
+def compile_cards(cards: list[dict]) -> tuple[CompiledCard, ...]:
+    """Compile raw card dicts once (at load time) for the hot path."""
+    return tuple(CompiledCard(card) for card in cards)
+
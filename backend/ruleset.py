@@ -0,0 +1,225 @@
+"""
+Versioned, reloadable ruleset (cards + MCC index + merchants).
+
+Each load parses and validates the data files into an immutable
+Ruleset snapshot. current() returns the live snapshot; reload() builds a
+new one off the request path and swaps the reference atomically, so a
+request that already grabbed a snapshot keeps using it to the end, and a
+bad edit to a data file leaves the previous snapshot in place.
+
+Reloads are triggered by POST /admin/reload or by RulesetWatcher,
+which polls the data files' mtimes.
+
+With SWIPESMART_RULESET_SNAPSHOT set, snapshots are memory-mapped from a
+compiled binary snapshot instead (see ruleset_bin.py) and the watcher
+polls that file.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+
+from batch import RateTable
+from mcc_index import MCC_DATA_PATH, MccIndex, load_mcc_data
+from merchant_index import MERCHANTS_PATH, MerchantIndex, load_merchant_aliases, load_merchants
+from rules import CATEGORY_PARENTS, DATA_PATH, compile_cards, fee_warning, load_cards
+
+SNAPSHOT_PATH = os.environ.get("SWIPESMART_RULESET_SNAPSHOT")
+if SNAPSHOT_PATH:
+    WATCHED_PATHS = (Path(SNAPSHOT_PATH),)
+else:
+    WATCHED_PATHS = (DATA_PATH, MCC_DATA_PATH, MERCHANTS_PATH)
+
+
+class Ruleset:
+    """Immutable snapshot of everything a recommendation depends on."""
+
+    __slots__ = (
+        "version",
+        "cards",
+        "compiled_cards",
+        "rate_table",
+        "mcc_index",
+        "merchants",
+        "merchant_index",
+        "aliases",
+        "loaded_at",
+    )
+
+    def __init__(self, cards, mcc_data, merchants, aliases=None):
+        set_ = object.__setattr__
+        set_(self, "cards", tuple(cards))
+        set_(self, "compiled_cards", compile_cards(cards))
+        set_(self, "mcc_index", MccIndex(mcc_data))
+        set_(self, "merchants", MappingProxyType(dict(merchants)))
+        set_(self, "merchant_index", MerchantIndex(merchants))
+        set_(self, "aliases", MappingProxyType(dict(aliases or {})))
+        set_(self, "rate_table", RateTable(self.compiled_cards, _known_categories(self)))
+        set_(self, "version", _content_version(cards, mcc_data, merchants, aliases))
+        set_(self, "loaded_at", time.time())
+
+    @classmethod
+    def from_parts(cls, version, cards, compiled_cards, rate_table, mcc_index, merchants, merchant_index, aliases=None):
+        """Assemble a snapshot from prebuilt parts (used by ruleset_bin.load_snapshot)."""
+        snapshot = cls.__new__(cls)
+        set_ = object.__setattr__
+        set_(snapshot, "version", version)
+        set_(snapshot, "cards", tuple(cards))
+        set_(snapshot, "compiled_cards", compiled_cards)
+        set_(snapshot, "rate_table", rate_table)
+        set_(snapshot, "mcc_index", mcc_index)
+        set_(snapshot, "merchants", merchants)
+        set_(snapshot, "merchant_index", merchant_index)
+        set_(snapshot, "aliases", MappingProxyType(dict(aliases or {})))
+        set_(snapshot, "loaded_at", time.time())
+        return snapshot
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Ruleset is immutable")
+
+    def __repr__(self):
+        return f"Ruleset(version={self.version!r}, cards={len(self.cards)})"
+
+
+def _known_categories(snapshot: Ruleset) -> set:
+    """Every category a request can resolve to, plus those cards mention."""
+    categories = {"general"}
+    categories.update(CATEGORY_PARENTS)
+    categories.update(CATEGORY_PARENTS.values())
+    categories.update(snapshot.mcc_index.categories())
+    categories.update(info[0] for info in snapshot.merchants.values())
+    for card in snapshot.compiled_cards:
+        categories.update(card.category_rates)
+        categories.update(card.blocked_categories)
+    return categories
+
+
+def _content_version(cards, mcc_data, merchants, aliases=None) -> str:
+    """Short content hash, identical data always gives the same version."""
+    h = hashlib.sha256()
+    for data in (cards, mcc_data, merchants):
+        h.update(json.dumps(data, sort_keys=True).encode())
+    if aliases:
+        # only hashed when present, so data without aliases keeps its version
+        h.update(json.dumps(aliases, sort_keys=True).encode())
+    return h.hexdigest()[:12]
+
+
+def client_snapshot(snapshot: Ruleset) -> dict:
+    """
+    Everything a client needs to reproduce recommend_card locally for this
+    version: compiled card rates and rules (hierarchy already expanded),
+    the MCC index and the merchant rules. Served by GET /ruleset.
+    """
+    cards = []
+    for card in snapshot.compiled_cards:
+        cards.append(
+            {
+                "name": card.name,
+                "type": card.card_type,
+                "blocked_categories": sorted(card.blocked_categories),
+                "blocked_mccs": sorted(card.blocked_mccs),
+                "default_rates": list(card.default_rates),
+                "category_rates": {cat: list(r) for cat, r in card.category_rates.items()},
+                "cashback_rate": card.cashback_rate,
+                "bonus_cap_amount": card.bonus_cap_amount,
+                "cap_exceeded_note": card.cap_exceeded_note,
+                "cap_within_note": card.cap_within_note,
+                "notes": card.notes,
+                "annual_fee": card.annual_fee,
+                "annual_fee_waivable": card.annual_fee_waivable,
+                "fee_warning": fee_warning(card.name, card.annual_fee, card.annual_fee_waivable),
+                "rules": card.rules,
+            }
+        )
+    return {
+        "version": snapshot.version,
+        "cards": cards,
+        "mcc": snapshot.mcc_index.export(),
+        "merchants": {match: list(info) for match, info in snapshot.merchants.items()},
+    }
+
+
+def load_ruleset() -> Ruleset:
+    """Parse + validate all data files (or map the compiled snapshot). Raises on any invalid file."""
+    if SNAPSHOT_PATH:
+        from ruleset_bin import load_snapshot
+
+        return load_snapshot(SNAPSHOT_PATH)
+    return Ruleset(load_cards(), load_mcc_data(), load_merchants(), load_merchant_aliases())
+
+
+_current = load_ruleset()
+_reload_lock = threading.Lock()
+
+
+def current() -> Ruleset:
+    return _current
+
+
+def install(snapshot: Ruleset) -> Ruleset:
+    """Make snapshot the live ruleset (used by reload, benchmarks, tools)."""
+    global _current
+    with _reload_lock:
+        _current = snapshot
+    return snapshot
+
+
+def reload() -> tuple[Ruleset, bool]:
+    """
+    Load the data files and swap in the result if its content changed.
+    Returns (live snapshot, changed). Errors propagate and leave the
+    current snapshot untouched.
+    """
+    global _current
+    with _reload_lock:
+        snapshot = load_ruleset()
+        if snapshot.version == _current.version:
+            return _current, False
+        _current = snapshot
+        return snapshot, True
+
+
+def _file_stamps() -> tuple:
+    stamps = []
+    for path in WATCHED_PATHS:
+        try:
+            st = path.stat()
+            stamps.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+class RulesetWatcher:
+    """Background thread that reloads when a watched data file changes."""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self.last_error = None
+        self._stamps = _file_stamps()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ruleset-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            stamps = _file_stamps()
+            if stamps == self._stamps:
+                continue
+            self._stamps = stamps
+            try:
+                reload()
+                self.last_error = None
+            except Exception as e:  # keep serving the previous snapshot
+                self.last_error = f"{type(e).__name__}: {e}"
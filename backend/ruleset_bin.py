@@ -0,0 +1,305 @@
+"""
+Binary ruleset snapshot, memory-mapped read-only by every worker.
+
+With N uvicorn workers, the JSON path parses the data files and builds the
+merchant index N times, and each worker keeps its own private copy.
+A compiled snapshot stores the big structures as fixed-layout arrays
+that workers mmap directly. The pages belong to the page cache, so N
+workers share one physical copy, and starting a worker costs an mmap
+plus compiling the (small) card list.
+
+File layout (native byte order; offsets are relative to data_offset):
+
+    b"SWSNAP01"  uint64 header length  header JSON  padding  arrays...
+
+The header carries the format, the ruleset version, the raw cards, the
+MCC document, the merchant aliases (absent in older snapshots), the
+interned string table (categories, MCCs) and {name: [offset, dtype,
+shape]} for each array:
+
+    mpd            float64 [category, slot, card]   RateTable.mpd
+    cashback_rate  float64 [category, card]
+    blocked        uint8   [category, ceil(cards/8)]  bitset, 1 = blocked
+    merchant_keys  uint8   utf-8 match keys, back to back
+    merchant_offs  uint32  [merchants + 1] key start offsets
+    merchant_cat   uint32  string id of the category
+    merchant_mcc   uint32  string id of the MCC
+    merchant_online uint8
+    merchant_slots int32   open-addressing table (crc32, linear probing)
+
+Compile from backend/:
+    python ruleset_bin.py                      # data files -> ruleset.snap
+    python ruleset_bin.py -o /srv/ruleset.snap
+    python ruleset_bin.py --info ruleset.snap
+
+Then run the server with SWIPESMART_RULESET_SNAPSHOT=<path>. The watcher
+reloads when the snapshot file is replaced (the compiler writes a temp
+file and renames it, so workers still mapping the old file are unaffected).
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+from batch import RateTable
+from mcc_index import MccIndex, load_mcc_data
+from merchant_index import load_merchant_aliases, load_merchants
+from rules import compile_cards, load_cards
+
+SNAPSHOT_PATH = Path(__file__).parent / "ruleset.snap"
+
+MAGIC = b"SWSNAP01"
+FORMAT = 1
+_ALIGN = 64
+
+
+def _align(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _merchant_arrays(merchants, strings: dict) -> dict:
+    """Key blob, offsets, interned info columns and the hash slot table."""
+
+    def intern(s):
+        return strings.setdefault(s, len(strings))
+
+    keys = [key.encode() for key in merchants]
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(key))
+
+    # load factor <= 0.5, so probes stay short
+    size = 1 << max(3, (2 * len(keys)).bit_length())
+    mask = size - 1
+    slots = [-1] * size
+    for m, key in enumerate(keys):
+        i = zlib.crc32(key) & mask
+        while slots[i] >= 0:
+            i = (i + 1) & mask
+        slots[i] = m
+
+    infos = list(merchants.values())
+    return {
+        "merchant_keys": np.frombuffer(b"".join(keys), dtype=np.uint8),
+        "merchant_offs": np.array(offsets, dtype=np.uint32),
+        "merchant_cat": np.array([intern(info[0]) for info in infos], dtype=np.uint32),
+        "merchant_mcc": np.array([intern(info[2]) for info in infos], dtype=np.uint32),
+        "merchant_online": np.array([bool(info[1]) for info in infos], dtype=np.uint8),
+        "merchant_slots": np.array(slots, dtype=np.int32),
+    }
+
+
+def compile_snapshot(snapshot, path=SNAPSHOT_PATH) -> int:
+    """Write snapshot (a ruleset.Ruleset) to path atomically. Returns the file size."""
+    table = snapshot.rate_table
+    strings = {}
+    arrays = {
+        "mpd": table.mpd,
+        "cashback_rate": table.cashback_rate,
+        "blocked": np.packbits(table.blocked, axis=1),
+        **_merchant_arrays(snapshot.merchants, strings),
+    }
+
+    # 1) lay the arrays out back to back, aligned
+    layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = arr
+        layout[name] = [offset, arr.dtype.str, list(arr.shape)]
+        offset = _align(offset + arr.nbytes)
+
+    # 2) header; data_offset is fixed up once the header length is known
+    header = {
+        "format": FORMAT,
+        "byteorder": sys.byteorder,
+        "version": snapshot.version,
+        "cards": list(snapshot.cards),
+        "mcc_data": snapshot.mcc_index.to_data(),
+        "aliases": dict(snapshot.aliases),
+        "categories": list(table.category_ids),
+        "mcc_blocked": {mcc: np.flatnonzero(mask).tolist() for mcc, mask in table.mcc_blocked.items()},
+        "strings": list(strings),
+        "arrays": layout,
+        "data_offset": 0,
+    }
+    raw = json.dumps(header).encode()
+    header["data_offset"] = _align(16 + len(raw) + 32)
+    raw = json.dumps(header).encode()
+    if 16 + len(raw) > header["data_offset"]:
+        raise AssertionError("snapshot header outgrew its reserved space")
+
+    # 3) write next to the target and rename, so readers never see a partial file
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(raw)) + raw)
+            for name, arr in arrays.items():
+                f.seek(header["data_offset"] + layout[name][0])
+                f.write(arr.tobytes())
+            f.truncate(header["data_offset"] + offset)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return header["data_offset"] + offset
+
+
+class MappedMerchants(Mapping):
+    """
+    {match: (category, is_online, mcc)} over the snapshot's merchant
+    arrays, with the same lookup() as merchant_index.MerchantIndex.
+    Keys containing a dot are domain rules, the rest brand rules.
+    """
+
+    def __init__(self, arrays: dict, strings: list):
+        # typed memoryviews: indexing gives plain ints, no numpy scalars
+        self._blob = memoryview(arrays["merchant_keys"])
+        self._offs = memoryview(arrays["merchant_offs"])
+        self._cat = memoryview(arrays["merchant_cat"])
+        self._mcc = memoryview(arrays["merchant_mcc"])
+        self._online = memoryview(arrays["merchant_online"])
+        self._slots = memoryview(arrays["merchant_slots"])
+        self._mask = len(self._slots) - 1
+        self._strings = strings
+
+    def _find(self, key: str) -> int:
+        raw = key.encode()
+        blob, offs, slots, mask = self._blob, self._offs, self._slots, self._mask
+        i = zlib.crc32(raw) & mask
+        while True:
+            m = slots[i]
+            if m < 0 or blob[offs[m]:offs[m + 1]] == raw:
+                return m
+            i = (i + 1) & mask
+
+    def _info(self, m: int) -> tuple:
+        strings = self._strings
+        return strings[self._cat[m]], bool(self._online[m]), strings[self._mcc[m]]
+
+    def lookup(self, host: str):
+        """Returns (category, is_online, mcc) for the host, or None."""
+        found = self.match(host)
+        return None if found is None else found[1]
+
+    def match(self, host: str):
+        """Returns (merchants.json key, (category, is_online, mcc)) for the host, or None."""
+        labels = host.rstrip(".").split(".")
+
+        # 1) longest domain-suffix match
+        for i in range(len(labels) - 1):
+            key = ".".join(labels[i:])
+            m = self._find(key)
+            if m >= 0:
+                return key, self._info(m)
+
+        # 2) brand label, nearest the registrable domain first
+        for label in reversed(labels):
+            m = self._find(label)
+            if m >= 0:
+                return label, self._info(m)
+
+        return None
+
+    def __getitem__(self, key):
+        m = self._find(key) if isinstance(key, str) else -1
+        if m < 0:
+            raise KeyError(key)
+        return self._info(m)
+
+    def __iter__(self):
+        blob, offs = self._blob, self._offs
+        for m in range(len(self)):
+            yield bytes(blob[offs[m]:offs[m + 1]]).decode()
+
+    def __len__(self):
+        return len(self._offs) - 1
+
+    def __repr__(self):
+        return f"MappedMerchants({len(self)})"
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Map a compiled snapshot read-only into a ruleset.Ruleset. Raises ValueError if it's invalid."""
+    from ruleset import Ruleset  # ruleset imports us lazily too
+
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:8] != MAGIC:
+        raise ValueError(f"{path}: not a ruleset snapshot")
+    (header_len,) = struct.unpack_from("<Q", mm, 8)
+    header = json.loads(mm[16:16 + header_len])
+    if header.get("format") != FORMAT:
+        raise ValueError(f"{path}: snapshot format {header.get('format')}, expected {FORMAT}")
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(f"{path}: compiled for a {header['byteorder']}-endian host")
+
+    arrays = {}
+    for name, (offset, dtype, shape) in header["arrays"].items():
+        arr = np.frombuffer(
+            mm, dtype=dtype, count=math.prod(shape), offset=header["data_offset"] + offset
+        )
+        arrays[name] = arr.reshape(shape)
+
+    cards = header["cards"]
+    compiled = compile_cards(cards)
+    n_cards = len(compiled)
+    mcc_blocked = {}
+    for mcc, idx in header["mcc_blocked"].items():
+        mask = mcc_blocked[mcc] = np.zeros(n_cards, dtype=bool)
+        mask[idx] = True
+    blocked = np.unpackbits(arrays["blocked"], axis=1, count=n_cards).view(bool)
+    rate_table = RateTable.from_arrays(
+        compiled, header["categories"], arrays["mpd"], arrays["cashback_rate"], blocked, mcc_blocked
+    )
+
+    merchants = MappedMerchants(arrays, header["strings"])
+    return Ruleset.from_parts(
+        version=header["version"],
+        cards=cards,
+        compiled_cards=compiled,
+        rate_table=rate_table,
+        mcc_index=MccIndex(header["mcc_data"]),
+        merchants=merchants,
+        merchant_index=merchants,
+        aliases=header.get("aliases"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the data files into a binary ruleset snapshot.")
+    parser.add_argument("-o", "--out", type=Path, default=SNAPSHOT_PATH)
+    parser.add_argument("--info", type=Path, help="print a compiled snapshot's summary instead")
+    args = parser.parse_args()
+
+    if args.info:
+        start = time.perf_counter()
+        snapshot = load_snapshot(args.info)
+        elapsed = time.perf_counter() - start
+        print(f"{args.info}: version {snapshot.version}, {len(snapshot.cards)} cards, "
+              f"{len(snapshot.merchants)} merchants, {len(snapshot.mcc_index)} MCCs "
+              f"(mapped in {elapsed * 1e3:.1f} ms)")
+        return
+
+    from ruleset import Ruleset
+
+    snapshot = Ruleset(load_cards(), load_mcc_data(), load_merchants(), load_merchant_aliases())
+    size = compile_snapshot(snapshot, args.out)
+    print(f"wrote {args.out}: version {snapshot.version}, {size} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Single-flight request coalescing.
+
+When many identical requests arrive together (a sale on one merchant),
+only the first caller for a key runs the computation; callers arriving
+while it is in flight wait for it and get the same result (or the same
+exception). Nothing is kept once the call finishes, so this complements
+the result cache rather than replacing it: the cache only helps after
+the first answer is stored, coalescing covers the burst before that.
+
+SingleFlight is for threads (the sync threadpool path), AsyncSingleFlight
+for coroutines on one event loop. Shared results must be treated as
+read-only, like cached ones.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call in flight
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Returns (fn(), shared); shared is True when another caller's run was reused."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # forget the key before waking waiters: later arrivals start a fresh call
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class AsyncSingleFlight:
+    """
+    The shared computation runs as its own task and callers await it
+    through asyncio.shield, so one caller being cancelled (client
+    disconnect) doesn't cancel it for the others. Keys are per event loop.
+    """
+
+    def __init__(self):
+        self._tasks = {}  # (loop, key) -> Task in flight
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, slot, task):
+        if self._tasks.get(slot) is task:
+            del self._tasks[slot]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller went away
+
+    async def do(self, key, fn):
+        """Returns (await fn(), shared); fn is a coroutine function."""
+        slot = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(slot)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = self._tasks[slot] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._forget(slot, t))
+            self.leaders += 1
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._tasks), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -1,9 +1,34 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+
+import altair as alt
 import streamlit as st
 import requests
 import pandas as pd
-from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 BACKEND_URL = "http://127.0.0.1:8000/recommend-card"
+HISTORY_LIMIT = 200  # single checks kept per session (oldest dropped first)
+MATRIX_WORKERS = 32  # max concurrent requests in scenario-matrix mode
+MATRIX_LIMIT = 20_000  # max scenarios per sweep
+MATRIX_URLS = [
+    "https://shopee.sg",
+    "https://www.lazada.sg",
+    "https://www.amazon.sg",
+    "https://www.agoda.com",
+    "https://www.booking.com",
+    "https://www.fairprice.com.sg",
+    "https://www.coldstorage.com.sg",
+    "https://www.grab.com",
+    "https://www.mcdonalds.com.sg",
+    "https://example.com",
+]
+MATRIX_CURRENCIES = ["SGD", "USD", "EUR", "JPY", "MYR", "THB"]
+
+alt.data_transformers.disable_max_rows()  # sweeps easily pass Altair's 5000-row default
 
 # ---------- Page config ----------
 st.set_page_config(
@@ -59,13 +84,186 @@ st.markdown(dark_css, unsafe_allow_html=True)
 
 # ---------- Session state for history ----------
 if "history" not in st.session_state:
-    st.session_state["history"] = []  # list of dicts
+    st.session_state["history"] = deque(maxlen=HISTORY_LIMIT)  # dicts, latest first
+    st.session_state["history_df"] = None  # DataFrame of history, rebuilt after a new check
+
+
+# ---------- HTTP ----------
+@st.cache_resource
+def http_session() -> requests.Session:
+    """One keep-alive connection pool shared by every rerun and matrix worker thread."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MATRIX_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# ---------- Scenario matrix ----------
+def parse_amounts(text: str) -> list:
+    """'5, 20 50' -> [5.0, 20.0, 50.0]; raises ValueError on anything that isn't a number."""
+    return sorted({float(part) for part in text.replace(",", " ").split()} - {0.0})
+
+
+def run_scenario(session: requests.Session, scenario: tuple) -> dict:
+    url, amount, mode, currency = scenario
+    payload = {
+        "url": url,
+        "amount": amount,
+        "currency": currency,
+        "mode": mode,
+        "top_k": 1,
+        "include_reason": False,
+    }
+    error = None
+    start = time.perf_counter()
+    try:
+        res = session.post(BACKEND_URL, json=payload, timeout=10)
+        res.raise_for_status()
+        data = res.json()
+    except Exception as e:
+        data, error = {}, str(e)
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    if error:
+        winner = "⚠️ error"
+    else:
+        winner = data.get("best_card") or "no card"
+    return {
+        "merchant": url,
+        "amount": amount,
+        "mode": mode,
+        "currency": currency,
+        "best_card": winner,
+        "miles": data.get("estimated_miles", 0.0),
+        "cashback": data.get("estimated_cashback", 0.0),
+        "category": data.get("category"),
+        "latency_ms": round(latency_ms, 2),
+        "error": error,
+    }
+
+
+def run_matrix(scenarios: list, workers: int, progress=None) -> tuple[list, float]:
+    """(rows in scenario order, wall seconds); requests go out `workers` at a time."""
+    session = http_session()
+    rows = [None] * len(scenarios)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_scenario, session, s): i for i, s in enumerate(scenarios)}
+        for done, future in enumerate(as_completed(futures), 1):
+            rows[futures[future]] = future.result()
+            if progress is not None and (done % 50 == 0 or done == len(scenarios)):
+                progress.progress(done / len(scenarios), text=f"{done} / {len(scenarios)}")
+    return rows, time.perf_counter() - start
+
+
+def matrix_tables(rows: list, elapsed: float) -> dict:
+    """Everything the matrix view renders, computed once per sweep and kept in session state."""
+    df = pd.DataFrame(rows)
+    df["cell"] = df["currency"] + " " + df["amount"].map(lambda a: f"{a:g}")
+    columns = list(dict.fromkeys(df.sort_values(["currency", "amount"])["cell"]))
+    latency = df["latency_ms"]
+
+    # 1) heatmaps: merchant x (currency, amount), one row of panels per mode
+    base = alt.Chart(df).encode(
+        x=alt.X("cell:O", title="Currency · amount", sort=columns),
+        y=alt.Y("merchant:N", title=None),
+        tooltip=["merchant", "mode", "currency", "amount", "best_card", "miles", "cashback", "latency_ms"],
+    )
+    winners = base.mark_rect().encode(color=alt.Color("best_card:N", title="Winner")).facet(row="mode:N")
+    latencies = (
+        base.mark_rect()
+        .encode(color=alt.Color("latency_ms:Q", title="ms", scale=alt.Scale(scheme="orangered")))
+        .facet(row="mode:N")
+    )
+
+    # 2) how often each card wins, per mode
+    wins = df.groupby(["mode", "best_card"]).size().rename("cells").reset_index()
+    wins = wins.sort_values(["mode", "cells"], ascending=[True, False]).reset_index(drop=True)
+
+    return {
+        "df": df,
+        "winners": winners,
+        "latencies": latencies,
+        "wins": wins,
+        "summary": {
+            "scenarios": len(df),
+            "seconds": elapsed,
+            "rps": len(df) / elapsed if elapsed else 0.0,
+            "p50_ms": latency.quantile(0.50),
+            "p95_ms": latency.quantile(0.95),
+            "max_ms": latency.max(),
+            "errors": int(df["error"].notna().sum()),
+            "first_error": df["error"].dropna().iloc[0] if df["error"].notna().any() else None,
+        },
+    }
+
+
+def scenario_matrix():
+    st.subheader("Scenario matrix")
+    st.caption("Sweep merchants × amounts × modes × currencies and see which card wins each cell.")
+
+    urls_text = st.text_area("Merchant URLs (one per line)", "\n".join(MATRIX_URLS), height=200)
+    amounts_text = st.text_input("Amounts", "5, 20, 50, 100, 250, 500, 1000, 2500, 5000")
+    modes = st.multiselect("Reward focus", ["miles", "cashback"], default=["miles", "cashback"])
+    currencies = st.multiselect("Currencies", MATRIX_CURRENCIES, default=MATRIX_CURRENCIES[:3])
+    workers = st.slider("Concurrent requests", 1, MATRIX_WORKERS, 16)
+
+    try:
+        amounts = parse_amounts(amounts_text)
+    except ValueError:
+        st.error("Amounts must be numbers separated by commas or spaces.")
+        amounts = []
+    urls = list(dict.fromkeys(line.strip() for line in urls_text.splitlines() if line.strip()))
+    scenarios = list(product(urls, amounts, modes, currencies))
+
+    too_many = len(scenarios) > MATRIX_LIMIT
+    st.caption(f"{len(scenarios):,} scenarios" + (f" (limit {MATRIX_LIMIT:,})" if too_many else ""))
+    if st.button("▶️ Run matrix", type="primary", disabled=not scenarios or too_many):
+        progress = st.progress(0.0, text="starting")
+        rows, elapsed = run_matrix(scenarios, workers, progress)
+        progress.empty()
+        st.session_state["matrix"] = matrix_tables(rows, elapsed)
+
+    matrix = st.session_state.get("matrix")
+    if not matrix:
+        st.caption("No sweep yet. Pick the axes and run the matrix.")
+        return
+
+    summary = matrix["summary"]
+    cols = st.columns(5)
+    cols[0].metric("Scenarios", f"{summary['scenarios']:,}")
+    cols[1].metric("Wall time", f"{summary['seconds']:.2f}s", f"{summary['rps']:.0f} req/s", delta_color="off")
+    cols[2].metric("p50", f"{summary['p50_ms']:.1f} ms")
+    cols[3].metric("p95", f"{summary['p95_ms']:.1f} ms")
+    cols[4].metric("Errors", summary["errors"])
+    if summary["errors"]:
+        st.error(f"⚠️ {summary['errors']} requests failed, e.g. {summary['first_error']}")
+
+    st.markdown("**Winner per cell**")
+    st.altair_chart(matrix["winners"], use_container_width=True)
+    st.markdown("**Latency per cell**")
+    st.altair_chart(matrix["latencies"], use_container_width=True)
+
+    st.markdown("**Cells won per card**")
+    st.dataframe(
+        matrix["wins"],
+        use_container_width=True,
+        column_config={"mode": "Mode", "best_card": "Card", "cells": "Cells won"},
+    )
+    with st.expander("All scenarios"):
+        st.dataframe(matrix["df"].drop(columns=["cell"]), use_container_width=True)
 
 
 # ---------- Header ----------
 st.title("SpendSmart💳")
 st.caption("Help! Which credit card should i use for this purchase?")
 
+view = st.radio("View", ["Single check", "Scenario matrix"], horizontal=True, label_visibility="collapsed")
+if view == "Scenario matrix":
+    scenario_matrix()
+    st.stop()
+
 
 # ---------- Input area ----------
 st.subheader("1. Enter purchase details")
@@ -106,7 +304,7 @@ if check_btn:
     }
 
     try:
-        res = requests.post(BACKEND_URL, json=payload)
+        res = http_session().post(BACKEND_URL, json=payload, timeout=10)
         res.raise_for_status()
         data = res.json()
 
@@ -118,7 +316,7 @@ if check_btn:
         is_online = data.get("is_online")
         mcc = data.get("mcc", "")
 
-        st.session_state["history"].append(
+        st.session_state["history"].appendleft(
             {
                 "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 "merchant": merchant_choice if merchant_choice != "Custom URL" else url,
@@ -132,6 +330,7 @@ if check_btn:
                 "mode": data.get("mode", mode_value),
             }
         )
+        st.session_state["history_df"] = None
 
     except Exception as e:
         st.error(f"⚠️ Could not reach backend: {e}")
@@ -263,12 +462,12 @@ st.write("---")
 st.subheader("4. Recent queries (session history)")
 
 if st.session_state["history"]:
-    hist_df = pd.DataFrame(st.session_state["history"])
-    # Latest first
-    hist_df = hist_df.iloc[::-1].reset_index(drop=True)
+    # Latest first; only rebuilt after a new check, not on every rerun
+    if st.session_state["history_df"] is None:
+        st.session_state["history_df"] = pd.DataFrame(list(st.session_state["history"]))
 
     st.dataframe(
-        hist_df,
+        st.session_state["history_df"],
         use_container_width=True,
         column_config={
             "time": "Time",
@@ -285,6 +484,7 @@ if st.session_state["history"]:
     )
 else:
     st.caption("No history yet. Run a check to see your first entry.")
+st.caption(f"Keeps the last {HISTORY_LIMIT} checks.")
 
 
 # ---------- Debug raw JSON ----------
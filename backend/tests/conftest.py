@@ -0,0 +1,10 @@
+"""
+Tests import the backend modules the way the server does (flat, from
+backend/), so they run with `python -m pytest` from backend/ or the
+repo root.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
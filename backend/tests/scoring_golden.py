@@ -0,0 +1,104 @@
+"""
+Golden cases for extension/scoring.js: requests and the recommend_card
+response for each, with the GET /ruleset snapshot they were scored
+against. test_scoring_js.py checks the committed file is still what the
+server returns, then runs the Node check on it.
+
+Regenerate after changing the scoring code or the data files, from backend/:
+    python -m tests.scoring_golden
+"""
+
+import itertools
+import json
+import random
+from pathlib import Path
+
+import main
+import ruleset
+from bench.synthetic import synthetic_cards, synthetic_mcc_data, synthetic_merchants, synthetic_requests, with_synthetic_rules
+
+GOLDEN_PATH = Path(__file__).resolve().parents[2] / "extension" / "test" / "golden.json"
+
+URLS = (
+    "https://shopee.sg/cart",
+    "https://www.agoda.com/booking",
+    "https://www.fairprice.com.sg",
+    "https://coldstorage.com.sg",
+    "https://www.7-eleven.com.sg",
+    "https://shop.amazon.co.jp.",
+    "https://notbooking.example",
+    "https://example.com",
+    "chrome://newtab",
+    "not a url",
+    "",
+)
+# x.125 / x.375 are the exact ties round() breaks to even; 2.675 and 0.1 + 0.2 aren't what they print
+AMOUNTS = (0.0, 0.125, 0.375, 1.005, 2.675, 12.345, 0.1 + 0.2, 333.335, 1000.01, 1e7)
+
+
+def _slim(request: dict, rng: random.Random, card_names: list) -> dict:
+    """Sprinkle the optional request fields over a request."""
+    if rng.random() < 0.3:
+        request["enabled_cards"] = rng.sample(card_names, rng.randint(0, 4)) + (["no such card"] if rng.random() < 0.2 else [])
+    if rng.random() < 0.5:
+        request["top_k"] = rng.randint(0, 3)
+    if rng.random() < 0.3:
+        request["fields"] = ["card_name", "miles", "cashback", "not_a_field"]
+    if rng.random() < 0.3:
+        request["include_reason"] = False
+    return request
+
+
+def _suite(name: str, snapshot, requests: list) -> dict:
+    ruleset.install(snapshot)
+    main.RESULT_CACHE.clear()
+    cases = [{"request": r, "response": main.recommend_card(main.RecommendationRequest(**r))} for r in requests]
+    return {"name": name, "snapshot": ruleset.client_snapshot(snapshot), "cases": cases}
+
+
+def golden() -> dict:
+    """Both suites: the live data files, and a synthetic catalog where most cards have rules."""
+    rng = random.Random(7)
+    live = ruleset.current()
+    try:
+        # 1) cards_data.json / merchants.json / mcc_codes.json as shipped
+        names = [card.name for card in live.compiled_cards]
+        requests = [
+            _slim(
+                {
+                    "url": url,
+                    "amount": amount,
+                    "currency": rng.choice(("SGD", "sgd", "usd", "JPY")),
+                    "mode": rng.choice(("miles", "cashback", "Cashback", "bogus")),
+                },
+                rng,
+                names,
+            )
+            for url, amount in itertools.product(URLS, AMOUNTS)
+        ]
+        suites = [_suite("cards_data", live, requests)]
+
+        # 2) synthetic rules: merchant / MCC / amount / currency conditions
+        merchants = synthetic_merchants(200, rng)
+        cards = with_synthetic_rules(synthetic_cards(12, rng), merchants, rng, share=0.8)
+        snapshot = ruleset.Ruleset(cards, synthetic_mcc_data(100, rng), merchants)
+        names = [card["name"] for card in cards]
+        requests = synthetic_requests(150, merchants, names, rng)
+        for request in requests[:60]:
+            request["amount"] = rng.choice((0, 19.99, 20, 50, 99.999, 100, 250))
+        suites.append(_suite("synthetic_rules", snapshot, [_slim(r, rng, names) for r in requests]))
+    finally:
+        ruleset.install(live)
+        main.RESULT_CACHE.clear()
+    return {"suites": suites}
+
+
+def dumps(data: dict) -> str:
+    return json.dumps(data, indent=1, sort_keys=True) + "\n"
+
+
+if __name__ == "__main__":
+    GOLDEN_PATH.parent.mkdir(parents=True, exist_ok=True)
+    data = golden()
+    GOLDEN_PATH.write_text(dumps(data))
+    print(GOLDEN_PATH, ", ".join(f"{s['name']}: {len(s['cases'])} cases" for s in data["suites"]))
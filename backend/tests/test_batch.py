@@ -0,0 +1,107 @@
+import itertools
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import ruleset
+from merchant_index import load_merchants
+from mcc_index import load_mcc_data
+from rules import load_cards
+
+KEYS = ("best_card", "estimated_miles", "estimated_cashback", "category", "is_online", "mcc", "mode")
+
+URLS = (
+    "https://shopee.sg/cart",  # shopping, online
+    "https://www.agoda.com/booking",  # travel agency
+    "https://www.fairprice.com.sg",  # groceries, in store
+    "https://coldstorage.com.sg",  # DBS yuu merchant rule
+    "https://www.7-eleven.com.sg",  # DBS yuu merchant rule
+    "https://insureco.sg/premium",  # MCC 6300, blocked on most miles cards
+    "https://example.com",  # unknown merchant
+)
+AMOUNTS = (-3.0, -1.004, 0.0, 0.004, 0.01, 1.0, 10.0, 12.345, 50.5, 999.0, 1500.0)
+CURRENCIES = ("SGD", "USD")
+MODES = ("miles", "cashback")
+ENABLED = (None, ["Citi Rewards", "UOB EVOL"], ["Tie Card A", "Tie Card B"], ["no such card"])
+
+
+def _tie_card(name: str, mpd: float, cashback_rate: float) -> dict:
+    # rates 0.0004 apart: the raw argmax and the rounded comparison disagree on small amounts
+    return {
+        "name": name,
+        "issuer": "Test",
+        "type": "miles",
+        "base_mpd": mpd,
+        "fcy_mpd": None,
+        "online_mpd": None,
+        "category_mpd": {},
+        "blocked_categories": [],
+        "blocked_mccs": [],
+        "bonus_cap_amount": None,
+        "cashback_rate": cashback_rate,
+        "annual_fee": 0.0,
+        "annual_fee_waivable": True,
+        "notes": "",
+    }
+
+
+@pytest.fixture(scope="module")
+def client():
+    live = ruleset.current()
+    cards = load_cards() + [_tie_card("Tie Card A", 1.4, 1.0), _tie_card("Tie Card B", 1.4004, 1.0004)]
+    merchants = {**load_merchants(), "insureco": ("insurance", False, "6300")}
+    ruleset.install(ruleset.Ruleset(cards, load_mcc_data(), merchants))
+    try:
+        yield TestClient(main.app)
+    finally:
+        ruleset.install(live)
+
+
+def _single(item: dict) -> dict:
+    return main.recommend_card(main.RecommendationRequest(**item))
+
+
+def test_batch_matches_recommend_card(client):
+    items = [
+        {"url": url, "amount": amount, "currency": currency, "mode": mode, "enabled_cards": enabled}
+        for url, amount, currency, mode, enabled in itertools.product(URLS, AMOUNTS, CURRENCIES, MODES, ENABLED)
+    ]
+    response = client.post("/recommend-card/batch", json={"items": items, "include_breakdown": True})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == len(items)
+
+    for item, batched in zip(items, results):
+        single = _single(item)
+        assert {k: batched[k] for k in KEYS} == {k: single[k] for k in KEYS}, item
+        assert batched["breakdown"] == single["breakdown"], item
+
+
+def test_ties_within_rounding_slack_go_to_the_first_card(client):
+    # 10 * 1.4 and 10 * 1.4004 both round to 14.0: the first card in catalog order wins
+    item = {"url": "https://example.com", "amount": 10.0, "enabled_cards": ["Tie Card A", "Tie Card B"]}
+    batched = client.post("/recommend-card/batch", json={"items": [item]}).json()["results"][0]
+    assert batched["best_card"] == _single(item)["best_card"] == "Tie Card A"
+
+
+def test_batch_100k_items(client):
+    rng = random.Random(1)
+    items = [
+        {
+            "url": rng.choice(URLS),
+            "amount": round(rng.uniform(0.01, 2000), 2),
+            "currency": rng.choice(CURRENCIES),
+            "mode": rng.choice(MODES),
+        }
+        for _ in range(100_000)
+    ]
+    response = client.post("/recommend-card/batch", json={"items": items})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == len(body["results"]) == 100_000
+
+    for i in rng.sample(range(len(items)), 500):
+        single = _single(items[i])
+        assert {k: body["results"][i][k] for k in KEYS} == {k: single[k] for k in KEYS}, items[i]
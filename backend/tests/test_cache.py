@@ -0,0 +1,38 @@
+from cache import RecommendationCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_old_and_new_snapshots_keep_their_own_entries():
+    cache = RecommendationCache(maxsize=10, ttl=60.0)
+    cache.put("a", "old answer", "v1")
+    assert cache.get("a", "v2") is None
+    cache.put("a", "new answer", "v2")
+    # a reload: requests on v1 and v2 interleave while the old snapshot drains
+    for _ in range(3):
+        assert cache.get("a", "v1") == "old answer"
+        assert cache.get("a", "v2") == "new answer"
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["version"] == "v2"
+
+
+def test_old_version_entries_age_out():
+    clock = Clock()
+    cache = RecommendationCache(maxsize=2, ttl=60.0, clock=clock)
+    cache.put("a", 1, "v1")
+    cache.put("b", 2, "v1")
+    cache.put("a", 10, "v2")  # evicts the least recently used v1 entry
+    assert cache.get("a", "v1") is None
+    assert cache.get("b", "v1") == 2
+
+    clock.now = 61.0
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v2") is None
+    assert cache.stats()["expirations"] == 2
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from ledger import SpendLedger
+
+CARD = "Citi Rewards"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    ledger = SpendLedger(tmp_path / "ledger.db")
+    monkeypatch.setattr(main, "_ledger", ledger)
+    yield TestClient(main.app)
+    ledger.close()
+
+
+def _spend(client, amount) -> int:
+    # raw body: NaN / Infinity / 1e309 aren't strict JSON, but the parser takes them
+    body = f'{{"user_id": "u1", "card_name": "{CARD}", "amount": {amount}}}'
+    return client.post("/spend", content=body, headers={"Content-Type": "application/json"}).status_code
+
+
+@pytest.mark.parametrize("amount", ["NaN", "Infinity", "-Infinity", "1e309", "0", "-5"])
+def test_spend_rejects_bad_amounts(client, amount):
+    assert _spend(client, amount) == 400
+    summary = client.get("/spend/u1")
+    assert summary.status_code == 200
+    assert all(card["spent"] == 0 for card in summary.json()["cards"])
+
+
+def test_spend_rejects_totals_past_float_range(client):
+    assert _spend(client, "1e308") == 200
+    assert _spend(client, "1e308") == 400
+    summary = client.get("/spend/u1")
+    assert summary.status_code == 200
+    assert {c["card_name"]: c["spent"] for c in summary.json()["cards"]}[CARD] == 1e308
+
+
+def test_ledger_record_rejects_non_finite(tmp_path):
+    ledger = SpendLedger(tmp_path / "ledger.db")
+    for amount in (float("nan"), float("inf")):
+        with pytest.raises(ValueError):
+            ledger.record("u1", CARD, amount)
+    assert ledger.month_totals("u1") == {}
+    ledger.close()
+
+
+def test_workers_see_each_others_spend(tmp_path):
+    # two workers = two connections to the same file, each with its own LRU
+    a, b = SpendLedger(tmp_path / "ledger.db"), SpendLedger(tmp_path / "ledger.db")
+    assert a.record("u1", CARD, 100.0) == 100.0
+    assert b.month_totals("u1") == {CARD: 100.0}  # b caches (u1, month) here
+    assert b.record("u1", CARD, 50.0) == 150.0
+    assert a.month_totals("u1") == {CARD: 150.0}
+    assert a.record("u1", CARD, 25.0) == 175.0
+    assert b.month_totals("u1") == {CARD: 175.0}
+    a.close()
+    b.close()
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from bench.month_plan import synthetic_month
+from bench.synthetic import synthetic_cards
+from optimizer import _evaluate, plan_month
+from rules import compile_cards
+
+
+def test_plan_beats_greedy_and_scores_its_plan():
+    rng = random.Random(1)
+    cards = compile_cards(synthetic_cards(12, rng))
+    for mode in ("miles", "cashback"):
+        txns = synthetic_month(300, rng)
+        result = plan_month(cards, txns, mode, cap_used={cards[0].name: 200.0})
+        assert result["total"] >= result["greedy_total"] - 1e-6
+        total, _ = _evaluate(cards, txns, result["plan"], mode, {cards[0].name: 200.0})
+        assert abs(total - result["total"]) < 1e-6
+
+
+def test_3000_txns_50_cards():
+    # timing lives in `python -m bench.month_plan` (3000 x 50 under a second)
+    rng = random.Random(5)
+    cards = compile_cards(synthetic_cards(50, rng))
+    txns = synthetic_month(3000, rng)
+    result = plan_month(cards, txns, "miles")
+    assert len(result["plan"]) == 3000
+    assert result["total"] >= result["greedy_total"] - 1e-6
+
+
+@pytest.mark.parametrize("amount", ["NaN", "Infinity", "1e309", "1e308"])
+def test_optimize_month_rejects_bad_amounts(amount):
+    txn = '{"url": "https://shopee.sg", "amount": %s}'
+    body = '{"transactions": [%s, %s]}' % (txn % 20, txn % amount)
+    response = TestClient(main.app).post("/optimize-month", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("transactions[1]: amount")
@@ -0,0 +1,26 @@
+from profiles import ProfileStore
+
+
+def test_workers_see_each_others_profile_changes(tmp_path):
+    # two workers = two connections to the same file, each with its own LRU
+    a, b = ProfileStore(tmp_path / "profiles.db"), ProfileStore(tmp_path / "profiles.db")
+    a.put("p1", ["Citi Rewards"], "miles", {"miles": 0.015})
+    cached = b.get("p1")
+    assert cached.wallet == ("Citi Rewards",)
+
+    # an unrelated write elsewhere: the cached profile (and its compiled wallet) stays
+    a.put("p2", ["UOB One"], "cashback")
+    assert b.get("p1") is cached
+
+    a.put("p1", ["UOB One", "OCBC 365"], "cashback")
+    replaced = b.get("p1")
+    assert (replaced.wallet, replaced.mode, replaced.valuations) == (("UOB One", "OCBC 365"), "cashback", {})
+
+    assert a.delete("p1")
+    assert b.get("p1") is None
+
+    # b's own writes show up in a
+    b.put("p1", ["DBS Altitude"], "miles")
+    assert a.get("p1").wallet == ("DBS Altitude",)
+    a.close()
+    b.close()
@@ -0,0 +1,28 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+ITEM = {"url": "https://shopee.sg/cart", "amount": 120.0}
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+def test_top_k_trims_the_breakdown(client):
+    full = client.post("/recommend-card", json=ITEM).json()
+    for k in (0, 1, 3):
+        slim = client.post("/recommend-card", json={**ITEM, "top_k": k}).json()
+        assert slim["best_card"] == full["best_card"]
+        assert slim["breakdown"] == full["breakdown"][:k]
+
+
+def test_negative_top_k_is_rejected(client):
+    response = client.post("/recommend-card", json={**ITEM, "top_k": -1})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][-1] == "top_k"
+
+    response = client.post("/recommend-card/batch", json={"items": [ITEM, {**ITEM, "top_k": -2}]})
+    assert response.status_code == 422
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from replay import MAX_RECORD_CHARS, MAX_RECORD_LINES, RecordError, records
+
+HEADER = "date,merchant,amount,currency\n"
+ROW = "2024-05-0{},Shopee,{}.50,SGD\n"
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+def _replay(client, body: str) -> list:
+    response = client.post("/replay-statement", content=body.encode())
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def _records(body: bytes, chunk: int = 4096) -> list:
+    async def chunks():
+        for i in range(0, len(body), chunk):
+            yield body[i:i + chunk]
+
+    async def collect():
+        return [r async for r in records(chunks())]
+
+    return asyncio.run(collect())
+
+
+def test_quoted_newlines_stay_in_one_record(client):
+    body = HEADER + '2024-05-01,"Shopee\nSingapore",10,SGD\n' + ROW.format(2, 20)
+    lines = _replay(client, body)
+    rows = [line for line in lines if line["type"] == "row"]
+    assert [row["amount"] for row in rows] == [10.0, 20.5]
+    assert lines[-1]["done"] and lines[-1]["errors"] == 0
+
+
+def test_unterminated_quote_is_one_error_row(client):
+    rows = "".join(ROW.format(i % 9 + 1, i) for i in range(3 * MAX_RECORD_LINES))
+    lines = _replay(client, HEADER + '2024-05-01,"Shopee,10,SGD\n' + rows)
+    errors = [line for line in lines if line["type"] == "error"]
+    assert len(errors) == 1 and errors[0]["line"] == 2
+    assert "unterminated quote" in errors[0]["error"]
+    # every row after the broken one is still scored
+    assert sum(line["type"] == "row" for line in lines) == 3 * MAX_RECORD_LINES
+
+
+def test_over_long_line_is_skipped_not_buffered():
+    body = (HEADER + "x" * (3 * MAX_RECORD_CHARS) + "\n" + ROW.format(1, 5)).encode()
+    found = _records(body)
+    assert found[0] == HEADER.strip()
+    assert isinstance(found[1], RecordError)
+    assert found[2:] == [ROW.format(1, 5).strip()]
+
+
+def test_broken_header_is_a_400(client):
+    response = client.post("/replay-statement", content=('"merchant,amount\n' + "Shopee,10\n" * (MAX_RECORD_LINES + 5)).encode())
+    assert response.status_code == 400
+    assert "bad header" in response.json()["detail"]
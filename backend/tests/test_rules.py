@@ -0,0 +1,138 @@
+"""
+CompiledCard.rewards must stay an exact drop-in for compute_card_rewards,
+the readable reference, whatever cards_data.json or the rules say.
+"""
+
+import itertools
+import random
+
+import pytest
+
+from bench.synthetic import synthetic_cards, synthetic_merchants, with_synthetic_rules
+from rule_dsl import interpret_rules
+from rules import CATEGORY_PARENTS, CompiledCard, category_chain, compute_card_rewards, load_cards
+
+CARDS = load_cards()
+SYNTHETIC_CARDS = with_synthetic_rules(
+    synthetic_cards(12, random.Random(3)), synthetic_merchants(20, random.Random(4)), random.Random(5), share=1.0
+)
+
+AMOUNTS = (0.0, 0.01, 12.345, 400.0, 1000.01)
+CAP_USED = (None, 0.0, 250.0, 10_000.0)
+CURRENCIES = ("SGD", "USD")
+
+
+def _rule_values(cards: list, key: str) -> set:
+    """Every value a card rule condition tests for key (merchant, mcc, ...)."""
+    found = set()
+
+    def walk(node):
+        if isinstance(node, dict):
+            for k, v in node.items():
+                if k == key:
+                    found.update(v if isinstance(v, list) else [v])
+                walk(v)
+        elif isinstance(node, list):
+            for v in node:
+                walk(v)
+
+    for card in cards:
+        walk(card.get("rules", []))
+    # MCC conditions may be "from-to" ranges; keep the single codes
+    return {v for v in found if isinstance(v, str) and not (key == "mcc" and "-" in v)}
+
+
+def _categories(cards: list) -> list:
+    categories = {"general", "not_a_category"} | set(CATEGORY_PARENTS) | set(CATEGORY_PARENTS.values())
+    for card in cards:
+        categories.update(card.get("category_mpd", {}))
+        categories.update(card.get("blocked_categories", []))
+        categories.update(_rule_values([card], "category"))
+    return sorted(categories)
+
+
+def _mccs(cards: list) -> list:
+    mccs = {"", "0000", "5311", "4722", "6300"}
+    for card in cards:
+        mccs.update(card.get("blocked_mccs", []))
+    return sorted(mccs | _rule_values(cards, "mcc"))
+
+
+def _base_rates(card: dict, is_online: bool, currency: str) -> tuple:
+    """(mpd, cashback %) once the bonus cap is used up, per the reference."""
+    plain = {
+        **card,
+        "online_mpd": None,
+        "category_mpd": {},
+        "blocked_categories": [],
+        "blocked_mccs": [],
+        "rules": [],
+        "cashback_rate": card.get("base_cashback_rate") or 0.0,
+    }
+    ref = compute_card_rewards(plain, 1.0, "general", is_online, "", currency=currency)
+    return ref["effective_mpd"], plain["cashback_rate"]
+
+
+def _expected(card: dict, amount, category, is_online, mcc, currency, merchant, cap_used) -> dict:
+    ref = compute_card_rewards(card, amount, category, is_online, mcc, currency=currency, merchant=merchant)
+    if cap_used is None or not card.get("bonus_cap_amount") or ref["blocked"]:
+        return ref
+
+    # the reference doesn't track monthly usage: split the txn at the cap by hand
+    mpd = ref["effective_mpd"]
+    cashback_rate = card.get("cashback_rate", 0.0)
+    if card.get("rules"):
+        effect = interpret_rules(card["rules"], merchant, category_chain(category), is_online, mcc, currency, amount)
+        if effect is not None and effect.cashback_rate is not None:
+            cashback_rate = effect.cashback_rate
+    base_mpd, base_cashback_rate = _base_rates(card, is_online, currency)
+    remaining = max(card["bonus_cap_amount"] - cap_used, 0.0)
+    bonus_amount = min(max(amount, 0.0), remaining)
+    base_amount = amount - bonus_amount
+    cashback = 0.0
+    if cashback_rate:
+        cashback = (bonus_amount * cashback_rate + base_amount * min(cashback_rate, base_cashback_rate)) / 100
+    return {
+        "miles": round(bonus_amount * mpd + base_amount * min(mpd, base_mpd), 2),
+        "cashback": round(cashback, 2),
+        "blocked": False,
+        "capped": base_amount > 0,
+        "effective_mpd": mpd,
+        "bonus_amount": round(bonus_amount, 2),
+        "base_amount": round(base_amount, 2),
+        "rule": ref.get("rule"),
+    }
+
+
+def _sweep(card: dict, merchants: list) -> int:
+    compiled = CompiledCard(card)
+    cases = itertools.product(
+        _categories([card]), (True, False), _mccs([card]), CURRENCIES, merchants, AMOUNTS, CAP_USED
+    )
+    n = 0
+    for category, is_online, mcc, currency, merchant, amount, cap_used in cases:
+        if cap_used is not None and not card.get("bonus_cap_amount"):
+            continue
+        expected = _expected(card, amount, category, is_online, mcc, currency, merchant, cap_used)
+        got = compiled.rewards(
+            amount, category, is_online, mcc, currency != "SGD",
+            cap_used=cap_used, merchant=merchant, currency=currency,
+        )
+        if cap_used is not None and not expected["blocked"]:
+            got = {k: got.get(k) for k in expected}
+        case = (category, is_online, mcc, currency, merchant, amount, cap_used)
+        assert got == expected, case
+        n += 1
+    return n
+
+
+@pytest.mark.parametrize("card", CARDS, ids=[c["name"] for c in CARDS])
+def test_compiled_card_matches_reference(card):
+    merchants = ["", "not-a-merchant"] + sorted(_rule_values(CARDS, "merchant"))
+    assert _sweep(card, merchants) > 0
+
+
+@pytest.mark.parametrize("card", SYNTHETIC_CARDS, ids=[c["name"] for c in SYNTHETIC_CARDS])
+def test_compiled_card_matches_reference_with_synthetic_rules(card):
+    merchants = [""] + sorted(_rule_values(SYNTHETIC_CARDS, "merchant"))[:6]
+    assert _sweep(card, merchants) > 0
@@ -0,0 +1,57 @@
+"""
+extension/scoring.js must return what recommend_card does. The golden
+file pins both sides: it has to match the server as it is now, and Node
+has to reproduce it.
+"""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from tests.scoring_golden import GOLDEN_PATH, dumps, golden
+
+NODE = shutil.which("node")
+REGENERATE = "stale extension/test/golden.json: run `python -m tests.scoring_golden` from backend/"
+
+
+@pytest.fixture(scope="module")
+def fresh():
+    return golden()
+
+
+def test_golden_file_matches_recommend_card(fresh):
+    committed = json.loads(GOLDEN_PATH.read_text())
+    assert [s["name"] for s in committed["suites"]] == [s["name"] for s in fresh["suites"]], REGENERATE
+    for old, new in zip(committed["suites"], fresh["suites"]):
+        assert old["snapshot"] == new["snapshot"], REGENERATE
+        for i, (a, b) in enumerate(zip(old["cases"], new["cases"])):
+            assert a == b, f"{old['name']} case {i}: {REGENERATE}"
+        assert len(old["cases"]) == len(new["cases"]), REGENERATE
+
+
+def _node_test(golden_path) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [NODE, "--test", str(GOLDEN_PATH.parent / "scoring.test.js")],
+        env={"PATH": "", "SWIPESMART_SCORING_GOLDEN": str(golden_path)},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+@pytest.mark.skipif(NODE is None, reason="node not installed")
+def test_scoring_js_matches_golden_file():
+    run = _node_test(GOLDEN_PATH)
+    assert run.returncode == 0, run.stdout + run.stderr
+
+
+@pytest.mark.skipif(NODE is None, reason="node not installed")
+def test_scoring_js_matches_current_server(fresh, tmp_path):
+    # the same check against what the server says right now, so a stale
+    # golden file can't hide a divergence
+    path = tmp_path / "golden.json"
+    path.write_text(dumps(fresh))
+    run = _node_test(path)
+    assert run.returncode == 0, run.stdout + run.stderr
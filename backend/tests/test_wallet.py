@@ -0,0 +1,38 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+def _optimize(client, *lines: str):
+    # raw body: NaN / Infinity / 1e309 aren't strict JSON, but the parser takes them
+    body = '{"spend": [%s]}' % ", ".join(lines)
+    return client.post("/optimize-wallet", content=body, headers={"Content-Type": "application/json"})
+
+
+def test_wallet_picks_cards(client):
+    response = _optimize(client, '{"amount": 800, "category": "dining"}', '{"amount": 300, "url": "https://shopee.sg"}')
+    assert response.status_code == 200
+    assert 1 <= len(response.json()["wallets"][0]["cards"]) <= 3
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        '{"amount": NaN, "category": "dining"}',
+        '{"amount": Infinity, "category": "dining"}',
+        '{"amount": 1e309, "category": "dining"}',
+        '{"amount": 1e308, "category": "dining"}',
+        '{"amount": 100, "category": "dining", "txn_amount": NaN}',
+        '{"amount": -1, "category": "dining"}',
+    ],
+)
+def test_wallet_rejects_bad_amounts(client, line):
+    response = _optimize(client, '{"amount": 50, "category": "groceries"}', line)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("spend[1]: ")
@@ -0,0 +1,333 @@
+"""
+Offline T&C ingestion: issuer PDFs (ccguides/) -> MCC exclusions and
+earn rates, diffed against cards_data.json.
+
+    python tnc_ingest.py                 # report for every PDF in ccguides/
+    python tnc_ingest.py --json          # the same diff as JSON
+    python tnc_ingest.py --jobs 4 --no-cache
+
+1) every PDF is hashed; files whose content hash is already in the cache
+   (SWIPESMART_TNC_CACHE, default backend/tnc_cache.json) aren't parsed
+   again, so re-runs only pay for the PDFs that changed;
+2) changed PDFs are split into page chunks and their text extracted on
+   a process pool (pypdf, only needed when something has to be parsed);
+3) excluded MCCs (the "MCC Description" tables under an exclusion clause,
+   plus "MCC dddd-dddd" ranges) and earn rates ("1.4 miles per S$1",
+   "10X Rewards" on DBS Points) are pulled out of the text;
+4) the results are compared with each mapped card's blocked_mccs and
+   base / fcy / online / category_mpd rates.
+
+Extraction is pattern-based and the diff is for a human to review:
+nothing is written back to cards_data.json.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from rules import load_cards
+
+GUIDES_DIR = Path(os.environ.get("SWIPESMART_TNC_DIR", Path(__file__).parent.parent / "ccguides"))
+CACHE_PATH = Path(os.environ.get("SWIPESMART_TNC_CACHE", Path(__file__).parent / "tnc_cache.json"))
+
+# bump when extraction changes, so cached results are recomputed
+EXTRACTOR_VERSION = 2
+
+# pages per process pool task; large PDFs are spread over several workers
+PAGES_PER_TASK = 4
+
+# PDF file name -> cards_data.json cards it governs
+SOURCES = {
+    "citi_premiermiles-tnc.pdf": ("Citi PremierMiles",),
+    "dbs-cards-acqui-altitude-credit-card-tnc.pdf": ("DBS Altitude Visa",),
+    "dbs-womans-card-tnc.pdf": ("DBS Woman's World Mastercard",),
+    "rewards-exclusion-list.pdf": ("Citi Rewards", "Citi PremierMiles", "Citi Cash Back"),
+    "terms-and-conditions-governing-uob-prvi-miles-card.pdf": ("UOB PRVI Miles Visa",),
+    "uob-prvi-miles-visa-promo-tncs.pdf": ("UOB PRVI Miles Visa",),
+}
+
+# miles per DBS Point earned on each S$5 (1 DBS Point = 2 miles)
+_DBS_POINT_MPD = 2 / 5
+
+_MCC_CONTEXT = re.compile(r"\bMCCs?\b|Merchant Category Code", re.I)
+_EXCLUSION = re.compile(
+    r"exclud|will not be awarded|not be awarded|will not earn|not earn|not eligible|no .{0,40} will be awarded",
+    re.I,
+)
+# "0763 Agricultural Co-operatives", "MCC 8062** Hospitals"
+_MCC_ROW = re.compile(r"^\s*(?:MCC\s+)?(\d{4})\*{0,2}\s+[A-Za-z(]")
+_MCC_RANGE = re.compile(r"MCC\s*(\d{4})\s*[-–]\s*(\d{4})")
+# rows of a table may be split by page footers and wrapped descriptions
+_MAX_TABLE_GAP = 8
+# how far above a table its exclusion clause may be
+_CLAUSE_LOOKBACK = 40
+
+_MILES_PER_DOLLAR = re.compile(
+    r"(\d+(?:\.\d+)?)\s+(?:Citi\s+)?miles?\s+(?:per|for\s+every)\s+S\$\s?1(?![\d,])",
+    re.I,
+)
+_DBS_MULTIPLIER = re.compile(r"\b(\d+)X\s+(?:Rewards|DBS\s+Points?)\b", re.I)
+# "1X DBS Point and additional 2X ...": what follows "additional" is a top-up, not a total
+_ADDITIONAL = re.compile(r"\badditional\b", re.I)
+_SENTENCE_END = re.compile(r"(?<=[.;])\s+")
+
+
+def file_hash(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def page_count(path) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def page_texts(path, start: int, stop: int) -> list:
+    """Text of pages [start, stop) (process pool task)."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def excluded_mccs(text: str) -> dict:
+    """
+    {"codes": [...], "ranges": [[lo, hi], ...], "listed": [...]}:
+    codes / ranges from MCC tables under an exclusion clause, and
+    "listed" for MCC table rows with no exclusion wording above them.
+    """
+    lines = text.splitlines()
+    codes, listed, ranges = set(), set(), set()
+    in_table = False
+    excluding = False
+    gap = 0
+    for i, line in enumerate(lines):
+        row = _MCC_ROW.match(line)
+        if row and in_table:
+            (codes if excluding else listed).add(row.group(1))
+            gap = 0
+        elif _MCC_CONTEXT.search(line):
+            # a table (or a range) starts here; find the clause it belongs to
+            if not in_table:
+                above = "\n".join(lines[max(0, i - _CLAUSE_LOOKBACK):i + 1])
+                excluding = bool(_EXCLUSION.search(above))
+            in_table = True
+            gap = 0
+            if row:
+                (codes if excluding else listed).add(row.group(1))
+        elif in_table:
+            gap += 1
+            if gap > _MAX_TABLE_GAP:
+                in_table = False
+
+        if in_table and excluding:
+            for lo, hi in _MCC_RANGE.findall(line):
+                if lo <= hi:
+                    ranges.add((int(lo), int(hi)))
+
+    return {
+        "codes": sorted(codes),
+        "ranges": [list(r) for r in sorted(ranges)],
+        "listed": sorted(listed - codes),
+    }
+
+
+def _snippet(line: str) -> str:
+    return " ".join(line.split())[:160]
+
+
+def earn_rates(text: str) -> list:
+    """[{"mpd", "text"}] for every distinct earn rate the text states, first mention kept."""
+    found = {}
+    for line in text.splitlines():
+        for value in _MILES_PER_DOLLAR.findall(line):
+            found.setdefault(float(value), _snippet(line))
+    if "DBS Point" in text:
+        # multipliers go by sentence: "additional 9X ... or 7X" often wraps across lines
+        for sentence in _SENTENCE_END.split(" ".join(text.split())):
+            for multiple in _DBS_MULTIPLIER.findall(_ADDITIONAL.split(sentence, 1)[0]):
+                found.setdefault(round(int(multiple) * _DBS_POINT_MPD, 2), _snippet(sentence))
+    return [{"mpd": mpd, "text": snippet} for mpd, snippet in sorted(found.items())]
+
+
+def extract(text: str) -> dict:
+    return {"mccs": excluded_mccs(text), "rates": earn_rates(text)}
+
+
+def _load_cache(path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != EXTRACTOR_VERSION:
+        return {}
+    return cache.get("files", {})
+
+
+def _save_cache(path, files: dict):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"version": EXTRACTOR_VERSION, "files": files}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def ingest(paths, jobs: int | None = None, cache_path=CACHE_PATH, use_cache: bool = True) -> tuple[dict, dict]:
+    """
+    Returns ({file name: {"sha256", "pages", "mccs", "rates"}}, stats).
+    Only files whose content hash isn't cached are parsed.
+    """
+    cached = _load_cache(cache_path) if use_cache else {}
+    results, todo = {}, []
+
+    # 1) content hashes decide what has to be parsed
+    for path in paths:
+        digest = file_hash(path)
+        hit = cached.get(digest)
+        if hit is not None:
+            results[Path(path).name] = {"sha256": digest, **hit}
+        else:
+            todo.append((Path(path), digest))
+
+    # 2) page chunks of the changed files, text extracted in parallel
+    if todo:
+        tasks = []
+        for path, _ in todo:
+            n = page_count(path)
+            tasks.extend((str(path), start, min(start + PAGES_PER_TASK, n)) for start in range(0, n, PAGES_PER_TASK))
+        jobs = jobs or os.cpu_count() or 1
+        if jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+                chunks = list(pool.map(page_texts, *zip(*tasks)))
+        else:
+            chunks = [page_texts(*task) for task in tasks]
+
+        pages = {}
+        for (path, _, _), chunk in zip(tasks, chunks):
+            pages.setdefault(path, []).extend(chunk)
+
+        # 3) tables and rates can span pages, so extract per whole document
+        for path, digest in todo:
+            doc = pages.get(str(path), [])
+            entry = {"pages": len(doc), **extract("\n".join(doc))}
+            cached[digest] = entry
+            results[path.name] = {"sha256": digest, **entry}
+
+    if use_cache and todo:
+        # drop hashes of files that are gone or changed
+        live = {r["sha256"] for r in results.values()}
+        _save_cache(cache_path, {d: e for d, e in cached.items() if d in live})
+
+    return results, {"files": len(results), "parsed": len(todo), "cached": len(results) - len(todo)}
+
+
+def _card_rates(card: dict) -> list:
+    """[(field, mpd)] for a card's configured miles rates."""
+    rates = [(field, card[field]) for field in ("base_mpd", "fcy_mpd", "online_mpd") if card.get(field)]
+    rates.extend((f"category_mpd.{cat}", mpd) for cat, mpd in sorted(card.get("category_mpd", {}).items()))
+    return rates
+
+
+def diff_cards(results: dict, cards: list, sources: dict = SOURCES) -> dict:
+    """Per mapped card: MCCs to add / no longer in the T&Cs, and rates the T&Cs and data don't share."""
+    by_name = {card["name"]: card for card in cards}
+    report = {}
+    for file_name, result in sorted(results.items()):
+        for name in sources.get(file_name, ()):
+            entry = report.setdefault(name, {"sources": [], "mccs": set(), "ranges": set(), "rates": {}})
+            entry["sources"].append(file_name)
+            entry["mccs"].update(result["mccs"]["codes"])
+            entry["ranges"].update(tuple(r) for r in result["mccs"]["ranges"])
+            for rate in result["rates"]:
+                entry["rates"].setdefault(rate["mpd"], {**rate, "source": file_name})
+
+    diff = {}
+    for name, entry in sorted(report.items()):
+        card = by_name.get(name)
+        if card is None:
+            diff[name] = {"sources": entry["sources"], "error": "card not in cards_data.json"}
+            continue
+        blocked = set(card.get("blocked_mccs", []))
+        configured = _card_rates(card)
+        configured_values = {mpd for _, mpd in configured}
+        diff[name] = {
+            "sources": entry["sources"],
+            "blocked_mccs": {
+                "add": sorted(entry["mccs"] - blocked),
+                "not_in_tncs": sorted(blocked - entry["mccs"]),
+                "ranges": [list(r) for r in sorted(entry["ranges"])],
+            },
+            "rates": {
+                "new": [r for mpd, r in sorted(entry["rates"].items()) if mpd not in configured_values],
+                "not_in_tncs": [
+                    {"field": field, "mpd": mpd} for field, mpd in configured if mpd not in entry["rates"]
+                ],
+            },
+        }
+    unmapped = sorted(f for f in results if f not in sources)
+    return {"cards": diff, "unmapped_files": unmapped}
+
+
+def _print_report(results: dict, diff: dict, stats: dict):
+    print(f"{stats['files']} PDFs ({stats['parsed']} parsed, {stats['cached']} from cache)")
+    for file_name, r in sorted(results.items()):
+        m = r["mccs"]
+        print(
+            f"  {file_name}: {r['pages']} pages, {len(m['codes'])} excluded MCCs, "
+            f"{len(m['ranges'])} ranges, {len(r['rates'])} rates"
+        )
+    for name, d in diff["cards"].items():
+        print(f"\n{name}  <- {', '.join(d['sources'])}")
+        if "error" in d:
+            print(f"  {d['error']}")
+            continue
+        b, rates = d["blocked_mccs"], d["rates"]
+        print(f"  blocked_mccs + {', '.join(b['add']) or '-'}")
+        print(f"  blocked_mccs not in T&Cs: {', '.join(b['not_in_tncs']) or '-'}")
+        if b["ranges"]:
+            print(f"  excluded MCC ranges: {', '.join(f'{lo}-{hi}' for lo, hi in b['ranges'])}")
+        for r in rates["new"]:
+            print(f"  rate {r['mpd']} mpd not in data: \"{r['text']}\"")
+        for r in rates["not_in_tncs"]:
+            print(f"  {r['field']} = {r['mpd']} not stated in T&Cs")
+    if diff["unmapped_files"]:
+        print(f"\nno card mapping (tnc_ingest.SOURCES): {', '.join(diff['unmapped_files'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract MCC exclusions and earn rates from T&C PDFs.")
+    parser.add_argument("paths", nargs="*", type=Path, help=f"PDFs (default: {GUIDES_DIR}/*.pdf)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--cache", type=Path, default=CACHE_PATH)
+    parser.add_argument("--no-cache", action="store_true", help="parse everything, don't read or write the cache")
+    parser.add_argument("--json", action="store_true", help="print the diff as JSON")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(GUIDES_DIR.glob("*.pdf"))
+    if not paths:
+        sys.exit(f"no PDFs found in {GUIDES_DIR}")
+    try:
+        results, stats = ingest(paths, args.jobs, args.cache, not args.no_cache)
+    except ImportError:
+        sys.exit("parsing PDFs needs pypdf: pip install -r requirements-dev.txt (or pip install pypdf)")
+    diff = diff_cards(results, load_cards())
+
+    if args.json:
+        print(json.dumps({"stats": stats, "files": results, **diff}, indent=2))
+    else:
+        _print_report(results, diff, stats)
+
+
+if __name__ == "__main__":
+    main()
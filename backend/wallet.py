@@ -0,0 +1,271 @@
+"""
+Which cards to hold: wallet selection by branch and bound.
+
+Given a monthly spend profile and a max number of cards, find the card
+subsets with the highest net annual value: rewards in SGD (miles and
+cashback at the given valuations) minus annual fees, with waivable fees
+counted as waived unless asked otherwise.
+
+1. per card and spend line, the SGD earned per dollar inside the bonus
+   cap and beyond it is worked out once (rates_for + valuations); every
+   subset below is scored from these numbers, never by re-running card
+   rules;
+2. in a subset, each line earns at least the best uncapped rate any of
+   its cards offers (the floor); the bonus above the floor, limited by
+   each capped card's monthly cap, is a min-cost flow over lines ×
+   capped cards, as in optimizer.plan_month;
+3. depth-first search over cards ordered by standalone net value,
+   including a card before excluding it. A branch is cut when its value
+   plus the best remaining cards' optimistic gains can't beat the n-th
+   best wallet so far. A card's optimistic gain is what it earns above
+   the current subset's floor (bonus cap filled with the lines it
+   improves most, the rest at its uncapped rate); moving that card's
+   share of any allocation back to the floor shows it's an upper bound,
+   so pruning never drops a better wallet. Greedy picks seed the best
+   wallets so pruning starts at the root.
+
+Wallets only list cards that earn something in them.
+"""
+
+import heapq
+from math import comb
+
+from optimizer import min_cost_flow
+
+_EPS = 1e-9
+
+# SGD per mile / per cashback dollar when neither request nor profile sets one
+WALLET_VALUATIONS = {"miles": 0.015, "cashback": 1.0}
+
+
+def _line_rates(card, ctx, valuations: dict) -> tuple:
+    """(SGD per $ inside the bonus cap, SGD per $ beyond it) for one card on one spend line."""
+    category, is_online, mcc, is_fcy, merchant, currency, txn_amount = ctx
+    rates = card.rates_for(category, is_online, mcc, is_fcy, merchant, currency, txn_amount)
+    if rates is None:
+        return 0.0, 0.0
+    mpd, cashback_rate = rates
+    cashback_rate = cashback_rate or 0.0
+    bonus = mpd * valuations["miles"] + cashback_rate / 100 * valuations["cashback"]
+    if not card.bonus_cap_amount:
+        return bonus, bonus
+    base_mpd = min(mpd, card.base_rates[(2 if is_online else 0) + (1 if is_fcy else 0)])
+    base_cashback = min(cashback_rate, card.base_cashback_rate)
+    return bonus, base_mpd * valuations["miles"] + base_cashback / 100 * valuations["cashback"]
+
+
+class _Catalog:
+    """Per-card line rates, caps and fees, and the subset valuation over them."""
+
+    __slots__ = ("spend", "bonus", "over", "caps", "fees", "evaluated")
+
+    def __init__(self, cards, lines, valuations, waive_fees):
+        self.spend = [max(amount, 0.0) for amount, _ in lines]
+        rates = [[_line_rates(card, ctx, valuations) for _, ctx in lines] for card in cards]
+        self.bonus = [[r[0] for r in row] for row in rates]
+        self.over = [[r[1] for r in row] for row in rates]
+        self.caps = [card.bonus_cap_amount or None for card in cards]
+        self.fees = [
+            0.0 if waive_fees and card.annual_fee_waivable else float(card.annual_fee or 0.0)
+            for card in cards
+        ]
+        self.evaluated = 0
+
+    def floor(self, members) -> list:
+        """Best uncapped SGD per $ per line among members (0 for an empty wallet)."""
+        out = [0.0] * len(self.spend)
+        for j in members:
+            over = self.over[j]
+            for i, rate in enumerate(over):
+                if rate > out[i]:
+                    out[i] = rate
+        return out
+
+    def value(self, members, floor=None, allocate: bool = False):
+        """
+        Monthly SGD value of holding members, with each capped card's
+        bonus limited to its cap. With allocate, also the spend split as
+        [(line, card, spend, SGD per $)].
+        """
+        self.evaluated += 1
+        floor = floor if floor is not None else self.floor(members)
+        total = sum(s * f for s, f in zip(self.spend, floor))
+
+        lines = range(len(self.spend))
+        capped = [j for j in members if self.caps[j] is not None]
+        gains = []  # (line, card, SGD per $ above the floor)
+        for j in capped:
+            bonus = self.bonus[j]
+            gains.extend((i, j, bonus[i] - floor[i]) for i in lines if bonus[i] - floor[i] > _EPS and self.spend[i] > 0)
+
+        flows = []
+        if gains:
+            # source 0, sink 1, lines 2.., capped cards after them
+            line_node = {i: 2 + i for i in lines}
+            card_node = {j: 2 + len(self.spend) + n for n, j in enumerate(capped)}
+            edges = [(0, line_node[i], self.spend[i], 0.0) for i in lines]
+            edges += [(line_node[i], card_node[j], float("inf"), -gain) for i, j, gain in gains]
+            edges += [(card_node[j], 1, float(self.caps[j]), 0.0) for j in capped]
+            flows = min_cost_flow(2 + len(self.spend) + len(capped), edges, 0, 1)[len(self.spend):len(self.spend) + len(gains)]
+            total += sum(flow * gain for flow, (_, _, gain) in zip(flows, gains))
+
+        if not allocate:
+            return total
+        allocation = []
+        routed = [0.0] * len(self.spend)
+        for flow, (i, j, _) in zip(flows, gains):
+            if flow > _EPS:
+                allocation.append((i, j, flow, self.bonus[j][i]))
+                routed[i] += flow
+        for i in lines:
+            rest = self.spend[i] - routed[i]
+            if rest > _EPS and floor[i] > 0:
+                # the rest goes to the card giving the floor (the cheapest-fee one on ties)
+                j = max(members, key=lambda j: (self.over[j][i], -self.fees[j]))
+                allocation.append((i, j, rest, self.over[j][i]))
+        return total, allocation
+
+    def gain_bound(self, j: int, floor: list) -> float:
+        """Upper bound on what card j adds, per month, to a wallet with these floor rates."""
+        bonus, over, spend = self.bonus[j], self.over[j], self.spend
+        base = 0.0
+        lifts = []  # (extra SGD per $ inside the cap, line spend)
+        for i, f in enumerate(floor):
+            b = max(bonus[i] - f, 0.0)
+            o = max(over[i] - f, 0.0)
+            base += spend[i] * o
+            if b - o > _EPS:
+                lifts.append((b - o, spend[i]))
+        cap = self.caps[j]
+        if cap is None:
+            return base
+        for lift, amount in sorted(lifts, reverse=True):
+            take = min(amount, cap)
+            base += take * lift
+            cap -= take
+            if cap <= _EPS:
+                break
+        return base
+
+
+def choose_wallet(cards, lines, max_cards: int = 3, valuations: dict | None = None,
+                  waive_fees: bool = True, top_n: int = 3) -> dict:
+    """
+    cards: CompiledCard candidates. lines: [(monthly SGD, (category,
+    is_online, mcc, is_fcy, merchant, currency, txn amount))].
+    Returns {"wallets": best top_n wallets, best first, "search": counters}.
+    """
+    valuations = {**WALLET_VALUATIONS, **(valuations or {})}
+    catalog = _Catalog(cards, lines, valuations, waive_fees)
+    fees = catalog.fees
+
+    # 1) candidates: cards that earn something alone, best standalone net value first
+    empty_floor = [0.0] * len(lines)
+    standalone = {j: catalog.gain_bound(j, empty_floor) for j in range(len(cards))}
+    order = sorted((j for j in standalone if standalone[j] > _EPS), key=lambda j: (-(standalone[j] - fees[j] / 12), j))
+    max_cards = max(1, min(max_cards, len(order))) if order else 0
+
+    best = []  # min-heap of (net, tiebreak, members), the top_n wallets so far
+    seen = set()
+
+    def offer(members: tuple, gross: float):
+        key = frozenset(members)
+        if key in seen:
+            return
+        seen.add(key)
+        net = gross - sum(fees[j] / 12 for j in members)
+        item = (net, -len(members), tuple(sorted(members)))
+        if len(best) < top_n:
+            heapq.heappush(best, item)
+        elif item > best[0]:
+            heapq.heapreplace(best, item)
+
+    def threshold() -> float:
+        return best[0][0] if len(best) >= top_n else float("-inf")
+
+    # 2) greedy seed: add the card with the best net marginal while it helps
+    members, gross = (), 0.0
+    for _ in range(max_cards):
+        step = None
+        for j in order:
+            if j in members:
+                continue
+            value = catalog.value(members + (j,))
+            if value - gross > _EPS:
+                offer(members + (j,), value)
+                gain = value - gross - fees[j] / 12
+                if step is None or gain > step[0]:
+                    step = (gain, j, value)
+        if step is None or step[0] <= _EPS:
+            break
+        members, gross = members + (step[1],), step[2]
+
+    # 3) branch and bound: include order[k] or skip it
+    counters = {"nodes": 0, "pruned": 0}
+
+    def search(k: int, members: tuple, gross: float, floor: list):
+        counters["nodes"] += 1
+        slots = max_cards - len(members)
+        if slots == 0 or k == len(order):
+            return
+        gains = sorted(
+            (catalog.gain_bound(j, floor) - fees[j] / 12 for j in order[k:]),
+            reverse=True,
+        )
+        optimistic = gross - sum(fees[j] / 12 for j in members) + sum(g for g in gains[:slots] if g > 0)
+        if optimistic <= threshold() + _EPS:
+            counters["pruned"] += 1
+            return
+
+        j = order[k]
+        with_j = members + (j,)
+        floor_j = [max(f, o) for f, o in zip(floor, catalog.over[j])]
+        value = catalog.value(with_j, floor_j)
+        if value - gross > _EPS:  # a card that adds nothing never makes a useful wallet
+            offer(with_j, value)
+            search(k + 1, with_j, value, floor_j)
+        search(k + 1, members, gross, floor)
+
+    if order:
+        search(0, (), 0.0, empty_floor)
+
+    # 4) report the winners with their spend allocation
+    wallets = []
+    for net, _, members in sorted(best, reverse=True):
+        gross, allocation = catalog.value(members, allocate=True)
+        per_card = {j: {"monthly_spend": 0.0, "annual_value": 0.0, "annual_fee": fees[j]} for j in members}
+        line_cards = [{} for _ in lines]
+        for i, j, spend, rate in allocation:
+            per_card[j]["monthly_spend"] += spend
+            per_card[j]["annual_value"] += spend * rate * 12
+            line_cards[i][j] = line_cards[i].get(j, 0.0) + spend
+        annual_fees = sum(fees[j] for j in members)
+        allocated = sum(spend for _, _, spend, _ in allocation)
+        wallets.append({
+            "cards": [cards[j].name for j in members],
+            "annual_value": round(gross * 12, 2),
+            "annual_fees": round(annual_fees, 2),
+            "net_annual_value": round(gross * 12 - annual_fees, 2),
+            "per_card": {cards[j].name: {k: round(v, 2) for k, v in row.items()} for j, row in per_card.items()},
+            # per spend line, where its monthly spend goes
+            "lines": [
+                [{"card_name": cards[j].name, "monthly_spend": round(spend, 2)} for j, spend in split.items()]
+                for split in line_cards
+            ],
+            # blocked on every card held, or only earning above caps that are already full
+            "monthly_spend_earning_nothing": round(max(sum(catalog.spend) - allocated, 0.0), 2),
+        })
+
+    n = len(order)
+    return {
+        "wallets": wallets,
+        "valuations": valuations,
+        "search": {
+            "cards": len(cards),
+            "candidates": n,
+            "combinations": sum(comb(n, r) for r in range(1, max_cards + 1)),
+            "subsets_evaluated": catalog.evaluated,
+            "nodes": counters["nodes"],
+            "pruned": counters["pruned"],
+        },
+    }
@@ -1,4 +1,9 @@
 const BACKEND_URL = "http://127.0.0.1:8000/recommend-card";
+const RULESET_URL = "http://127.0.0.1:8000/ruleset";
+
+// a cached ruleset younger than this is used without asking the server;
+// older ones are revalidated (If-None-Match) and only used if it's down
+const RULESET_MAX_AGE_MS = 10 * 60 * 1000;
 
 function setUrlDisplay(url) {
   const el = document.getElementById("urlDisplay");
@@ -71,6 +76,68 @@ const CARD_META = {
 
 const AVAILABLE_CARDS = Object.keys(CARD_META);
 
+// ---------- local ruleset (see scoring.js) ----------
+// chrome.storage.local["ruleset"] = { etag, checkedAt, snapshot }
+
+let cachedRuleset = null;
+let localIndex = null;
+
+function storageLocal() {
+  return chrome.storage && chrome.storage.local ? chrome.storage.local : null;
+}
+
+function useRuleset(entry) {
+  if (!entry || !entry.snapshot) return;
+  if (!cachedRuleset || cachedRuleset.snapshot.version !== entry.snapshot.version) {
+    localIndex = buildLocalIndex(entry.snapshot);
+  }
+  cachedRuleset = entry;
+}
+
+function loadCachedRuleset() {
+  const store = storageLocal();
+  if (!store) return Promise.resolve(null);
+  return new Promise((resolve) => {
+    store.get(["ruleset"], (res) => {
+      useRuleset(res.ruleset);
+      resolve(cachedRuleset);
+    });
+  });
+}
+
+// Revalidate the cached snapshot; a 304 only bumps checkedAt.
+function refreshRuleset() {
+  const headers = {};
+  if (cachedRuleset && cachedRuleset.etag) {
+    headers["If-None-Match"] = cachedRuleset.etag;
+  }
+  return fetch(RULESET_URL, { headers })
+    .then((res) => {
+      if (res.status === 304 && cachedRuleset) {
+        return { ...cachedRuleset, checkedAt: Date.now() };
+      }
+      if (!res.ok) throw new Error(`ruleset fetch failed: ${res.status}`);
+      const etag = res.headers.get("ETag");
+      return res.json().then((snapshot) => ({ etag, checkedAt: Date.now(), snapshot }));
+    })
+    .then((entry) => {
+      useRuleset(entry);
+      const store = storageLocal();
+      if (store) store.set({ ruleset: entry });
+      return entry;
+    })
+    .catch((err) => {
+      console.warn(err);
+      return cachedRuleset;
+    });
+}
+
+function rulesetIsFresh() {
+  return Boolean(
+    cachedRuleset && localIndex && Date.now() - cachedRuleset.checkedAt < RULESET_MAX_AGE_MS
+  );
+}
+
 document.addEventListener("DOMContentLoaded", () => {
   const cardListEl = document.getElementById("cardList");
   const cardSectionEl = document.getElementById("cardSection");
@@ -89,6 +156,13 @@ document.addEventListener("DOMContentLoaded", () => {
 
   let cardsCollapsed = false;
 
+  // start from the stored snapshot, revalidate it in the background
+  const rulesetReady = loadCachedRuleset().then(() => {
+    if (!rulesetIsFresh()) return refreshRuleset();
+    refreshRuleset();
+    return cachedRuleset;
+  });
+
   // ---------- helpers ----------
 
   function renderCardCheckboxes(selectedSet) {
@@ -251,12 +325,24 @@ document.addEventListener("DOMContentLoaded", () => {
     resultEl.innerHTML = "";
     errorEl.textContent = "";
 
-    fetch(BACKEND_URL, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(payload)
-    })
-      .then((res) => res.json())
+    rulesetReady
+      .then(() => {
+        // fresh snapshot: score locally, no round-trip
+        if (rulesetIsFresh()) return recommendLocal(localIndex, payload);
+
+        return fetch(BACKEND_URL, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify(payload)
+        })
+          .then((res) => res.json())
+          .catch((err) => {
+            // server down: a stale snapshot still beats no answer
+            if (!localIndex) throw err;
+            console.warn(err);
+            return recommendLocal(localIndex, payload);
+          });
+      })
       .then((data) => {
         renderResult(data);
       })
@@ -0,0 +1,288 @@
+// Client-side port of the backend's recommend_card, driven by the
+// snapshot from GET /ruleset. Given the same snapshot version it must
+// return exactly what the server would (same cards, numbers and text),
+// so keep it in step with main.py / rules.py / merchant_index.py.
+
+// Python's round(x, 2): nearest 2dp value of the exact binary float,
+// ties to even. toFixed also works from the exact value but breaks ties
+// upwards; the only exact ties are odd multiples of 1/8 (x.125, x.375, ...).
+function pyRound2(x) {
+  if (Number.isInteger(x * 8) && !Number.isInteger(x * 4)) {
+    const lo = Math.floor(x * 100);
+    return (lo % 2 === 0 ? lo : lo + 1) / 100;
+  }
+  return Number(x.toFixed(2));
+}
+
+// Build lookup structures once per snapshot (Maps, so data keys can
+// never collide with Object prototype properties).
+function buildLocalIndex(snapshot) {
+  const domains = new Map();
+  const brands = new Map();
+  Object.entries(snapshot.merchants).forEach(([match, info]) => {
+    (match.includes(".") ? domains : brands).set(match, info);
+  });
+
+  const cards = snapshot.cards.map((card) => ({
+    ...card,
+    blocked_categories: new Set(card.blocked_categories),
+    blocked_mccs: new Set(card.blocked_mccs),
+    category_rates: new Map(Object.entries(card.category_rates)),
+    rules: (card.rules || []).map((rule) => ({ when: buildWhen(rule.when), then: rule.then }))
+  }));
+
+  return {
+    version: snapshot.version,
+    cards,
+    domains,
+    brands,
+    mccCodes: new Map(Object.entries(snapshot.mcc.codes)),
+    mccRanges: snapshot.mcc.ranges // sorted [from, to, category]
+  };
+}
+
+// rule_dsl: normalized conditions, lists turned into Sets once
+function buildWhen(when) {
+  const out = { ...when };
+  ["merchant", "category", "currency"].forEach((key) => {
+    if (when[key]) out[key] = new Set(when[key]);
+  });
+  if (when.mcc) out.mcc = { codes: new Set(when.mcc.codes), ranges: when.mcc.ranges };
+  if (when.not) out.not = buildWhen(when.not);
+  return out;
+}
+
+function whenMatches(when, merchant, category, isOnline, mcc, currency, amount) {
+  if (when.merchant && !when.merchant.has(merchant)) return false;
+  if (when.mcc && !when.mcc.codes.has(mcc)) {
+    if (!/^[0-9]{4}$/.test(mcc)) return false;
+    const code = Number(mcc);
+    if (!when.mcc.ranges.some(([lo, hi]) => lo <= code && code <= hi)) return false;
+  }
+  if (when.category && !when.category.has(category)) return false;
+  if (when.currency && !when.currency.has(currency)) return false;
+  if (when.online !== undefined && when.online !== isOnline) return false;
+  if (when.amount) {
+    if (when.amount.min !== undefined && amount < when.amount.min) return false;
+    if (when.amount.max !== undefined && amount >= when.amount.max) return false;
+  }
+  if (when.not && whenMatches(when.not, merchant, category, isOnline, mcc, currency, amount)) return false;
+  return true;
+}
+
+// first matching rule's effect ({name, block, mpd, cashback_rate}) or null
+function firstRule(card, merchant, category, isOnline, mcc, currency, amount) {
+  for (const rule of card.rules) {
+    if (whenMatches(rule.when, merchant, category, isOnline, mcc, currency, amount)) return rule.then;
+  }
+  return null;
+}
+
+function hostnameOf(url) {
+  try {
+    return new URL(url).hostname.toLowerCase();
+  } catch (e) {
+    return "";
+  }
+}
+
+// merchant_index.MerchantIndex.match + main.get_merchant:
+// [category, isOnline, mcc, merchant key]
+function getMerchantInfo(index, url) {
+  const labels = hostnameOf(url).replace(/\.+$/, "").split(".");
+
+  // 1) longest domain-suffix match
+  for (let i = 0; i < labels.length; i++) {
+    const key = labels.slice(i).join(".");
+    const info = index.domains.get(key);
+    if (info) return [...info, key];
+  }
+  // 2) brand label, nearest the registrable domain first
+  for (let i = labels.length - 1; i >= 0; i--) {
+    const info = index.brands.get(labels[i]);
+    if (info) return [...info, labels[i]];
+  }
+  return ["general", true, "0000", ""];
+}
+
+// mcc_index.MccIndex.category + main.category_from_mcc
+function categoryFromMcc(index, mcc, fallbackCategory) {
+  if (!mcc) return fallbackCategory;
+  const exact = index.mccCodes.get(mcc);
+  if (exact !== undefined) return exact;
+  if (/^[0-9]{4}$/.test(mcc)) {
+    const code = Number(mcc);
+    // last range starting at or before code
+    let lo = 0;
+    let hi = index.mccRanges.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (index.mccRanges[mid][0] <= code) lo = mid + 1;
+      else hi = mid;
+    }
+    const range = index.mccRanges[lo - 1];
+    if (range && code <= range[1]) return range[2];
+  }
+  return fallbackCategory;
+}
+
+function blockedResult(card, reason) {
+  return {
+    card_name: card.name,
+    card_type: card.type,
+    miles: 0.0,
+    cashback: 0.0,
+    blocked: true,
+    blocked_reason: reason,
+    capped: false,
+    cap_note: "",
+    notes: card.notes,
+    annual_fee: card.annual_fee,
+    annual_fee_waivable: card.annual_fee_waivable
+  };
+}
+
+// rules.CompiledCard.rewards (without ledger cap tracking)
+function cardRewards(card, amount, category, isOnline, mcc, isFcy, merchant, currency) {
+  const name = card.name;
+
+  const categoryBlocked = card.blocked_categories.has(category);
+  const mccBlocked = Boolean(mcc) && card.blocked_mccs.has(mcc);
+  if (categoryBlocked || mccBlocked) {
+    const reasons = [];
+    if (categoryBlocked) reasons.push(`Category '${category}' is blocked for ${name}.`);
+    if (mccBlocked) reasons.push(`MCC ${mcc} is blocked for ${name}.`);
+    return blockedResult(card, reasons.join(" "));
+  }
+
+  const rates = card.category_rates.get(category) || card.default_rates;
+  let mpd = rates[(isOnline ? 2 : 0) + (isFcy ? 1 : 0)];
+  let cashbackRate = card.cashback_rate;
+  const effect = card.rules.length
+    ? firstRule(card, merchant, category, isOnline, mcc, currency || (isFcy ? "" : "SGD"), amount)
+    : null;
+  if (effect) {
+    if (effect.block) {
+      return { ...blockedResult(card, `Excluded by rule '${effect.name}' for ${name}.`), rule: effect.name };
+    }
+    if (effect.mpd != null) mpd = effect.mpd;
+    if (effect.cashback_rate != null) cashbackRate = effect.cashback_rate;
+  }
+  const cashback = cashbackRate ? (amount * cashbackRate) / 100 : 0.0;
+
+  let capped = false;
+  let capNote = "";
+  if (card.bonus_cap_amount) {
+    if (amount > card.bonus_cap_amount) {
+      capped = true;
+      capNote = card.cap_exceeded_note;
+    } else {
+      capNote = card.cap_within_note;
+    }
+  }
+
+  const result = {
+    card_name: name,
+    card_type: card.type,
+    miles: pyRound2(amount * mpd),
+    cashback: pyRound2(cashback),
+    blocked: false,
+    blocked_reason: "",
+    capped,
+    cap_note: capNote,
+    notes: card.notes,
+    annual_fee: card.annual_fee,
+    annual_fee_waivable: card.annual_fee_waivable,
+    is_fcy: isFcy,
+    effective_mpd: mpd
+  };
+  if (effect) result.rule = effect.name;
+  return result;
+}
+
+const pyBool = (b) => (b ? "True" : "False");
+
+// main.recommend_card for a request without user_id
+function recommendLocal(index, req) {
+  const [categoryFromUrl, isOnline, mcc, merchant] = getMerchantInfo(index, req.url);
+  const category = categoryFromMcc(index, mcc, categoryFromUrl);
+
+  let mode = (req.mode || "miles").toLowerCase();
+  if (mode !== "miles" && mode !== "cashback") mode = "miles";
+  const currency = (req.currency || "SGD").toUpperCase();
+  const isFcy = currency !== "SGD";
+  const amount = Number(req.amount);
+
+  const enabled = new Set(req.enabled_cards || []);
+  const cards = enabled.size
+    ? index.cards.filter((c) => enabled.has(c.name))
+    : index.cards;
+
+  let breakdown = [];
+  let best = null;
+  let bestCard = null;
+  let bestScore = -1.0;
+  cards.forEach((card) => {
+    const result = cardRewards(card, amount, category, isOnline, mcc, isFcy, merchant, currency);
+    breakdown.push(result);
+    if (result[mode] > bestScore) {
+      bestScore = result[mode];
+      best = result;
+      bestCard = card;
+    }
+  });
+
+  // stable sort, like Python's sorted(..., reverse=True)
+  breakdown.sort((a, b) => b[mode] - a[mode]);
+  if (req.top_k != null) breakdown = breakdown.slice(0, Math.max(req.top_k, 0));
+  if (req.fields != null) {
+    breakdown = breakdown.map((r) => {
+      const out = {};
+      req.fields.forEach((f) => {
+        if (f in r) out[f] = r[f];
+      });
+      return out;
+    });
+  }
+  const includeReason = req.include_reason !== false;
+
+  const response = {
+    best_card: null,
+    estimated_miles: 0.0,
+    estimated_cashback: 0.0,
+    category,
+    is_online: isOnline,
+    mcc,
+    mode,
+    reason: null,
+    annual_fee_warning: null,
+    breakdown,
+    ruleset_version: index.version
+  };
+
+  if (!best) {
+    if (includeReason) response.reason = "No suitable card found with current rules.";
+    return response;
+  }
+
+  response.best_card = best.card_name;
+  response.estimated_miles = best.miles;
+  response.estimated_cashback = best.cashback;
+  if (includeReason) {
+    response.annual_fee_warning = bestCard.fee_warning;
+    const parts = [
+      `Picked ${best.card_name} based on category '${category}', ` +
+        `online=${pyBool(isOnline)}, MCC=${mcc}.`
+    ];
+    if (best.blocked) parts.push("Note: this card is blocked for this category/MCC.");
+    if (best.rule) parts.push(`Card rule applied: ${best.rule}.`);
+    if (best.cap_note) parts.push(best.cap_note);
+    if (best.notes) parts.push(best.notes);
+    response.reason = parts.join(" ").trim();
+  }
+  return response;
+}
+
+if (typeof module !== "undefined") {
+  module.exports = { pyRound2, buildLocalIndex, getMerchantInfo, categoryFromMcc, recommendLocal };
+}
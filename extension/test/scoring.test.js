@@ -0,0 +1,22 @@
+// recommendLocal must return exactly what recommend_card returned for
+// every case in golden.json (generated by backend/tests/scoring_golden.py).
+// Run with: node --test extension/test
+const assert = require("node:assert");
+const fs = require("node:fs");
+const path = require("node:path");
+const test = require("node:test");
+
+const { buildLocalIndex, recommendLocal } = require("../scoring.js");
+
+const goldenPath = process.env.SWIPESMART_SCORING_GOLDEN || path.join(__dirname, "golden.json");
+const golden = JSON.parse(fs.readFileSync(goldenPath, "utf8"));
+
+for (const suite of golden.suites) {
+  test(`scoring.js matches recommend_card: ${suite.name}`, () => {
+    const index = buildLocalIndex(suite.snapshot);
+    assert.ok(suite.cases.length > 0);
+    suite.cases.forEach(({ request, response }, i) => {
+      assert.deepStrictEqual(recommendLocal(index, request), response, `case ${i}: ${JSON.stringify(request)}`);
+    });
+  });
+}